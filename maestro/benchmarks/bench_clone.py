@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Compare work-repo clone strategies on a synthetic repo: wall time and bytes written."""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from maestro.orch.sandbox import CloneUnsupported, clone_tree, remove_tree
+
+
+def _make_repo(root: Path, files: int, file_bytes: int) -> None:
+    rng = random.Random(0)
+    for i in range(files):
+        path = root / f"pkg{i % 50:02d}" / f"mod{i // 50:03d}" / f"f{i}.py"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(bytes(rng.getrandbits(8) % 94 + 32 for _ in range(file_bytes)))
+    git = ["git", "-c", "user.name=bench", "-c", "user.email=bench@example.invalid"]
+    subprocess.run(["git", "init", "-q"], cwd=root, check=True)
+    subprocess.run(git + ["add", "-A"], cwd=root, check=True)
+    subprocess.run(git + ["commit", "-qm", "synthetic"], cwd=root, check=True)
+
+
+def _used_bytes(path: Path) -> int:
+    os.sync()
+    st = os.statvfs(path)
+    return (st.f_blocks - st.f_bfree) * st.f_frsize
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--files", type=int, default=10000)
+    ap.add_argument("--file-bytes", type=int, default=2048)
+    ap.add_argument("--dir", default=None, help="where to create the synthetic repo (filesystem under test)")
+    ap.add_argument("--strategies", default="copy,hardlink,reflink,worktree,auto")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        src = Path(tmp) / "repo"
+        src.mkdir()
+        _make_repo(src, args.files, args.file_bytes)
+        results = {}
+        for strategy in args.strategies.split(","):
+            dst = src / ".maestro" / "work" / strategy / "repo"
+            before = _used_bytes(src)
+            start = time.perf_counter()
+            try:
+                used = clone_tree(src, dst, strategy)
+            except CloneUnsupported as err:
+                results[strategy] = {"error": str(err)}
+                continue
+            elapsed = time.perf_counter() - start
+            results[strategy] = {
+                "used": used,
+                "seconds": round(elapsed, 3),
+                "bytes_written": max(0, _used_bytes(src) - before),
+            }
+            remove_tree(dst)
+
+    report = {"files": args.files, "file_bytes": args.file_bytes, "results": results}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Validator throughput of HFClient micro-batching as a function of batch size (needs torch/transformers)."""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from maestro.llm.hf_client import HFClient
+from maestro.llm.prompts import VALIDATOR_SYSTEM_PROMPT
+
+PROMPT = (
+    "[SID] s\n[RUNID] r\n[TURN] {i}\n[BUDGET_AFTER_TURN] 1\n[MODE] NORMAL\n"
+    "[REQUEST] add a --verbose flag to the CLI (variant {i})\n[REPO_SUMMARY] \n[ARTIFACT_KIND] diff\n"
+    "[ARTIFACT] diff --git a/cli.py b/cli.py\n[PATCH_APPLY] {{\"ok\": true}}\n"
+    "[CHECKS] {{\"summary\": \"ok\"}}\n[LAST_TMPS] NONE\n"
+)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--model", required=True)
+    ap.add_argument("--adapter", default=None)
+    ap.add_argument("--batch-sizes", default="1,2,4,8")
+    ap.add_argument("--requests", type=int, default=16)
+    ap.add_argument("--window-ms", type=int, default=20)
+    ap.add_argument("--max-new-tokens", type=int, default=128)
+    args = ap.parse_args()
+
+    options = {"temperature": 0.0, "top_p": 1.0, "do_sample": False, "max_new_tokens": args.max_new_tokens}
+    HFClient(adapter_path=args.adapter).generate(args.model, "warmup", options=options, system=VALIDATOR_SYSTEM_PROMPT)
+
+    rows = []
+    for size in [int(x) for x in args.batch_sizes.split(",")]:
+        HFClient._BATCHERS.clear()
+        client = HFClient(adapter_path=args.adapter, batch_window_ms=args.window_ms, batch_max_size=size)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(size, 1)) as ex:
+            list(
+                ex.map(
+                    lambda i: client.generate(
+                        args.model, PROMPT.format(i=i), options=options, system=VALIDATOR_SYSTEM_PROMPT
+                    ),
+                    range(args.requests),
+                )
+            )
+        elapsed = time.perf_counter() - start
+        rows.append({"batch_size": size, "seconds": round(elapsed, 3), "requests_per_s": round(args.requests / elapsed, 3)})
+    print(json.dumps({"model": args.model, "adapter": args.adapter, "results": rows}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Measure per-call HTTP overhead of fresh urllib connections vs. the keep-alive pool."""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from maestro.llm.http_pool import HTTPConnectionPool
+from maestro.llm.ollama_client import OllamaClient
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        return None
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", "0")))
+        body = json.dumps({"response": "ok", "done": True}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _urllib_generate(host: str) -> str:
+    req = urllib.request.Request(
+        f"{host}/api/generate",
+        data=json.dumps({"model": "m", "prompt": "p", "stream": False}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        return json.loads(resp.read().decode("utf-8"))["response"]
+
+
+def _per_call_us(fn, calls: int, threads: int) -> float:
+    start = time.perf_counter()
+    if threads == 1:
+        for _ in range(calls):
+            fn()
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as ex:
+            list(ex.map(lambda _: fn(), range(calls)))
+    return (time.perf_counter() - start) * 1e6 / calls
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--calls", type=int, default=500)
+    ap.add_argument("--threads", type=int, default=1)
+    ap.add_argument("--pool-size", type=int, default=4)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host = f"http://127.0.0.1:{server.server_address[1]}"
+    pool = HTTPConnectionPool(args.pool_size)
+    client = OllamaClient(host, timeout_s=30, pool=pool)
+
+    fresh = [_per_call_us(lambda: _urllib_generate(host), args.calls, args.threads) for _ in range(args.repeat)]
+    pooled = [_per_call_us(lambda: client.generate("m", "p"), args.calls, args.threads) for _ in range(args.repeat)]
+    pool.close()
+    server.shutdown()
+
+    report = {
+        "calls": args.calls,
+        "threads": args.threads,
+        "pool_size": args.pool_size,
+        "urllib_fresh_us_per_call": round(statistics.median(fresh), 1),
+        "pooled_keepalive_us_per_call": round(statistics.median(pooled), 1),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
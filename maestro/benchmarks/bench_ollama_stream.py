@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Compare buffered vs. streaming (early-stop) validator calls against a mock Ollama server."""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from maestro.llm.ollama_client import OllamaClient
+from maestro.tmps.prefix import tmps_stream_cutoff
+
+RECORD = "\n".join(
+    [
+        "V 2.4|s|r|0",
+        "A 1111|9999|P|patch applies and checks pass",
+        "B 1:imp|done",
+        "B 2:tst|done",
+        "B 3:doc|done",
+        "C A|1|0|*",
+    ]
+)
+
+
+def _tokens(ramble_tokens: int) -> list[str]:
+    tokens: list[str] = []
+    for line in RECORD.splitlines():
+        tokens.extend(part + "|" for part in line.split("|")[:-1])
+        tokens.append(line.split("|")[-1] + "\n")
+    tokens.extend(["blah "] * ramble_tokens)
+    return tokens
+
+
+def _make_handler(tokens: list[str], token_delay_s: float):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            return None
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", "0"))
+            payload = json.loads(self.rfile.read(length))
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+            if not payload.get("stream"):
+                time.sleep(token_delay_s * len(tokens))
+                self.wfile.write(json.dumps({"response": "".join(tokens), "done": True}).encode("utf-8"))
+                return
+            try:
+                for tok in tokens:
+                    time.sleep(token_delay_s)
+                    self.wfile.write(json.dumps({"response": tok, "done": False}).encode("utf-8") + b"\n")
+                    self.wfile.flush()
+                self.wfile.write(json.dumps({"response": "", "done": True}).encode("utf-8") + b"\n")
+            except (BrokenPipeError, ConnectionResetError):
+                return
+
+    return Handler
+
+
+def _time_calls(client: OllamaClient, n: int) -> list[float]:
+    out = []
+    for _ in range(n):
+        start = time.perf_counter()
+        client.generate("mock", "prompt")
+        out.append((time.perf_counter() - start) * 1000)
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--calls", type=int, default=5)
+    ap.add_argument("--token-delay-ms", type=float, default=5.0)
+    ap.add_argument("--ramble-tokens", type=int, default=400)
+    args = ap.parse_args()
+
+    tokens = _tokens(args.ramble_tokens)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(tokens, args.token_delay_ms / 1000))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host = f"http://127.0.0.1:{server.server_address[1]}"
+
+    buffered = _time_calls(OllamaClient(host), args.calls)
+    streamed = _time_calls(OllamaClient(host, stop=tmps_stream_cutoff), args.calls)
+    server.shutdown()
+
+    report = {
+        "tokens_total": len(tokens),
+        "record_tokens": len(tokens) - args.ramble_tokens,
+        "buffered_ms_median": round(statistics.median(buffered), 1),
+        "streamed_ms_median": round(statistics.median(streamed), 1),
+    }
+    report["speedup"] = round(report["buffered_ms_median"] / max(report["streamed_ms_median"], 1e-6), 2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""Measure Maestro's own per-turn overhead: scripted zero-latency LLMs driving Orchestrator.run on synthetic repos."""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from maestro import __version__
+from maestro.config import RunnerConfig
+from maestro.orch.orchestrator import Orchestrator
+
+MAX_RETRIES = 3
+
+
+def _tmps(verdict: str, decision: str, budget: int) -> str:
+    soft = {"P": "9999", "F": "1111"}.get(verdict, "9999")
+    hard = "0111" if verdict == "H" else "1111"
+    return "\n".join(
+        [
+            "V 2.4|s|r|0",
+            f"A {hard}|{soft}|{verdict}|scripted",
+            "B 1:imp|done",
+            "B 2:tst|done",
+            "B 3:doc|done",
+            f"C {decision}|1|{budget}|*",
+        ]
+    )
+
+
+# Validator responses per scenario, in call order; budgets follow max_retries=3.
+SCENARIOS = {
+    "accept": [_tmps("P", "A", 2)],
+    "repair": [_tmps("F", "R", 2), _tmps("F", "R", 1), _tmps("P", "A", 0)],
+    "strict_retry": [_tmps("P", "A", 9), _tmps("P", "A", 2)],
+    "escalate": [_tmps("F", "R", 2), _tmps("H", "E", 1)],
+}
+
+
+class ScriptedValidator:
+    def __init__(self, responses: list[str]):
+        self.responses = list(responses)
+
+    def generate(self, model, prompt, options=None, system=None):
+        return self.responses.pop(0)
+
+
+class ScriptedSpecialist:
+    """Adds one new file per call, so every turn's diff applies on top of the previous ones."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, model, prompt, options=None, system=None):
+        n = self.calls
+        self.calls += 1
+        return (
+            f"diff --git a/bench/turn_{n}.txt b/bench/turn_{n}.txt\n"
+            "new file mode 100644\n"
+            "--- /dev/null\n"
+            f"+++ b/bench/turn_{n}.txt\n"
+            "@@ -0,0 +1 @@\n"
+            f"+turn {n}\n"
+        )
+
+
+def _make_repo(root: Path, files: int, file_bytes: int) -> None:
+    rng = random.Random(0)
+    words = ["def", "return", "self", "value", "import", "class", "items", "for", "in", "if"]
+    for i in range(files):
+        path = root / f"pkg{i % 50:02d}" / f"mod{i // 50:03d}" / f"f{i}.py"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        text = []
+        size = 0
+        while size < file_bytes:
+            line = " ".join(rng.choice(words) for _ in range(8)) + "\n"
+            text.append(line)
+            size += len(line)
+        path.write_text("".join(text))
+    git = ["git", "-c", "user.name=bench", "-c", "user.email=bench@example.invalid"]
+    subprocess.run(["git", "init", "-q"], cwd=root, check=True)
+    subprocess.run(git + ["add", "-A"], cwd=root, check=True)
+    subprocess.run(git + ["commit", "-qm", "synthetic"], cwd=root, check=True)
+
+
+def _config(scenario: str, checks: bool) -> RunnerConfig:
+    return RunnerConfig.from_dict(
+        {
+            "validator_model": "val",
+            "max_retries": MAX_RETRIES,
+            "abs_max_turns": MAX_RETRIES,
+            "execution_mode": "unsafe-local",
+            "checks": [{"name": "noop", "cmd": "true"}] if checks else [],
+            "strict_mode": scenario == "strict_retry",
+            "agents": {"imp": {"model": "impl"}},
+            "trace": True,
+        }
+    )
+
+
+def _self_times(trace: dict) -> tuple[float, dict[str, dict]]:
+    """Wall time of the run span and, per span name on its lane, the count and time not spent in nested spans."""
+    spans = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+    run = next(e for e in spans if e["name"] == "run")
+    lane = sorted((e for e in spans if e["tid"] == run["tid"]), key=lambda e: (e["ts"], -e["dur"]))
+    self_us = {id(e): e["dur"] for e in lane}
+    stack: list[dict] = []
+    for event in lane:
+        while stack and event["ts"] >= stack[-1]["ts"] + stack[-1]["dur"]:
+            stack.pop()
+        if stack:
+            self_us[id(stack[-1])] -= event["dur"]
+        stack.append(event)
+    phases: dict[str, dict] = {}
+    for event in lane:
+        name = "orchestrator" if event is run else event["name"]
+        phase = phases.setdefault(name, {"count": 0, "ms": 0.0})
+        phase["count"] += 1
+        phase["ms"] += self_us[id(event)] / 1000
+    return run["dur"] / 1000, phases
+
+
+def _run_once(repo: Path, scenario: str, checks: bool) -> tuple[dict, float, dict]:
+    orch = Orchestrator(
+        _config(scenario, checks), ScriptedSpecialist(), validator_client=ScriptedValidator(SCENARIOS[scenario])
+    )
+    result = orch.run(repo, "implement the benchmark change")
+    run_root = Path(result["run_root"])
+    trace = json.loads((run_root / "trace.json").read_text())
+    wall_ms, phases = _self_times(trace)
+    return result, wall_ms, phases
+
+
+def _bench(repo: Path, scenario: str, repeat: int, checks: bool) -> dict:
+    _run_once(repo, scenario, checks)  # warm imports and the page cache
+    walls = []
+    samples: list[dict] = []
+    for _ in range(repeat):
+        result, wall_ms, phases = _run_once(repo, scenario, checks)
+        walls.append(wall_ms)
+        samples.append(phases)
+    tracemalloc.start()
+    _run_once(repo, scenario, checks)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    turns = len(list((Path(result["run_root"]) / "turns").iterdir()))
+    names = sorted({name for phases in samples for name in phases})
+    return {
+        "decision": result["decision"],
+        "turns": turns,
+        "wall_ms": {"min": round(min(walls), 3), "median": round(statistics.median(walls), 3)},
+        "turn_ms": round(statistics.median(walls) / turns, 3),
+        "phases": {
+            name: {
+                "count": samples[0].get(name, {}).get("count", 0),
+                "median_ms": round(statistics.median(p.get(name, {}).get("ms", 0.0) for p in samples), 3),
+            }
+            for name in names
+        },
+        "peak_alloc_kb": round(peak / 1024, 1),
+    }
+
+
+def _git_rev() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def _compare(report: dict, baseline: dict) -> list[str]:
+    base = {(r["scenario"], r["files"]): r for r in baseline["results"]}
+    lines = []
+    for row in report["results"]:
+        old = base.get((row["scenario"], row["files"]))
+        if old is None:
+            continue
+        before, after = old["wall_ms"]["median"], row["wall_ms"]["median"]
+        lines.append(
+            f"{row['scenario']:<13} files={row['files']:<6} {before:9.1f} ms -> {after:9.1f} ms ({after / before - 1:+.1%})"
+        )
+    return lines
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--sizes", default="100,1000,5000", help="comma-separated file counts of the synthetic repos")
+    ap.add_argument("--file-bytes", type=int, default=2048)
+    ap.add_argument("--scenarios", default=",".join(SCENARIOS))
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--no-checks", action="store_true", help="configure no checks (by default one no-op check runs)")
+    ap.add_argument("--dir", default=None, help="where to create the synthetic repos")
+    ap.add_argument("--out", default=None, help="also write the JSON report to this path")
+    ap.add_argument("--compare", default=None, help="a previous --out report to print wall-time deltas against")
+    args = ap.parse_args()
+
+    results = []
+    for files in (int(size) for size in args.sizes.split(",")):
+        with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+            repo = Path(tmp) / "repo"
+            repo.mkdir()
+            _make_repo(repo, files, args.file_bytes)
+            for scenario in args.scenarios.split(","):
+                row = _bench(repo, scenario, args.repeat, not args.no_checks)
+                results.append({"scenario": scenario, "files": files, **row})
+
+    report = {
+        "maestro_version": __version__,
+        "git_rev": _git_rev(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "file_bytes": args.file_bytes,
+        "repeat": args.repeat,
+        "checks": not args.no_checks,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n")
+    print(text)
+    if args.compare:
+        for line in _compare(report, json.loads(Path(args.compare).read_text())):
+            print(line, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,21 +11,32 @@ if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
 from maestro.llm.prompts import VALIDATOR_SYSTEM_PROMPT
+from maestro.runs_db import query
+from maestro.store import artifact_exists, read_artifact
 from maestro.tmps.parser import ParseError, parse_tmps
 
 
-def _iter_turn_dirs(runs_root: Path):
+def _iter_turn_dirs(runs_root: Path, use_index: bool = True):
+    # Turns the runs index next to ``.maestro/runs`` recorded as never reaching
+    # the validator are skipped unread. Everything else is walked, so runs the
+    # index does not know about (older, unindexed or crashed runs) still count.
+    skip: set[tuple[str, ...]] = set()
+    db = runs_root.parent / "runs.sqlite"
+    if use_index and db.exists():
+        _, rows = query(db, "SELECT sid, runid, turn FROM turns WHERE validator_calls = 0")
+        skip = {(sid, runid, str(turn)) for sid, runid, turn in rows}
     for turn in runs_root.glob("*/**/turns/*"):
-        if turn.is_dir():
+        parts = turn.relative_to(runs_root).parts
+        if turn.is_dir() and (parts[0], parts[1], parts[-1]) not in skip:
             yield turn
 
 
 def _read_first_parseable_tmps(turn_dir: Path) -> str | None:
     for name in ("tmps_raw.txt", "tmps_raw_retry.txt"):
         p = turn_dir / name
-        if not p.exists():
+        if not artifact_exists(p):
             continue
-        raw = p.read_text().strip()
+        raw = read_artifact(p).strip()
         if not raw:
             continue
         try:
@@ -36,11 +47,11 @@ def _read_first_parseable_tmps(turn_dir: Path) -> str | None:
     return None
 
 
-def extract_pairs(runs_root: Path) -> list[dict]:
+def extract_pairs(runs_root: Path, use_index: bool = True) -> list[dict]:
     out: list[dict] = []
-    for turn in _iter_turn_dirs(runs_root):
+    for turn in _iter_turn_dirs(runs_root, use_index):
         validator_input = turn / "validator_input.txt"
-        if not validator_input.exists():
+        if not artifact_exists(validator_input):
             continue
         tmps_raw = _read_first_parseable_tmps(turn)
         if not tmps_raw:
@@ -50,7 +61,7 @@ def extract_pairs(runs_root: Path) -> list[dict]:
                 "source": str(turn),
                 "messages": [
                     {"role": "system", "content": VALIDATOR_SYSTEM_PROMPT},
-                    {"role": "user", "content": validator_input.read_text()},
+                    {"role": "user", "content": read_artifact(validator_input)},
                     {"role": "assistant", "content": tmps_raw},
                 ],
             }
@@ -62,9 +73,10 @@ def main() -> None:
     ap = argparse.ArgumentParser(description="Extract parseable validator pairs from .maestro runs")
     ap.add_argument("--runs-root", required=True, type=Path)
     ap.add_argument("--out", required=True, type=Path)
+    ap.add_argument("--scan", action="store_true", help="ignore the runs index and read every turn")
     args = ap.parse_args()
 
-    pairs = extract_pairs(args.runs_root)
+    pairs = extract_pairs(args.runs_root, use_index=not args.scan)
     args.out.parent.mkdir(parents=True, exist_ok=True)
     with args.out.open("w", encoding="utf-8") as f:
         for row in pairs:
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX
+    fcntl = None
+
+
+_TREE_IGNORE = {".git", ".maestro"}
+# Files modified this recently are never memoized; covers coarse (FAT: 2 s) timestamps.
+_RACY_NS = 2_000_000_000
+
+
+def racy_cutoff_ns() -> int:
+    """Files with an mtime at or after this may be rewritten without their ``(size, mtime_ns)`` changing.
+
+    Take it before reading files: the signature of a file newer than this must
+    not be trusted later (git's "racy clean" problem), so it is read again.
+    """
+    return time.time_ns() - _RACY_NS
+
+
+def tree_hash(root: Path, memo: dict | None = None) -> str:
+    """sha256 over the paths and contents of every file under ``root`` (``.git``/``.maestro`` excluded).
+
+    ``memo`` maps ``(relpath, size, mtime_ns)`` to a file digest, so repeated hashes
+    of a mostly unchanged tree only read the files that changed. Files newer
+    than :func:`racy_cutoff_ns` are not memoized: a same-size rewrite inside the filesystem's timestamp granularity
+    would keep its signature, so it is read again next time.
+    """
+    root = Path(root)
+    memo = {} if memo is None else memo
+    racy_after = racy_cutoff_ns()
+    digest = hashlib.sha256()
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in _TREE_IGNORE)
+        for name in sorted(filenames):
+            path = Path(dirpath) / name
+            rel = path.relative_to(root).as_posix()
+            st = path.lstat()
+            sig = (rel, st.st_size, st.st_mtime_ns)
+            file_digest = memo.get(sig)
+            if file_digest is None:
+                data = os.readlink(path).encode("utf-8") if path.is_symlink() else path.read_bytes()
+                file_digest = hashlib.sha256(data).hexdigest()
+                if st.st_mtime_ns < racy_after:
+                    memo[sig] = file_digest
+            digest.update(f"{rel}\0{file_digest}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def cache_key(*parts) -> str:
+    """Stable sha256 over JSON-serialisable key parts."""
+    blob = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    evicted: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class DiskCache:
+    """Content-addressed JSON cache with size-bounded LRU eviction.
+
+    Entries live at ``<root>/<key[:2]>/<key>.json`` and are written to a temp file
+    and renamed into place, so concurrent readers never see partial entries. Hits
+    bump the entry's mtime; eviction removes the least recently used entries and
+    runs under an exclusive ``flock`` so processes sharing the cache do not evict
+    at the same time. Writes keep a running estimate of the cache size (the size
+    found by the last scan plus this instance's own writes) and only scan and
+    evict when it exceeds ``max_bytes`` or every ``RESCAN_EVERY`` puts, which
+    picks up what other processes wrote.
+    """
+
+    RESCAN_EVERY = 64
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max(0, int(max_bytes))
+        self._approx_bytes: int | None = None
+        self._puts_since_scan = 0
+        self._lock = threading.Lock()  # size bookkeeping; puts may come from fan-out threads
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key: str, stats: CacheStats | None = None) -> dict | None:
+        path = self._path(key)
+        try:
+            value = json.loads(path.read_text())
+            os.utime(path)
+        except (OSError, ValueError):
+            value = None
+        if stats is not None:
+            if value is None:
+                stats.misses += 1
+            else:
+                stats.hits += 1
+        return value
+
+    def put(self, key: str, value: dict, stats: CacheStats | None = None) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            replaced = path.stat().st_size
+        except OSError:
+            replaced = 0
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-", suffix=".json")
+        try:
+            with os.fdopen(fd, "w") as fh:
+                json.dump(value, fh, sort_keys=True)
+                written = fh.tell()
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        with self._lock:
+            self._puts_since_scan += 1
+            if self._approx_bytes is not None:
+                self._approx_bytes += written - replaced
+            scan = (
+                self._approx_bytes is None
+                or self._approx_bytes > self.max_bytes
+                or self._puts_since_scan >= self.RESCAN_EVERY
+            )
+        evicted = self.evict() if scan else 0
+        if stats is not None:
+            stats.writes += 1
+            stats.evicted += evicted
+
+    @contextmanager
+    def _locked(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / ".lock", "a") as fh:
+            if fcntl is not None:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def evict(self) -> int:
+        """Drop least recently used entries until the cache fits in ``max_bytes``."""
+        with self._locked():
+            entries = []
+            total = 0
+            for path in self.root.glob("*/*.json"):
+                try:
+                    st = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+            removed = 0
+            for _, size, path in sorted(entries, key=lambda e: e[0]):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                removed += 1
+            with self._lock:
+                self._approx_bytes = total
+                self._puts_since_scan = 0
+            return removed
@@ -1,11 +1,15 @@
 from __future__ import annotations
 
 import argparse
+import json
+import time
 from pathlib import Path
 
 from maestro.config import RunnerConfig
+from maestro.gc import DEFAULT_GRACE_S, collect_garbage
 from maestro.llm import build_specialist_client, build_validator_client
 from maestro.orch.orchestrator import Orchestrator
+from maestro.runs_db import query, rebuild, stats
 
 
 def main() -> None:
@@ -17,14 +21,58 @@ def main() -> None:
     run.add_argument("--cfg", required=True)
     run.add_argument("--sandboxed", action="store_true")
     run.add_argument("--unsafe-local", action="store_true")
+    run.add_argument("--trace", action="store_true", help="write a Chrome trace of the run to trace.json")
+    gc = sub.add_parser("gc", help="prune old runs, finished work dirs and unreferenced blobs under .maestro")
+    gc.add_argument("--repo", required=True)
+    gc.add_argument("--max-age-days", type=float, default=None)
+    gc.add_argument("--max-mb", type=float, default=None)
+    gc.add_argument("--grace-s", type=float, default=DEFAULT_GRACE_S)
+    gc.add_argument("--dry-run", action="store_true")
+    runs = sub.add_parser("runs", help="query the SQLite index of runs in .maestro/runs.sqlite")
+    runs_sub = runs.add_subparsers(dest="runs_cmd", required=True)
+    runs_query = runs_sub.add_parser("query", help="run a read-only SQL query (tables: runs, turns, checks)")
+    runs_query.add_argument("--repo", required=True)
+    runs_query.add_argument("sql")
+    runs_stats = runs_sub.add_parser("stats", help="accept rates, turns to accept, retry and failure rates")
+    runs_stats.add_argument("--repo", required=True)
+    runs_stats.add_argument("--since-days", type=float, default=None)
+    runs_rebuild = runs_sub.add_parser("rebuild", help="recreate the index from the run directories")
+    runs_rebuild.add_argument("--repo", required=True)
+    runs_rebuild.add_argument("--workers", type=int, default=None)
 
     args = parser.parse_args()
+    if args.cmd == "runs":
+        maestro_dir = Path(args.repo) / ".maestro"
+        db_path = maestro_dir / "runs.sqlite"
+        if args.runs_cmd == "rebuild":
+            print(json.dumps(rebuild(maestro_dir, db_path, args.workers)))
+        elif not db_path.exists():
+            parser.exit(1, f"no runs index at {db_path}; run `maestro runs rebuild --repo {args.repo}`\n")
+        elif args.runs_cmd == "query":
+            columns, rows = query(db_path, args.sql)
+            print("\t".join(columns))
+            for row in rows:
+                print("\t".join("" if v is None else str(v) for v in row))
+        else:
+            since = time.time() - args.since_days * 86400 if args.since_days is not None else None
+            print(json.dumps(stats(db_path, since), indent=2))
+    if args.cmd == "gc":
+        removed = collect_garbage(
+            Path(args.repo) / ".maestro",
+            max_age_days=args.max_age_days,
+            max_bytes=int(args.max_mb * 1024 * 1024) if args.max_mb is not None else None,
+            grace_s=args.grace_s,
+            dry_run=args.dry_run,
+        )
+        print(json.dumps(removed, indent=2))
     if args.cmd == "run":
         cfg = RunnerConfig.from_json_file(args.cfg)
         if args.sandboxed:
             cfg.execution_mode = "sandboxed"
         if args.unsafe_local:
             cfg.execution_mode = "unsafe-local"
+        if args.trace:
+            cfg.trace = True
 
         req_arg = args.request
         req_path = Path(req_arg)
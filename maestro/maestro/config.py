@@ -13,6 +13,38 @@ class CommandCheck:
     cwd: str = "."
     timeout_s: int = 60
     required: bool = True
+    depends_on: list[str] = field(default_factory=list)
+    parallel: bool = False
+    paths: list[str] = field(default_factory=list)
+    impact: str | None = None
+
+
+def _validate_checks(checks: list[CommandCheck]) -> None:
+    names = [chk.name for chk in checks]
+    if len(set(names)) != len(names):
+        raise ValueError("check names must be unique")
+    deps = {chk.name: list(chk.depends_on) for chk in checks}
+    for chk in checks:
+        if chk.impact not in {None, "python-imports"}:
+            raise ValueError(f"check {chk.name}: impact must be python-imports")
+    for name, needs in deps.items():
+        for dep in needs:
+            if dep not in deps:
+                raise ValueError(f"check {name} depends on unknown check {dep}")
+    state: dict[str, int] = {}  # 1 = on the current path, 2 = done
+
+    def visit(name: str) -> None:
+        if state.get(name) == 2:
+            return
+        if state.get(name) == 1:
+            raise ValueError(f"check dependency cycle through {name}")
+        state[name] = 1
+        for dep in deps[name]:
+            visit(dep)
+        state[name] = 2
+
+    for name in deps:
+        visit(name)
 
 
 @dataclass
@@ -28,21 +60,44 @@ class AgentConfig:
 class RunnerConfig:
     ollama_host: str = "http://127.0.0.1:11434"
     ollama_timeout_s: int = 300
+    ollama_pool_size: int = 4
     validator_backend: str = "ollama"
     validator_model: str = ""
     validator_adapter_path: str | None = None
     validator_seed: int | None = None
     validator_max_new_tokens: int = 512
+    validator_early_stop: bool = True
+    validator_batch_window_ms: int = 5
+    validator_batch_max_size: int = 1
+    validator_constrained: bool = False
+    validator_cache: bool = False
+    validator_cache_max_mb: int = 256
     strict_mode: bool = False
     max_retries: int = 2
     abs_max_turns: int = 6
     apply_to_repo: bool = False
     execution_mode: str = "sandboxed"
     checks: list[CommandCheck] = field(default_factory=list)
+    checks_fail_fast: bool = False
+    check_tail_chars: int = 400
     agents: dict[str, AgentConfig] = field(default_factory=dict)
     allow_renames: bool = False
-    parallel_decompose: bool = False  # reserved; current runtime is strictly sequential
+    patch_engine: str = "python"
+    patch_fuzz: int = 2
+    patch_max_offset: int = 100
+    clone_strategy: str = "auto"
+    specialist_cache: bool = False
+    specialist_cache_max_mb: int = 256
+    parallel_decompose: bool = False
     validator_input_cap: int = 24000
+    validator_input_tokens: int = 6000
+    repo_summary_chars: int = 2000
+    store_async_writes: bool = False
+    store_fsync: str = "never"
+    store_journal: bool = False
+    store_compress: bool = False
+    trace: bool = False
+    runs_index: bool = True
 
     @classmethod
     def from_json_file(cls, path: str | Path) -> "RunnerConfig":
@@ -54,17 +109,18 @@ class RunnerConfig:
         ollama_timeout_s = int(raw.get("ollama_timeout_s", 300))
         if ollama_timeout_s <= 0:
             raise ValueError("ollama_timeout_s must be > 0")
+        ollama_pool_size = int(raw.get("ollama_pool_size", 4))
+        if ollama_pool_size <= 0:
+            raise ValueError("ollama_pool_size must be > 0")
 
         checks = [CommandCheck(**item) for item in raw.get("checks", [])]
+        _validate_checks(checks)
         agents: dict[str, AgentConfig] = {}
         for code, cfg in raw.get("agents", {}).items():
             if not (2 <= len(code) <= 4 and code.islower()):
                 raise ValueError(f"Invalid agent code: {code}")
             agents[code] = AgentConfig(**cfg)
 
-        if bool(raw.get("parallel_decompose", False)):
-            raise ValueError("parallel_decompose is not supported in this build; execution is sequential only")
-
         validator_backend = raw.get("validator_backend", "ollama")
         if validator_backend not in {"ollama", "hf"}:
             raise ValueError("validator_backend must be ollama or hf")
@@ -82,23 +138,52 @@ class RunnerConfig:
         cfg = cls(
             ollama_host=raw.get("ollama_host", "http://127.0.0.1:11434"),
             ollama_timeout_s=ollama_timeout_s,
+            ollama_pool_size=ollama_pool_size,
             validator_backend=validator_backend,
             validator_model=validator_model,
             validator_adapter_path=validator_adapter_path,
             validator_seed=raw.get("validator_seed"),
             validator_max_new_tokens=validator_max_new_tokens,
+            validator_early_stop=bool(raw.get("validator_early_stop", True)),
+            validator_batch_window_ms=max(0, int(raw.get("validator_batch_window_ms", 5))),
+            validator_batch_max_size=max(1, int(raw.get("validator_batch_max_size", 1))),
+            validator_constrained=bool(raw.get("validator_constrained", False)),
+            validator_cache=bool(raw.get("validator_cache", False)),
+            validator_cache_max_mb=max(1, int(raw.get("validator_cache_max_mb", 256))),
             strict_mode=bool(raw.get("strict_mode", False)),
             max_retries=max(0, min(9, int(raw.get("max_retries", 2)))),
             abs_max_turns=int(raw.get("abs_max_turns", 6)),
             apply_to_repo=bool(raw.get("apply_to_repo", False)),
             execution_mode=raw.get("execution_mode", "sandboxed"),
             checks=checks,
+            checks_fail_fast=bool(raw.get("checks_fail_fast", False)),
+            check_tail_chars=max(0, int(raw.get("check_tail_chars", 400))),
             agents=agents,
             allow_renames=bool(raw.get("allow_renames", False)),
-            parallel_decompose=False,
+            patch_engine=raw.get("patch_engine", "python"),
+            patch_fuzz=max(0, int(raw.get("patch_fuzz", 2))),
+            patch_max_offset=max(0, int(raw.get("patch_max_offset", 100))),
+            clone_strategy=raw.get("clone_strategy", "auto"),
+            specialist_cache=bool(raw.get("specialist_cache", False)),
+            specialist_cache_max_mb=max(1, int(raw.get("specialist_cache_max_mb", 256))),
+            parallel_decompose=bool(raw.get("parallel_decompose", False)),
             validator_input_cap=int(raw.get("validator_input_cap", 24000)),
+            validator_input_tokens=max(0, int(raw.get("validator_input_tokens", 6000))),
+            repo_summary_chars=max(0, int(raw.get("repo_summary_chars", 2000))),
+            store_async_writes=bool(raw.get("store_async_writes", False)),
+            store_fsync=raw.get("store_fsync", "never"),
+            store_journal=bool(raw.get("store_journal", False)),
+            store_compress=bool(raw.get("store_compress", False)),
+            trace=bool(raw.get("trace", False)),
+            runs_index=bool(raw.get("runs_index", True)),
         )
 
         if cfg.execution_mode not in {"sandboxed", "unsafe-local"}:
             raise ValueError("execution_mode must be sandboxed or unsafe-local")
+        if cfg.store_fsync not in {"never", "turn", "always"}:
+            raise ValueError("store_fsync must be never, turn or always")
+        if cfg.patch_engine not in {"python", "git"}:
+            raise ValueError("patch_engine must be python or git")
+        if cfg.clone_strategy not in {"auto", "reflink", "hardlink", "worktree", "copy"}:
+            raise ValueError("clone_strategy must be auto, reflink, hardlink, worktree or copy")
         return cfg
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import os
+import shutil
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from maestro.orch.sandbox import remove_tree
+from maestro.runs_db import forget_runs
+from maestro.store import BLOB_SUFFIX, BlobStore, artifact_exists, read_pointer
+
+DEFAULT_GRACE_S = 3600.0
+
+
+@dataclass
+class RunEntry:
+    sid: str
+    runid: str
+    root: Path | None
+    work: Path | None
+    last_active: float
+    finished: bool
+    bytes: int
+    blobs: list[str] = field(default_factory=list)
+
+
+def tree_bytes(path: Path) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, name)).st_size
+            except OSError:
+                continue
+    return total
+
+
+def _mtime(path: Path) -> float:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return 0.0
+
+
+def _last_active(root: Path) -> float:
+    """Newest mtime of the run directory, its turns and ``final`` (a turn adds entries to these)."""
+    stamps = [_mtime(root), _mtime(root / "final")]
+    turns = root / "turns"
+    if turns.is_dir():
+        stamps.append(_mtime(turns))
+        stamps.extend(_mtime(turn) for turn in turns.iterdir())
+    return max(stamps)
+
+
+def _pointers(root: Path) -> list[str]:
+    digests = []
+    for pointer in root.rglob("*" + BLOB_SUFFIX):
+        try:
+            digests.append(read_pointer(pointer))
+        except OSError:
+            continue
+    return digests
+
+
+def _remove(path: Path) -> None:
+    """Delete a run or work dir, unregistering a ``git worktree`` work repo first."""
+    repo = path / "repo"
+    if (repo / ".git").is_file():
+        remove_tree(repo)
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def list_runs(maestro_dir: Path) -> list[RunEntry]:
+    """Every run under ``runs/`` and ``work/`` (work dirs without a run are included as orphans)."""
+    maestro_dir = Path(maestro_dir)
+    keys = {
+        tuple(path.relative_to(base).parts)
+        for base in (maestro_dir / "runs", maestro_dir / "work")
+        for path in base.glob("*/*")
+        if path.is_dir()
+    }
+    entries = []
+    for sid, runid in sorted(keys):
+        root = maestro_dir / "runs" / sid / runid
+        work = maestro_dir / "work" / sid / runid
+        root = root if root.is_dir() else None
+        work = work if work.is_dir() else None
+        last_active = max(_last_active(root) if root else 0.0, _mtime(work) if work else 0.0)
+        finished = root is not None and (
+            artifact_exists(root / "final" / "final_summary.md") or (root / "final" / "escalation_bundle").is_dir()
+        )
+        size = (tree_bytes(root) if root else 0) + (tree_bytes(work) if work else 0)
+        entries.append(RunEntry(sid, runid, root, work, last_active, finished, size, _pointers(root) if root else []))
+    return entries
+
+
+def collect_garbage(
+    maestro_dir: Path,
+    *,
+    max_age_days: float | None = None,
+    max_bytes: int | None = None,
+    grace_s: float = DEFAULT_GRACE_S,
+    dry_run: bool = False,
+    now: float | None = None,
+) -> dict:
+    """Prune ``.maestro`` by age and disk quota; returns what was (or, with ``dry_run``, would be) removed.
+
+    Work dirs of finished runs are always removed. Runs idle for longer than
+    ``max_age_days`` go with their work dir, then the oldest runs until runs,
+    work dirs and blobs fit in ``max_bytes``. Runs that are unfinished and were
+    active within ``grace_s`` are never touched. Finally blobs no remaining run
+    points to (and older than ``grace_s``) are deleted, and removed runs are
+    dropped from ``runs.sqlite`` if it exists.
+    """
+    maestro_dir = Path(maestro_dir)
+    now = time.time() if now is None else now
+    runs = list_runs(maestro_dir)
+    blob_store = BlobStore(maestro_dir / "blobs")
+    blob_sizes = {path.name[: -len(".gz")]: path.stat().st_size for path in blob_store.root.glob("*/*.gz")}
+    refs: dict[str, int] = {}
+    for run in runs:
+        for digest in run.blobs:
+            refs[digest] = refs.get(digest, 0) + 1
+
+    stats = {"runs_removed": 0, "work_removed": 0, "blobs_removed": 0, "bytes_freed": 0, "dry_run": dry_run}
+    removed: list[str] = []
+    pruned: list[tuple[str, str]] = []
+
+    def drop(path: Path, size: int, key: str) -> None:
+        if not dry_run:
+            _remove(path)
+        stats[key] += 1
+        stats["bytes_freed"] += size
+        removed.append(str(path.relative_to(maestro_dir)))
+
+    def drop_work(run: RunEntry) -> None:
+        if run.work is not None:
+            size = tree_bytes(run.work)
+            drop(run.work, size, "work_removed")
+            run.bytes -= size
+            run.work = None
+
+    def drop_run(run: RunEntry) -> None:
+        drop_work(run)
+        if run.root is not None:
+            drop(run.root, run.bytes, "runs_removed")
+            pruned.append((run.sid, run.runid))
+            for digest in run.blobs:
+                refs[digest] -= 1
+            run.root = None
+        run.bytes = 0
+
+    live = []
+    for run in runs:
+        idle = now - run.last_active
+        if not run.finished and idle < grace_s:
+            continue  # possibly still running
+        if run.finished or run.root is None:
+            drop_work(run)
+        if max_age_days is not None and idle > max_age_days * 86400:
+            drop_run(run)
+        elif run.root is not None:
+            live.append(run)
+
+    if max_bytes is not None:
+        total = sum(run.bytes for run in runs) + sum(blob_sizes.get(d, 0) for d, n in refs.items() if n > 0)
+        for run in sorted(live, key=lambda r: r.last_active):
+            if total <= max_bytes:
+                break
+            before = {d for d in run.blobs if refs.get(d, 0) > 0}
+            total -= run.bytes
+            drop_run(run)
+            total -= sum(blob_sizes.get(d, 0) for d in before if refs[d] == 0)
+
+    for digest, size in blob_sizes.items():
+        path = blob_store.path(digest)
+        if refs.get(digest, 0) > 0 or now - _mtime(path) < grace_s:
+            continue
+        if not dry_run:
+            path.unlink(missing_ok=True)
+        stats["blobs_removed"] += 1
+        stats["bytes_freed"] += size
+
+    index = maestro_dir / "runs.sqlite"
+    if pruned and not dry_run and index.exists():
+        forget_runs(index, pruned)
+
+    if not dry_run:
+        for base in (maestro_dir / "runs", maestro_dir / "work", blob_store.root):
+            for sub in base.glob("*"):
+                if sub.is_dir() and not any(sub.iterdir()):
+                    sub.rmdir()
+    stats["removed"] = removed
+    return stats
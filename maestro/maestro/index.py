@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import ast
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Iterable
+
+from maestro.cache import racy_cutoff_ns
+
+INDEX_VERSION = 1
+
+_IGNORED_DIRS = {".git", ".maestro", "__pycache__", ".venv", "venv", "node_modules", ".mypy_cache", ".pytest_cache"}
+_MAX_PARSE_BYTES = 1_000_000
+_MAX_SYMBOLS = 24
+_PARALLEL_MIN_FILES = 256
+
+_LANGUAGES = {
+    ".py": "python", ".pyi": "python", ".js": "javascript", ".jsx": "javascript", ".mjs": "javascript",
+    ".ts": "typescript", ".tsx": "typescript", ".go": "go", ".rs": "rust", ".java": "java", ".kt": "kotlin",
+    ".c": "c", ".h": "c", ".cc": "cpp", ".cpp": "cpp", ".hpp": "cpp", ".cs": "csharp", ".rb": "ruby",
+    ".php": "php", ".swift": "swift", ".scala": "scala", ".sh": "shell", ".md": "markdown", ".rst": "rst",
+    ".txt": "text", ".json": "json", ".toml": "toml", ".yaml": "yaml", ".yml": "yaml", ".ini": "ini",
+    ".cfg": "ini", ".html": "html", ".css": "css", ".sql": "sql",
+}
+_GENERIC_SYMBOL = re.compile(
+    r"^\s*(?:export\s+)?(?:default\s+)?(?:pub(?:\([^)]*\))?\s+)?(?:public\s+|private\s+|protected\s+)?"
+    r"(?:static\s+)?(?:async\s+)?(?:abstract\s+)?"
+    r"(?:def|class|function|func|fn|struct|interface|trait|enum|type|module)\s+([A-Za-z_][A-Za-z0-9_]*)",
+    re.MULTILINE,
+)
+
+
+@dataclass
+class FileEntry:
+    size: int
+    mtime_ns: int
+    sha256: str
+    lang: str
+    symbols: list[str] = field(default_factory=list)
+
+
+def language(rel: str) -> str:
+    name = rel.rsplit("/", 1)[-1]
+    if name in {"Makefile", "Dockerfile"}:
+        return name.lower()
+    return _LANGUAGES.get(os.path.splitext(name)[1].lower(), "other")
+
+
+def _python_symbols(data: bytes) -> list[str] | None:
+    try:
+        tree = ast.parse(data)
+    except (SyntaxError, ValueError):
+        return None
+    symbols = []
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            symbols.append(f"class {node.name}")
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            symbols.append(f"def {node.name}")
+    return symbols
+
+
+def symbols(rel: str, data: bytes) -> list[str]:
+    """Top-level symbols: ``ast`` for Python, a declaration regex for everything else."""
+    if len(data) > _MAX_PARSE_BYTES or b"\0" in data[:8192]:
+        return []
+    if language(rel) == "python":
+        found = _python_symbols(data)
+        if found is not None:
+            return found[:_MAX_SYMBOLS]
+    text = data.decode("utf-8", errors="replace")
+    seen: dict[str, None] = {}
+    for match in _GENERIC_SYMBOL.finditer(text):
+        seen.setdefault(match.group(1), None)
+        if len(seen) >= _MAX_SYMBOLS:
+            break
+    return list(seen)
+
+
+def _scan(item: tuple[str, str, int, int]) -> tuple[str, FileEntry | None]:
+    root, rel, size, mtime_ns = item
+    try:
+        data = (Path(root) / rel).read_bytes()
+    except OSError:
+        return rel, None
+    return rel, FileEntry(size, mtime_ns, hashlib.sha256(data).hexdigest(), language(rel), symbols(rel, data))
+
+
+class RepoIndex:
+    """Persistent per-repo file index: tree, sizes, languages and top-level symbols.
+
+    Stored as one JSON document in ``<repo>/.maestro/index/index.json``. Files
+    are re-read only when size or mtime changed, and re-parsed only when their
+    content hash changed; a large first build is parsed on a process pool.
+    """
+
+    def __init__(self, path: Path | None = None, files: dict[str, FileEntry] | None = None):
+        self.path = Path(path) if path is not None else None
+        self.files: dict[str, FileEntry] = files or {}
+
+    @classmethod
+    def load(cls, path: Path) -> "RepoIndex":
+        path = Path(path)
+        try:
+            raw = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return cls(path)
+        if raw.get("version") != INDEX_VERSION:
+            return cls(path)
+        return cls(path, {rel: FileEntry(**entry) for rel, entry in raw.get("files", {}).items()})
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"version": INDEX_VERSION, "files": {rel: asdict(e) for rel, e in sorted(self.files.items())}}
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=".tmp-", suffix=".json")
+        try:
+            with os.fdopen(fd, "w") as fh:
+                json.dump(payload, fh, separators=(",", ":"))
+            os.replace(tmp, self.path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    def _apply(self, root: Path, stats: dict[str, os.stat_result], workers: int | None = None) -> int:
+        """Re-scan the files in ``stats`` whose size/mtime differ from the index; returns how many were read."""
+        stale = []
+        racy_after = racy_cutoff_ns()
+        for rel, st in stats.items():
+            entry = self.files.get(rel)
+            if entry is None or entry.size != st.st_size or entry.mtime_ns != st.st_mtime_ns:
+                stale.append((str(root), rel, st.st_size, st.st_mtime_ns))
+        if len(stale) >= _PARALLEL_MIN_FILES and (workers or os.cpu_count() or 1) > 1:
+            # spawn, not fork: the orchestrator process may already run threads
+            # (run_async, the HF micro-batcher, branch fan-out).
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                scanned = list(pool.map(_scan, stale, chunksize=64))
+        else:
+            scanned = [_scan(item) for item in stale]
+        for rel, entry in scanned:
+            old = self.files.get(rel)
+            if entry is not None and entry.mtime_ns >= racy_after:
+                entry.mtime_ns = 0  # racily clean: never matches, so the file is read again next time
+            if entry is None:
+                self.files.pop(rel, None)
+            elif old is not None and old.sha256 == entry.sha256:
+                old.size, old.mtime_ns = entry.size, entry.mtime_ns  # touched, not changed
+            else:
+                self.files[rel] = entry
+        return len(stale)
+
+    def refresh(self, root: Path, workers: int | None = None) -> dict:
+        """Bring the index in line with the whole tree under ``root`` (stat walk plus changed files)."""
+        root = Path(root)
+        stats: dict[str, os.stat_result] = {}
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if d not in _IGNORED_DIRS]
+            rel_dir = Path(dirpath).relative_to(root)
+            for name in filenames:
+                path = Path(dirpath) / name
+                if path.is_symlink():
+                    continue
+                try:
+                    stats[(rel_dir / name).as_posix()] = path.stat()
+                except OSError:
+                    continue
+        removed = [rel for rel in self.files if rel not in stats]
+        for rel in removed:
+            del self.files[rel]
+        scanned = self._apply(root, stats, workers)
+        return {"files": len(self.files), "scanned": scanned, "removed": len(removed)}
+
+    def update(self, root: Path, paths: Iterable[str]) -> dict:
+        """Refresh only ``paths`` (e.g. the files a turn wrote); no tree walk."""
+        root = Path(root)
+        stats: dict[str, os.stat_result] = {}
+        removed = 0
+        for rel in dict.fromkeys(paths):
+            path = root / rel
+            if path.is_file() and not path.is_symlink():
+                stats[rel] = path.stat()
+            elif self.files.pop(rel, None) is not None:
+                removed += 1
+        return {"files": len(self.files), "scanned": self._apply(root, stats), "removed": removed}
+
+    def summary(self, max_chars: int, focus: Iterable[str] = ()) -> str:
+        """Compact tree-and-symbols overview of at most ``max_chars`` characters.
+
+        ``focus`` files come first, then files by depth and path; files that do
+        not fit are counted in a closing ``...`` line.
+        """
+        if max_chars <= 0 or not self.files:
+            return ""
+        langs = Counter(entry.lang for entry in self.files.values() if entry.lang != "other")
+        header = f"files={len(self.files)} langs=" + ",".join(f"{lang}:{n}" for lang, n in langs.most_common(6))
+        focus = [rel for rel in dict.fromkeys(focus) if rel in self.files]
+        focus_set = set(focus)
+        rest = sorted((rel for rel in self.files if rel not in focus_set), key=lambda r: (r.count("/"), r))
+        lines = [header]
+        used = len(header)
+        shown = 0
+        for rel in focus + rest:
+            entry = self.files[rel]
+            line = rel
+            if entry.symbols:
+                line += ": " + ", ".join(entry.symbols)
+            if used + 1 + len(line) > max_chars:
+                if rel in focus_set and used + 1 + len(rel) <= max_chars:
+                    line = rel  # keep the focus file listed, without symbols
+                else:
+                    continue
+            lines.append(line)
+            used += 1 + len(line)
+            shown += 1
+        hidden = len(self.files) - shown
+        if hidden:
+            more = f"... {hidden} more files"
+            while lines[1:] and used + 1 + len(more) > max_chars:
+                used -= 1 + len(lines.pop())
+                hidden += 1
+                more = f"... {hidden} more files"
+            lines.append(more)
+        return "\n".join(lines)[:max_chars]
+
+
+def refreshed_index(path: Path, root: Path) -> tuple[RepoIndex, dict]:
+    """Load the index at ``path``, bring it up to date with ``root`` and persist it."""
+    started = time.perf_counter()
+    index = RepoIndex.load(path)
+    stats = index.refresh(root)
+    if stats["scanned"] or stats["removed"] or not Path(path).exists():
+        index.save()
+    stats["ms"] = int((time.perf_counter() - started) * 1000)
+    return index, stats
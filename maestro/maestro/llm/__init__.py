@@ -1,15 +1,43 @@
 from __future__ import annotations
 
 from maestro.config import RunnerConfig
-from maestro.llm.hf_client import HFClient
-from maestro.llm.ollama_client import OllamaClient
+from maestro.llm.hf_client import AsyncHFClient, HFClient
+from maestro.llm.http_pool import AsyncHTTPConnectionPool, shared_pool
+from maestro.llm.ollama_client import AsyncOllamaClient, OllamaClient
+from maestro.tmps.grammar import TMPS_JSON_FIELD, tmps_json_schema
+from maestro.tmps.prefix import tmps_stream_stopper
 
 
-def build_validator_client(cfg: RunnerConfig):
+def build_validator_client(cfg: RunnerConfig, *, asynchronous: bool = False):
     if cfg.validator_backend == "hf":
-        return HFClient(adapter_path=cfg.validator_adapter_path)
-    return OllamaClient(cfg.ollama_host, timeout_s=cfg.ollama_timeout_s)
+        cls = AsyncHFClient if asynchronous else HFClient
+        return cls(
+            adapter_path=cfg.validator_adapter_path,
+            batch_window_ms=cfg.validator_batch_window_ms,
+            batch_max_size=cfg.validator_batch_max_size,
+            constrained=cfg.validator_constrained,
+            early_stop=cfg.validator_early_stop,
+        )
+    stop_factory = tmps_stream_stopper if cfg.validator_early_stop else None
+    constraint = {}
+    if cfg.validator_constrained:
+        constraint = {"format": tmps_json_schema(), "unwrap_field": TMPS_JSON_FIELD}
+    if asynchronous:
+        return AsyncOllamaClient(
+            cfg.ollama_host,
+            timeout_s=cfg.ollama_timeout_s,
+            stop_factory=stop_factory,
+            pool=AsyncHTTPConnectionPool(cfg.ollama_pool_size),
+            **constraint,
+        )
+    return OllamaClient(
+        cfg.ollama_host, timeout_s=cfg.ollama_timeout_s, stop_factory=stop_factory, pool=shared_pool(cfg.ollama_pool_size), **constraint
+    )
 
 
-def build_specialist_client(cfg: RunnerConfig):
-    return OllamaClient(cfg.ollama_host, timeout_s=cfg.ollama_timeout_s)
+def build_specialist_client(cfg: RunnerConfig, *, asynchronous: bool = False):
+    if asynchronous:
+        return AsyncOllamaClient(
+            cfg.ollama_host, timeout_s=cfg.ollama_timeout_s, pool=AsyncHTTPConnectionPool(cfg.ollama_pool_size)
+        )
+    return OllamaClient(cfg.ollama_host, timeout_s=cfg.ollama_timeout_s, pool=shared_pool(cfg.ollama_pool_size))
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+from typing import Callable
+
+from maestro.tmps.prefix import PREFIX_COMPLETE, PREFIX_INVALID, TMPSPrefixChecker
+
+# Tokens decoded together with each candidate, so that pieces whose text depends
+# on the preceding tokens (byte fallback, leading-space markers) decode correctly.
+_DETOKENIZE_CONTEXT = 6
+_SCAN_CHUNK = 256
+
+
+def eos_token_ids(tokenizer, model=None) -> set[int]:
+    ids: set[int] = set()
+    candidates = [getattr(tokenizer, "eos_token_id", None)]
+    generation_config = getattr(model, "generation_config", None)
+    if generation_config is not None:
+        candidates.append(getattr(generation_config, "eos_token_id", None))
+    for value in candidates:
+        if isinstance(value, int):
+            ids.add(value)
+        elif isinstance(value, (list, tuple)):
+            ids.update(int(v) for v in value)
+    return ids
+
+
+class TMPSLogitsProcessor:
+    """Logits processor that only lets a model emit valid TMP-S prefixes.
+
+    For every row the ``top_k`` highest-scoring tokens are tried against an
+    incremental prefix checker; if none keeps the record viable, the rest of the
+    vocabulary is scanned in score order. All other tokens are masked, and EOS is
+    only allowed once the record may end (forced once it is complete). Greedy
+    decoding therefore yields the most likely *valid* record; sampling is limited
+    to the valid tokens among the top-k.
+    """
+
+    def __init__(
+        self,
+        tokenizer,
+        prompt_len: int,
+        eos_ids: set[int],
+        checker_factory: Callable[[], object] = TMPSPrefixChecker,
+        top_k: int = 8,
+    ):
+        self.tokenizer = tokenizer
+        self.prompt_len = prompt_len
+        self.eos_ids = set(eos_ids)
+        self.checker_factory = checker_factory
+        self.top_k = max(1, top_k)
+        self._checkers: dict[int, object] = {}
+
+    def _decode(self, ids: list[int]) -> str:
+        return self.tokenizer.decode(ids, skip_special_tokens=True)
+
+    def _piece(self, generated: list[int], text: str, token: int) -> str:
+        tail = generated[-_DETOKENIZE_CONTEXT:]
+        base = self._decode(tail)
+        extended = self._decode(tail + [token])
+        if extended.startswith(base):
+            return extended[len(base) :]
+        return self._decode(generated + [token])[len(text) :]
+
+    def _allowed(
+        self, row: int, generated: list[int], head: list[int], rest: Callable[[], list[int]]
+    ) -> list[int] | None:
+        """Viable tokens among ``head`` (top-k ids) or else the first viable chunk of ``rest()``."""
+        checker = self._checkers.setdefault(row, self.checker_factory())
+        text = self._decode(generated)
+        status = checker.check(text)
+        if status.state == PREFIX_INVALID:
+            return None
+        if status.state == PREFIX_COMPLETE:
+            return sorted(self.eos_ids) or None
+
+        def viable(token: int) -> bool:
+            if token in self.eos_ids:
+                return status.can_end
+            piece = self._piece(generated, text, token)
+            return bool(piece) and checker.check(text + piece).state != PREFIX_INVALID
+
+        found = [t for t in head if viable(t)]
+        if found:
+            return found
+        order = rest()
+        for start in range(0, len(order), _SCAN_CHUNK):
+            found = [t for t in order[start : start + _SCAN_CHUNK] if viable(t)]
+            if found:
+                return found
+        return None
+
+    def __call__(self, input_ids, scores):
+        import torch
+
+        for row in range(scores.shape[0]):
+            generated = input_ids[row, self.prompt_len :].tolist()
+            if generated and generated[-1] in self.eos_ids:
+                continue  # finished row, generate() pads it
+            row_scores = scores[row]
+            top_k = min(self.top_k, row_scores.shape[-1])
+            allowed = self._allowed(
+                row,
+                generated,
+                torch.topk(row_scores, top_k).indices.tolist(),
+                lambda: torch.argsort(row_scores, descending=True).tolist()[top_k:],
+            )
+            if not allowed:
+                continue  # nothing keeps the record valid; let the parser report it
+            keep = torch.tensor(allowed, dtype=torch.long, device=scores.device)
+            masked = torch.full_like(scores[row], float("-inf"))
+            masked[keep] = scores[row, keep]
+            scores[row] = masked
+        return scores
+
+
+class TMPSStoppingCriteria:
+    """Stopping criteria that ends a row once its TMP-S record is complete or provably invalid.
+
+    Per-row outcomes are kept in ``reasons`` (``"tmps_complete"``/``"tmps_invalid"``),
+    ``new_tokens`` (tokens generated when the row stopped) and ``ends`` (character
+    offset just past the C line, for trimming a trailing newline).
+    """
+
+    def __init__(
+        self, tokenizer, prompt_len: int, checker_factory: Callable[[], object] = TMPSPrefixChecker
+    ):
+        self.tokenizer = tokenizer
+        self.prompt_len = prompt_len
+        self.checker_factory = checker_factory
+        self.reasons: dict[int, str] = {}
+        self.new_tokens: dict[int, int] = {}
+        self.ends: dict[int, int] = {}
+        self._checkers: dict[int, object] = {}
+
+    def row_done(self, row: int, generated: list[int]) -> bool:
+        if row in self.reasons:
+            return True
+        checker = self._checkers.setdefault(row, self.checker_factory())
+        status = checker.check(self.tokenizer.decode(generated, skip_special_tokens=True))
+        if status.state == PREFIX_COMPLETE:
+            self.reasons[row] = "tmps_complete"
+            self.ends[row] = status.end
+        elif status.state == PREFIX_INVALID:
+            self.reasons[row] = "tmps_invalid"
+        else:
+            return False
+        self.new_tokens[row] = len(generated)
+        return True
+
+    def __call__(self, input_ids, scores, **kwargs):
+        import torch
+
+        done = [self.row_done(row, input_ids[row, self.prompt_len :].tolist()) for row in range(input_ids.shape[0])]
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+    def stopped(self, row: int) -> tuple[str, int] | None:
+        reason = self.reasons.get(row)
+        return None if reason is None else (reason, self.new_tokens[row])
+
+
+def generation_stats(
+    generated: list[int], eos_ids: set[int], max_new_tokens: int, stopped: tuple[str, int] | None = None
+) -> dict:
+    """Token accounting for one generated row; ``stopped`` is ``TMPSStoppingCriteria.stopped(row)``."""
+    if stopped is not None:
+        reason, new_tokens = stopped
+    else:
+        eos_at = next((i for i, t in enumerate(generated) if t in eos_ids), None)
+        new_tokens = len(generated) if eos_at is None else eos_at + 1
+        reason = "max_new_tokens" if eos_at is None else "eos"
+    return {
+        "new_tokens": new_tokens,
+        "max_new_tokens": max_new_tokens,
+        "tokens_saved": max_new_tokens - new_tokens if stopped is not None else 0,
+        "stop_reason": reason,
+    }
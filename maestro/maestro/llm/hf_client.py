@@ -1,16 +1,165 @@
 from __future__ import annotations
 
-from threading import Lock
+import asyncio
+import copy
+import queue
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from threading import Lock, Thread
+from typing import Callable
+
+from maestro.llm.constrained import TMPSLogitsProcessor, TMPSStoppingCriteria, eos_token_ids, generation_stats
+from maestro.llm.metrics import CallMetrics
+
+_USER_SENTINEL = "\u0000MAESTRO_USER\u0000"
+
+
+@dataclass
+class GenerationRequest:
+    prompt: str
+    system: str | None
+    max_new_tokens: int
+    temperature: float
+    top_p: float
+    do_sample: bool
+    seed: int | None
+
+    @classmethod
+    def from_options(cls, prompt: str, options: dict | None, system: str | None) -> "GenerationRequest":
+        opts = dict(options or {})
+        max_new_tokens = int(opts.pop("max_new_tokens", opts.pop("num_predict", 512)))
+        return cls(
+            prompt=prompt,
+            system=system,
+            max_new_tokens=max(1, min(512, max_new_tokens)),
+            temperature=float(opts.pop("temperature", 0.0)),
+            top_p=float(opts.pop("top_p", 1.0)),
+            do_sample=bool(opts.pop("do_sample", False)),
+            seed=opts.pop("seed", None),
+        )
+
+    def batch_key(self) -> tuple:
+        # Requests can share a generate() call only if they decode identically.
+        # Greedy decoding ignores the seed, sampling does not.
+        sampling = (self.temperature, self.top_p, self.seed) if self.do_sample else None
+        return (self.max_new_tokens, self.do_sample, sampling)
+
+
+class MicroBatcher:
+    """Coalesces concurrent requests into batches formed within a short time window.
+
+    ``run_batch`` receives requests with equal ``batch_key()`` and must return one
+    result per request, in order. Callers block in :meth:`submit` until their
+    result (or the batch's exception) is available.
+    """
+
+    def __init__(self, run_batch: Callable[[list], list], window_ms: int, max_batch_size: int):
+        self.run_batch = run_batch
+        self.window_s = max(0, window_ms) / 1000
+        self.max_batch_size = max(1, max_batch_size)
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = Thread(target=self._worker, name="maestro-hf-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, request) -> object:
+        fut: Future = Future()
+        self._queue.put((request, fut))
+        return fut.result()
+
+    def _collect(self) -> list[tuple[object, Future]]:
+        items = [self._queue.get()]
+        deadline = time.monotonic() + self.window_s
+        while len(items) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return items
+
+    def _worker(self) -> None:
+        while True:
+            groups: dict[tuple, list[tuple[object, Future]]] = {}
+            for item in self._collect():
+                groups.setdefault(item[0].batch_key(), []).append(item)
+            for group in groups.values():
+                try:
+                    results = self.run_batch([req for req, _ in group])
+                except BaseException as err:  # delivered to every waiting caller
+                    for _, fut in group:
+                        fut.set_exception(err)
+                    continue
+                for (_, fut), result in zip(group, results):
+                    fut.set_result(result)
+
+
+class _FirstTokenTimer:
+    """Never stops generation; notes when the first token exists, which ends the prefill."""
+
+    def __init__(self):
+        self.at: float | None = None
+
+    def __call__(self, input_ids, scores, **kwargs):
+        import torch
+
+        if self.at is None:
+            self.at = time.perf_counter()
+        return torch.zeros(input_ids.shape[0], dtype=torch.bool, device=input_ids.device)
+
+
+@dataclass
+class PromptTemplate:
+    """Chat template rendered once per system prompt, split around the user content.
+
+    ``head_ids`` is the tokenized head and ``past_key_values`` its prefilled KV
+    cache, so each call only has to prefill the user content and the tail.
+    """
+
+    head: str
+    tail: str
+    add_special_tokens: bool
+    head_ids: list[int]
+    past_key_values: object | None = None
+
+    def render(self, prompt: str) -> str:
+        return f"{self.head}{prompt}{self.tail}"
+
+
+@dataclass
+class LoadedModel:
+    tokenizer: object
+    model: object
+    templates: dict[str | None, PromptTemplate] = field(default_factory=dict)
+    lock: Lock = field(default_factory=Lock)
 
 
 class HFClient:
-    _MODEL_CACHE: dict[tuple[str, str | None], tuple[object, object]] = {}
+    _MODEL_CACHE: dict[tuple[str, str | None], LoadedModel] = {}
     _CACHE_LOCK = Lock()
+    _BATCHERS: dict[tuple[str, str | None, bool, bool], MicroBatcher] = {}
 
-    def __init__(self, adapter_path: str | None = None):
+    def __init__(
+        self,
+        adapter_path: str | None = None,
+        batch_window_ms: int = 0,
+        batch_max_size: int = 1,
+        constrained: bool = False,
+        early_stop: bool = True,
+    ):
         self.adapter_path = adapter_path
+        self.batch_window_ms = batch_window_ms
+        self.batch_max_size = batch_max_size
+        self.constrained = constrained
+        self.early_stop = early_stop
 
     def _load_model(self, model: str) -> tuple[object, object]:
+        entry = self._load_entry(model)
+        return entry.tokenizer, entry.model
+
+    def _load_entry(self, model: str) -> LoadedModel:
         cache_key = (model, self.adapter_path)
         with self._CACHE_LOCK:
             cached = self._MODEL_CACHE.get(cache_key)
@@ -24,6 +173,7 @@ class HFClient:
             tokenizer = AutoTokenizer.from_pretrained(model, trust_remote_code=True)
             if tokenizer.pad_token is None:
                 tokenizer.pad_token = tokenizer.eos_token
+            tokenizer.padding_side = "left"
 
             base_model = AutoModelForCausalLM.from_pretrained(
                 model,
@@ -35,8 +185,22 @@ class HFClient:
             loaded_model = PeftModel.from_pretrained(base_model, self.adapter_path) if self.adapter_path else base_model
             loaded_model.eval()
 
-            self._MODEL_CACHE[cache_key] = (tokenizer, loaded_model)
-            return tokenizer, loaded_model
+            entry = LoadedModel(tokenizer, loaded_model)
+            self._MODEL_CACHE[cache_key] = entry
+            return entry
+
+    def _batcher(self, model: str) -> MicroBatcher:
+        # One batcher per loaded model, shared by every client in the process so that
+        # concurrent orchestrator runs validating against the same model coalesce.
+        cache_key = (model, self.adapter_path, self.constrained, self.early_stop)
+        with self._CACHE_LOCK:
+            batcher = self._BATCHERS.get(cache_key)
+            if batcher is None:
+                batcher = MicroBatcher(
+                    lambda reqs: self._generate_batch(model, reqs), self.batch_window_ms, self.batch_max_size
+                )
+                self._BATCHERS[cache_key] = batcher
+            return batcher
 
     @staticmethod
     def _build_prompt(prompt: str, system: str | None = None) -> str:
@@ -44,46 +208,175 @@ class HFClient:
             return f"{system}\n\n{prompt}"
         return prompt
 
+    def _template(self, entry: LoadedModel, system: str | None) -> PromptTemplate:
+        with entry.lock:
+            cached = entry.templates.get(system)
+            if cached is not None:
+                return cached
+            tokenizer = entry.tokenizer
+            try:
+                rendered = tokenizer.apply_chat_template(
+                    [
+                        {"role": "system", "content": system or ""},
+                        {"role": "user", "content": _USER_SENTINEL},
+                    ],
+                    add_generation_prompt=True,
+                    tokenize=False,
+                )
+                head, tail = rendered.split(_USER_SENTINEL, 1)
+                add_special_tokens = False
+            except Exception:
+                head, tail = self._build_prompt("", system), ""
+                add_special_tokens = True
+            head_ids = list(tokenizer(head, add_special_tokens=add_special_tokens)["input_ids"])
+            template = PromptTemplate(head, tail, add_special_tokens, head_ids)
+            entry.templates[system] = template
+            return template
+
+    @staticmethod
+    def _prefix_cache(entry: LoadedModel, template: PromptTemplate) -> object | None:
+        if not template.head_ids:
+            return None
+        with entry.lock:
+            if template.past_key_values is None:
+                import torch
+
+                head = torch.tensor([template.head_ids], dtype=torch.long)
+                model_device = getattr(entry.model, "device", None)
+                if model_device is not None:
+                    head = head.to(model_device)
+                with torch.inference_mode():
+                    template.past_key_values = entry.model(input_ids=head, use_cache=True).past_key_values
+            # generate() extends the cache in place, so every call works on its own copy.
+            return copy.deepcopy(template.past_key_values)
+
+    def _encode(self, entry: LoadedModel, req: GenerationRequest) -> tuple[list[int], PromptTemplate]:
+        template = self._template(entry, req.system)
+        ids = entry.tokenizer(template.render(req.prompt), add_special_tokens=template.add_special_tokens)["input_ids"]
+        return list(ids), template
+
+    def count_tokens(self, model: str, text: str) -> int | None:
+        """Token count with the model's tokenizer, or None while the model is not loaded yet."""
+        entry = self._MODEL_CACHE.get((model, self.adapter_path))
+        if entry is None:
+            return None
+        return len(entry.tokenizer(text, add_special_tokens=False)["input_ids"])
+
     def generate(self, model: str, prompt: str, options: dict | None = None, system: str | None = None) -> str:
-        tokenizer, loaded_model = self._load_model(model)
-        opts = dict(options or {})
-        seed = opts.pop("seed", None)
-        max_new_tokens = int(opts.pop("max_new_tokens", opts.pop("num_predict", 512)))
-        max_new_tokens = max(1, min(512, max_new_tokens))
-        temperature = float(opts.pop("temperature", 0.0))
-        top_p = float(opts.pop("top_p", 1.0))
-        do_sample = bool(opts.pop("do_sample", False))
+        return self._generate_with_stats(model, prompt, options, system)[0]
 
-        full_prompt = self._build_prompt(prompt, system)
+    def generate_with_stats(
+        self, model: str, prompt: str, options: dict | None = None, system: str | None = None
+    ) -> tuple[str, dict]:
+        """Like :meth:`generate`, also returning token counts and why generation stopped."""
+        return self._generate_with_stats(model, prompt, options, system)
+
+    def _generate_with_stats(
+        self, model: str, prompt: str, options: dict | None, system: str | None
+    ) -> tuple[str, dict]:
+        req = GenerationRequest.from_options(prompt, options, system)
+        if self.batch_max_size > 1:
+            return self._batcher(model).submit(req)
+        return self._generate_batch(model, [req])[0]
+
+    def _generate_batch(self, model: str, reqs: list[GenerationRequest]) -> list[tuple[str, dict]]:
+        started = time.perf_counter()
+        resident = (model, self.adapter_path) in self._MODEL_CACHE
+        entry = self._load_entry(model)
+        load_ms = 0.0 if resident else (time.perf_counter() - started) * 1000
+        tokenizer, loaded_model = entry.tokenizer, entry.model
 
         import torch
 
-        try:
-            inputs = tokenizer.apply_chat_template(
-                [
-                    {"role": "system", "content": system or ""},
-                    {"role": "user", "content": prompt},
-                ],
-                add_generation_prompt=True,
-                return_tensors="pt",
-            )
-        except Exception:
-            inputs = tokenizer(full_prompt, return_tensors="pt")["input_ids"]
+        encoded_with_templates = [self._encode(entry, req) for req in reqs]
+        encoded = [ids for ids, _ in encoded_with_templates]
+        width = max(len(ids) for ids in encoded)
+        pad_id = tokenizer.pad_token_id
+        input_ids = torch.full((len(encoded), width), pad_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(encoded), width), dtype=torch.long)
+        for row, ids in enumerate(encoded):
+            # Left padding keeps every prompt's last token adjacent to its generated tokens.
+            input_ids[row, width - len(ids) :] = torch.tensor(ids, dtype=torch.long)
+            attention_mask[row, width - len(ids) :] = 1
 
         model_device = getattr(loaded_model, "device", None)
-        if model_device is not None and hasattr(inputs, "to"):
-            inputs = inputs.to(model_device)
+        if model_device is not None:
+            input_ids = input_ids.to(model_device)
+            attention_mask = attention_mask.to(model_device)
+
+        extra: dict = {}
+        if len(reqs) == 1:
+            # Reuse the prefilled system-prompt prefix. Left padding shifts the prefix in
+            # batched calls, so batches prefill in full.
+            ids, template = encoded_with_templates[0]
+            head = template.head_ids
+            if head and len(ids) > len(head) and ids[: len(head)] == head:
+                extra["past_key_values"] = self._prefix_cache(entry, template)
+        eos_ids = eos_token_ids(tokenizer, loaded_model)
+        if self.constrained:
+            from transformers import LogitsProcessorList
 
-        if seed is not None:
-            torch.manual_seed(int(seed))
+            extra["logits_processor"] = LogitsProcessorList([TMPSLogitsProcessor(tokenizer, width, eos_ids)])
+        stopping = TMPSStoppingCriteria(tokenizer, width) if self.early_stop else None
+        first_token = _FirstTokenTimer()
+        from transformers import StoppingCriteriaList
 
+        extra["stopping_criteria"] = StoppingCriteriaList([first_token] + ([stopping] if stopping is not None else []))
+
+        first = reqs[0]
+        if first.seed is not None:
+            torch.manual_seed(int(first.seed))
+
+        generate_started = time.perf_counter()
         with torch.inference_mode():
             outputs = loaded_model.generate(
-                inputs,
-                do_sample=do_sample,
-                temperature=temperature,
-                top_p=top_p,
-                max_new_tokens=max_new_tokens,
+                input_ids,
+                attention_mask=attention_mask,
+                do_sample=first.do_sample,
+                temperature=first.temperature,
+                top_p=first.top_p,
+                max_new_tokens=first.max_new_tokens,
+                pad_token_id=pad_id,
+                **extra,
             )
-        generated = outputs[0][inputs.shape[-1] :]
-        return tokenizer.decode(generated, skip_special_tokens=True)
+        done = time.perf_counter()
+        prefill_end = first_token.at or done
+        # Load, prefill and decode are shared by the whole batch: each row is charged an even
+        # share, so summing calls (metrics.rollup) counts the batch once. wall_ms stays each
+        # caller's own latency.
+        size = len(reqs)
+
+        def share(seconds: float) -> float:
+            return round(seconds * 1000 / size, 3)
+
+        results = []
+        for row in range(len(reqs)):
+            generated = outputs[row][width:].tolist()
+            text = tokenizer.decode(generated, skip_special_tokens=True)
+            stopped = stopping.stopped(row) if stopping is not None else None
+            if stopping is not None and row in stopping.ends:
+                text = text[: stopping.ends[row]]
+            stats = generation_stats(generated, eos_ids, first.max_new_tokens, stopped)
+            metrics = CallMetrics(
+                prompt_tokens=len(encoded[row]),
+                new_tokens=stats["new_tokens"],
+                load_ms=round(load_ms / size, 3),
+                prefill_ms=share(prefill_end - generate_started),
+                decode_ms=share(done - prefill_end),
+                total_ms=share(done - started),
+                wall_ms=round((done - started) * 1000, 3),
+            )
+            results.append((text, {**stats, **metrics.to_dict(), "batch_size": size}))
+        return results
+
+
+class AsyncHFClient(HFClient):
+    """HFClient whose ``generate`` is awaitable; model loading and decoding run in a worker thread."""
+
+    async def generate(self, model: str, prompt: str, options: dict | None = None, system: str | None = None) -> str:
+        return (await self.generate_with_stats(model, prompt, options, system))[0]
+
+    async def generate_with_stats(
+        self, model: str, prompt: str, options: dict | None = None, system: str | None = None
+    ) -> tuple[str, dict]:
+        return await asyncio.to_thread(self._generate_with_stats, model, prompt, options, system)
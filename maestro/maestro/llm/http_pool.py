@@ -0,0 +1,317 @@
+from __future__ import annotations
+
+import asyncio
+import http.client
+import io
+import urllib.error
+import urllib.parse
+from collections import deque
+from threading import Lock
+
+_RETRYABLE = (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError, ConnectionAbortedError)
+
+
+class PooledResponse:
+    """File-like response that hands its connection back to the pool on close.
+
+    The connection is only reused when the body was read to the end and the
+    server did not ask to close it; otherwise it is dropped.
+    """
+
+    def __init__(self, pool: "HTTPConnectionPool", key: tuple[str, str, int], conn, resp: http.client.HTTPResponse):
+        self._pool = pool
+        self._key = key
+        self._conn = conn
+        self._resp = resp
+        self.status = resp.status
+        self.headers = resp.headers
+
+    def read(self) -> bytes:
+        return self._resp.read()
+
+    def __iter__(self):
+        while True:
+            line = self._resp.readline()
+            if not line:
+                return
+            yield line
+
+    def close(self) -> None:
+        if self._conn is None:
+            return
+        reusable = self._resp.isclosed() and not self._resp.will_close
+        if not reusable:
+            self._resp.close()
+        self._pool._release(self._key, self._conn, reusable)
+        self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class HTTPConnectionPool:
+    """Thread-safe keep-alive pool of ``http.client`` connections.
+
+    Up to ``maxsize`` idle connections are kept per (scheme, host, port).
+    Requests never block on the pool: when no idle connection is available a
+    new one is opened, and surplus connections are closed on release.
+    """
+
+    def __init__(self, maxsize: int = 4):
+        self.maxsize = max(1, int(maxsize))
+        self._idle: dict[tuple[str, str, int], deque] = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def _key(url: str) -> tuple[tuple[str, str, int], str]:
+        parts = urllib.parse.urlsplit(url)
+        scheme = parts.scheme or "http"
+        port = parts.port or (443 if scheme == "https" else 80)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        return (scheme, parts.hostname or "localhost", port), path
+
+    def _acquire(self, key: tuple[str, str, int], timeout: float) -> tuple[object, bool]:
+        with self._lock:
+            idle = self._idle.get(key)
+            conn = idle.pop() if idle else None
+        if conn is not None:
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            return conn, True
+        scheme, host, port = key
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return cls(host, port, timeout=timeout), False
+
+    def _release(self, key: tuple[str, str, int], conn, reusable: bool) -> None:
+        if reusable:
+            with self._lock:
+                idle = self._idle.setdefault(key, deque())
+                if len(idle) < self.maxsize:
+                    idle.append(conn)
+                    return
+        conn.close()
+
+    def idle_count(self, url: str) -> int:
+        key, _ = self._key(url)
+        with self._lock:
+            return len(self._idle.get(key, ()))
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+    def urlopen(self, url: str, *, data: bytes | None = None, headers: dict | None = None, timeout: float = 120) -> PooledResponse:
+        key, path = self._key(url)
+        method = "POST" if data is not None else "GET"
+        while True:
+            conn, reused = self._acquire(key, timeout)
+            try:
+                conn.request(method, path, body=data, headers=dict(headers or {}))
+                resp = conn.getresponse()
+                break
+            except _RETRYABLE:
+                conn.close()
+                if not reused:
+                    raise
+                # A pooled connection went stale (server-side idle timeout); retry on a fresh one.
+            except BaseException:
+                conn.close()
+                raise
+        pooled = PooledResponse(self, key, conn, resp)
+        if resp.status >= 400:
+            body = pooled.read()
+            pooled.close()
+            raise urllib.error.HTTPError(url, resp.status, resp.reason, resp.headers, io.BytesIO(body))
+        return pooled
+
+
+_SHARED_POOLS: dict[int, HTTPConnectionPool] = {}
+_SHARED_LOCK = Lock()
+
+
+def shared_pool(maxsize: int = 4) -> HTTPConnectionPool:
+    with _SHARED_LOCK:
+        pool = _SHARED_POOLS.get(maxsize)
+        if pool is None:
+            pool = HTTPConnectionPool(maxsize)
+            _SHARED_POOLS[maxsize] = pool
+        return pool
+
+
+class AsyncPooledResponse:
+    """Body reader for :class:`AsyncHTTPConnectionPool` (Content-Length, chunked or until EOF)."""
+
+    def __init__(self, pool: "AsyncHTTPConnectionPool", key, reader, writer, status: int, reason: str, headers: dict, timeout: float):
+        self._pool = pool
+        self._key = key
+        self._reader = reader
+        self._writer = writer
+        self._timeout = timeout
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self._chunked = "chunked" in headers.get("transfer-encoding", "").lower()
+        length = headers.get("content-length")
+        self._remaining = int(length) if length is not None and not self._chunked else None
+        self._will_close = headers.get("connection", "").lower() == "close" or (
+            not self._chunked and self._remaining is None
+        )
+        self._done = False
+
+    async def _io(self, coro):
+        return await asyncio.wait_for(coro, timeout=self._timeout)
+
+    async def iter_chunks(self):
+        if self._chunked:
+            while True:
+                size_line = await self._io(self._reader.readline())
+                size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+                if size == 0:
+                    while (await self._io(self._reader.readline())).strip():
+                        pass
+                    break
+                data = await self._io(self._reader.readexactly(size))
+                await self._io(self._reader.readline())
+                yield data
+        elif self._remaining is not None:
+            while self._remaining > 0:
+                data = await self._io(self._reader.read(min(self._remaining, 65536)))
+                if not data:
+                    raise ConnectionResetError("connection closed before end of body")
+                self._remaining -= len(data)
+                yield data
+        else:
+            while True:
+                data = await self._io(self._reader.read(65536))
+                if not data:
+                    break
+                yield data
+        self._done = True
+
+    async def read(self) -> bytes:
+        return b"".join([chunk async for chunk in self.iter_chunks()])
+
+    async def iter_lines(self):
+        buf = b""
+        async for chunk in self.iter_chunks():
+            buf += chunk
+            while b"\n" in buf:
+                line, buf = buf.split(b"\n", 1)
+                yield line + b"\n"
+        if buf:
+            yield buf
+
+    async def close(self) -> None:
+        if self._writer is None:
+            return
+        self._pool._release(self._key, self._reader, self._writer, self._done and not self._will_close)
+        self._writer = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+        return False
+
+
+class AsyncHTTPConnectionPool:
+    """asyncio counterpart of :class:`HTTPConnectionPool` for one event loop.
+
+    Speaks just enough HTTP/1.1 for the Ollama API (keep-alive, Content-Length
+    and chunked bodies). Connections opened on another loop are never reused.
+    """
+
+    def __init__(self, maxsize: int = 4):
+        self.maxsize = max(1, int(maxsize))
+        self._idle: dict[tuple, deque] = {}
+
+    def _release(self, key, reader, writer, reusable: bool) -> None:
+        if reusable:
+            idle = self._idle.setdefault(key, deque())
+            if len(idle) < self.maxsize:
+                idle.append((reader, writer))
+                return
+        writer.close()
+
+    async def _acquire(self, key, timeout: float):
+        idle = self._idle.get(key)
+        while idle:
+            reader, writer = idle.pop()
+            if writer.is_closing() or reader.at_eof():
+                writer.close()
+                continue
+            return reader, writer, True
+        _, scheme, host, port = key
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=scheme == "https" or None), timeout=timeout
+        )
+        return reader, writer, False
+
+    def close(self) -> None:
+        idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for _, writer in conns:
+                writer.close()
+
+    async def urlopen(self, url: str, *, data: bytes | None = None, headers: dict | None = None, timeout: float = 120) -> AsyncPooledResponse:
+        (scheme, host, port), path = HTTPConnectionPool._key(url)
+        # Streams are bound to the loop that opened them, so the loop is part of the key.
+        key = (id(asyncio.get_running_loop()), scheme, host, port)
+        method = "POST" if data is not None else "GET"
+        body = data or b""
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {host}:{port}", "Connection: keep-alive"]
+        lines += [f"{k}: {v}" for k, v in (headers or {}).items()]
+        if data is not None:
+            lines.append(f"Content-Length: {len(body)}")
+        request = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+        while True:
+            reader, writer, reused = await self._acquire(key, timeout)
+            try:
+                writer.write(request)
+                await asyncio.wait_for(writer.drain(), timeout=timeout)
+                status_line = await asyncio.wait_for(reader.readline(), timeout=timeout)
+                if not status_line:
+                    raise ConnectionResetError("connection closed before response")
+                break
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if not reused:
+                    raise
+                # A pooled connection went stale; retry on a fresh one.
+            except BaseException:
+                writer.close()
+                raise
+
+        try:
+            _version, status, *reason = status_line.decode("latin-1").split(None, 2)
+            resp_headers: dict[str, str] = {}
+            while True:
+                line = await asyncio.wait_for(reader.readline(), timeout=timeout)
+                if line in {b"\r\n", b"\n", b""}:
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                resp_headers[name.strip().lower()] = value.strip()
+        except BaseException:
+            writer.close()
+            raise
+
+        resp = AsyncPooledResponse(
+            self, key, reader, writer, int(status), reason[0].strip() if reason else "", resp_headers, timeout
+        )
+        if resp.status >= 400:
+            payload = await resp.read()
+            await resp.close()
+            raise urllib.error.HTTPError(url, resp.status, resp.reason, resp_headers, io.BytesIO(payload))
+        return resp
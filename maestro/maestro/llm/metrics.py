@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+
+_NS_PER_MS = 1_000_000
+_SUMMED = ("prompt_tokens", "new_tokens", "load_ms", "prefill_ms", "decode_ms", "total_ms", "wall_ms")
+
+
+def _rate(tokens: int | None, ms: float | None) -> float | None:
+    if not tokens or not ms:
+        return None
+    return round(tokens * 1000 / ms, 2)
+
+
+def _ms(ns: int | None) -> float | None:
+    return None if ns is None else round(ns / _NS_PER_MS, 3)
+
+
+@dataclass
+class CallMetrics:
+    """Token and timing accounting for one LLM call; fields a backend cannot measure stay None.
+
+    ``prefill_ms`` is prompt processing, ``decode_ms`` token generation,
+    ``load_ms`` the time spent loading the model for this call (0 when it was
+    already resident) and ``wall_ms`` the client-side duration of the call.
+    """
+
+    prompt_tokens: int | None = None
+    new_tokens: int | None = None
+    load_ms: float | None = None
+    prefill_ms: float | None = None
+    decode_ms: float | None = None
+    total_ms: float | None = None
+    wall_ms: float | None = None
+
+    @classmethod
+    def from_ollama(cls, body: dict, wall_ms: float) -> "CallMetrics":
+        """From the counters of Ollama's final ``/api/generate`` object (durations are in ns)."""
+        return cls(
+            prompt_tokens=body.get("prompt_eval_count"),
+            new_tokens=body.get("eval_count"),
+            load_ms=_ms(body.get("load_duration")),
+            prefill_ms=_ms(body.get("prompt_eval_duration")),
+            decode_ms=_ms(body.get("eval_duration")),
+            total_ms=_ms(body.get("total_duration")),
+            wall_ms=round(wall_ms, 3),
+        )
+
+    def to_dict(self) -> dict:
+        out = asdict(self)
+        out["prefill_tok_s"] = _rate(self.prompt_tokens, self.prefill_ms)
+        out["decode_tok_s"] = _rate(self.new_tokens, self.decode_ms)
+        return out
+
+
+def _empty() -> dict:
+    return {"calls": 0, "cached": 0, **{key: 0 for key in _SUMMED}, "max_load_ms": 0}
+
+
+def _add(total: dict, call: dict) -> None:
+    total["calls"] += 1
+    if call.get("cached"):
+        total["cached"] += 1
+        return
+    for key in _SUMMED:
+        total[key] += call.get(key) or 0
+    total["max_load_ms"] = max(total["max_load_ms"], call.get("load_ms") or 0)
+
+
+def _finish(total: dict) -> dict:
+    for key in _SUMMED + ("max_load_ms",):
+        if isinstance(total[key], float):
+            total[key] = round(total[key], 3)
+    total["prefill_tok_s"] = _rate(total["prompt_tokens"], total["prefill_ms"])
+    total["decode_tok_s"] = _rate(total["new_tokens"], total["decode_ms"])
+    return total
+
+
+def rollup(calls: list[dict]) -> dict:
+    """Per ``role``/``model`` and overall sums of call metrics; cache hits are counted but not summed."""
+    overall = _empty()
+    groups: dict[str, dict] = {}
+    for call in calls:
+        _add(overall, call)
+        _add(groups.setdefault(f"{call.get('role')}:{call.get('model')}", _empty()), call)
+    return {"total": _finish(overall), "by_model": {key: _finish(groups[key]) for key in sorted(groups)}}
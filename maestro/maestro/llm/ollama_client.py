@@ -1,25 +1,210 @@
 from __future__ import annotations
 
 import json
-import urllib.request
+import time
+from typing import Callable
+
+from maestro.llm.http_pool import AsyncHTTPConnectionPool, HTTPConnectionPool, shared_pool
+from maestro.llm.metrics import CallMetrics
+from maestro.tmps.grammar import unwrap_json_field
+
+StopFn = Callable[[str], "int | None"]
+
+
+def _payload(
+    model: str, prompt: str, options: dict | None, system: str | None, stream: bool, fmt: dict | str | None = None
+) -> dict:
+    payload = {"model": model, "prompt": prompt, "stream": stream}
+    if options:
+        payload["options"] = options
+    if system:
+        payload["system"] = system
+    if fmt is not None:
+        payload["format"] = fmt
+    return payload
+
+
+def _response(text: str, unwrap_field: str | None) -> str:
+    return unwrap_json_field(text, unwrap_field) if unwrap_field else text
+
+
+def _feed(text: str, line: bytes, stop: StopFn, final: dict | None = None) -> tuple[str, str | None]:
+    """Append one NDJSON stream chunk to ``text``.
+
+    Returns the new text and ``"stop"`` when the stop callback cut the output,
+    ``"done"`` when the server finished, or None to keep reading. ``final``
+    collects the server's closing counters, or the number of streamed chunks
+    (one per token) as ``eval_count`` while the stream is still open.
+    """
+    if not line.strip():
+        return text, None
+    chunk = json.loads(line.decode("utf-8"))
+    piece = chunk.get("response", "")
+    if final is not None:
+        if chunk.get("done"):
+            final.update(chunk)
+        elif piece:
+            final["eval_count"] = final.get("eval_count", 0) + 1
+    if piece:
+        text += piece
+        cut = stop(text)
+        if cut is not None:
+            return text[:cut], "stop"
+    return text, "done" if chunk.get("done") else None
 
 
 class OllamaClient:
-    def __init__(self, host: str, timeout_s: int = 120):
+    def __init__(
+        self,
+        host: str,
+        timeout_s: int = 120,
+        stop: StopFn | None = None,
+        pool: HTTPConnectionPool | None = None,
+        format: dict | str | None = None,
+        unwrap_field: str | None = None,
+        stop_factory: Callable[[], StopFn] | None = None,
+    ):
+        self.host = host.rstrip("/")
+        self.timeout_s = timeout_s
+        self.stop = stop
+        # Called once per streamed request for a fresh, possibly stateful, stop callback.
+        self.stop_factory = stop_factory
+        self.pool = pool or shared_pool()
+        # ``format`` is Ollama's structured-output constraint ("json" or a JSON schema).
+        # With ``unwrap_field`` the response is that field of the returned object.
+        self.format = format
+        self.unwrap_field = unwrap_field
+
+    def _post(self, payload: dict):
+        return self.pool.urlopen(
+            f"{self.host}/api/generate",
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            timeout=self.timeout_s,
+        )
+
+    def generate(
+        self,
+        model: str,
+        prompt: str,
+        options: dict | None = None,
+        system: str | None = None,
+        stop: StopFn | None = None,
+    ) -> str:
+        return self.generate_with_stats(model, prompt, options, system, stop)[0]
+
+    def generate_with_stats(
+        self,
+        model: str,
+        prompt: str,
+        options: dict | None = None,
+        system: str | None = None,
+        stop: StopFn | None = None,
+    ) -> tuple[str, dict]:
+        """Like :meth:`generate`, also returning the call's :class:`CallMetrics` as a dict.
+
+        A stream cut short by ``stop`` never receives Ollama's counters; its
+        metrics hold the streamed token count and the wall time only.
+        """
+        if stop is None:
+            stop = self.stop_factory() if self.stop_factory is not None else self.stop
+        if self.format is not None:
+            stop = None  # the format grammar ends the response; the stop callback sees wrapped text
+        payload = _payload(model, prompt, options, system, stream=stop is not None, fmt=self.format)
+        started = time.perf_counter()
+        if stop is not None:
+            text, body = self._generate_stream(payload, stop)
+        else:
+            with self._post(payload) as resp:
+                body = json.loads(resp.read().decode("utf-8"))
+            text = _response(body.get("response", ""), self.unwrap_field)
+        return text, CallMetrics.from_ollama(body, (time.perf_counter() - started) * 1000).to_dict()
+
+    def _generate_stream(self, payload: dict, stop: StopFn) -> tuple[str, dict]:
+        # Ollama streams one JSON object per line. Leaving the `with` block before
+        # the body is drained drops the connection, which makes the server abort
+        # the generation; fully read responses return their connection to the pool.
+        text = ""
+        final: dict = {}
+        with self._post(payload) as resp:
+            for line in resp:
+                text, state = _feed(text, line, stop, final)
+                if state == "done":
+                    resp.read()
+                if state is not None:
+                    break
+        return text, final
+
+
+class AsyncOllamaClient:
+    """asyncio-native variant of :class:`OllamaClient` with the same ``generate`` signature."""
+
+    def __init__(
+        self,
+        host: str,
+        timeout_s: int = 120,
+        stop: StopFn | None = None,
+        pool: AsyncHTTPConnectionPool | None = None,
+        format: dict | str | None = None,
+        unwrap_field: str | None = None,
+        stop_factory: Callable[[], StopFn] | None = None,
+    ):
         self.host = host.rstrip("/")
         self.timeout_s = timeout_s
+        self.stop = stop
+        self.stop_factory = stop_factory
+        self.pool = pool or AsyncHTTPConnectionPool()
+        self.format = format
+        self.unwrap_field = unwrap_field
 
-    def generate(self, model: str, prompt: str, options: dict | None = None, system: str | None = None) -> str:
-        payload = {"model": model, "prompt": prompt, "stream": False}
-        if options:
-            payload["options"] = options
-        if system:
-            payload["system"] = system
-        req = urllib.request.Request(
+    async def _post(self, payload: dict):
+        return await self.pool.urlopen(
             f"{self.host}/api/generate",
             data=json.dumps(payload).encode("utf-8"),
             headers={"Content-Type": "application/json"},
+            timeout=self.timeout_s,
         )
-        with urllib.request.urlopen(req, timeout=self.timeout_s) as resp:
-            body = json.loads(resp.read().decode("utf-8"))
-        return body.get("response", "")
+
+    async def generate(
+        self,
+        model: str,
+        prompt: str,
+        options: dict | None = None,
+        system: str | None = None,
+        stop: StopFn | None = None,
+    ) -> str:
+        return (await self.generate_with_stats(model, prompt, options, system, stop))[0]
+
+    async def generate_with_stats(
+        self,
+        model: str,
+        prompt: str,
+        options: dict | None = None,
+        system: str | None = None,
+        stop: StopFn | None = None,
+    ) -> tuple[str, dict]:
+        if stop is None:
+            stop = self.stop_factory() if self.stop_factory is not None else self.stop
+        if self.format is not None:
+            stop = None
+        payload = _payload(model, prompt, options, system, stream=stop is not None, fmt=self.format)
+        started = time.perf_counter()
+        if stop is not None:
+            text, body = await self._generate_stream(payload, stop)
+        else:
+            async with await self._post(payload) as resp:
+                body = json.loads((await resp.read()).decode("utf-8"))
+            text = _response(body.get("response", ""), self.unwrap_field)
+        return text, CallMetrics.from_ollama(body, (time.perf_counter() - started) * 1000).to_dict()
+
+    async def _generate_stream(self, payload: dict, stop: StopFn) -> tuple[str, dict]:
+        text = ""
+        final: dict = {}
+        async with await self._post(payload) as resp:
+            async for line in resp.iter_lines():
+                text, state = _feed(text, line, stop, final)
+                if state == "done":
+                    await resp.read()
+                if state is not None:
+                    break
+        return text, final
@@ -45,11 +45,21 @@ Your job:
 Given the request, latest artifact, patch apply status, checks results, and context snippets, emit the next TMP-S record that drives the orchestrator toward Accept or Escalate."""
 
 
-def build_specialist_prompt(strategy: int, agent: str, request: str, last_tmps_record_raw: str, delta: str, task: str) -> str:
+def build_specialist_prompt(
+    strategy: int,
+    agent: str,
+    request: str,
+    last_tmps_record_raw: str,
+    delta: str,
+    task: str,
+    repo_summary: str = "",
+) -> str:
+    repo = f"[REPO] {repo_summary}\n" if repo_summary else ""
     if strategy == 5:
         return (
             f"[SYSTEM] You are {agent}. Answer ONLY with a minimal patch.\n"
             f"[CONTEXT] Request summary: {request[:700]}\n"
+            f"{repo}"
             f"[VALIDATOR] {last_tmps_record_raw}\n"
             f"[DELTA] {delta}\n"
             f"[TASK] {task}\n\n"
@@ -60,6 +70,7 @@ def build_specialist_prompt(strategy: int, agent: str, request: str, last_tmps_r
     return (
         f"[SYSTEM] You are {agent}. Solve ONLY the described subproblem.\n"
         f"[CONTEXT] Original request: {request}\n"
+        f"{repo}"
         f"[VALIDATOR] {last_tmps_record_raw}\n"
         f"[DELTA] {delta}\n"
         f"[TASK] {task}"
@@ -8,6 +8,5 @@ class RunLogger:
         self.run_root = run_root
 
     def turn_dir(self, turn: int) -> Path:
-        path = self.run_root / "turns" / str(turn)
-        path.mkdir(parents=True, exist_ok=True)
-        return path
+        # Not created here: the store makes it on the first write, on its writer thread when async.
+        return self.run_root / "turns" / str(turn)
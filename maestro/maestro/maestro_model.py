@@ -5,7 +5,10 @@ from typing import Optional
 
 import torch
 from peft import PeftModel
-from transformers import AutoModelForCausalLM, AutoTokenizer
+from transformers import AutoModelForCausalLM, AutoTokenizer, LogitsProcessorList, StoppingCriteriaList
+
+from maestro.llm.constrained import TMPSLogitsProcessor, TMPSStoppingCriteria, eos_token_ids, generation_stats
+from maestro.tmps.prefix import LegacyTMPSPrefixChecker
 
 LOGGER = logging.getLogger(__name__)
 
@@ -25,7 +28,8 @@ SYSTEM_ROLE = (
 
 
 class TMPSValidatorModel:
-    def __init__(self, base_model: str, adapter_path: str):
+    def __init__(self, base_model: str, adapter_path: str, constrained: bool = False):
+        self.constrained = constrained
         self.tokenizer = AutoTokenizer.from_pretrained(base_model, trust_remote_code=True)
         base = AutoModelForCausalLM.from_pretrained(
             base_model,
@@ -38,6 +42,9 @@ class TMPSValidatorModel:
         torch.manual_seed(42)
 
     def generate_tmps(self, user_input: str, repair_instruction: Optional[str] = None) -> str:
+        return self.generate_tmps_with_stats(user_input, repair_instruction)[0]
+
+    def generate_tmps_with_stats(self, user_input: str, repair_instruction: Optional[str] = None) -> tuple[str, dict]:
         messages = [{"role": "system", "content": SYSTEM_ROLE}]
         if repair_instruction:
             messages.append({"role": "system", "content": repair_instruction})
@@ -49,6 +56,14 @@ class TMPSValidatorModel:
             add_generation_prompt=True,
         )
         inputs = self.tokenizer(prompt, return_tensors="pt").to(self.model.device)
+        prompt_len = inputs["input_ids"].shape[1]
+        eos_ids = eos_token_ids(self.tokenizer, self.model)
+        stopping = TMPSStoppingCriteria(self.tokenizer, prompt_len, checker_factory=LegacyTMPSPrefixChecker)
+        extra = {"stopping_criteria": StoppingCriteriaList([stopping])}
+        if self.constrained:
+            extra["logits_processor"] = LogitsProcessorList(
+                [TMPSLogitsProcessor(self.tokenizer, prompt_len, eos_ids, checker_factory=LegacyTMPSPrefixChecker)]
+            )
 
         with torch.inference_mode():
             output_ids = self.model.generate(
@@ -58,9 +73,12 @@ class TMPSValidatorModel:
                 top_p=1.0,
                 repetition_penalty=1.0,
                 max_new_tokens=512,
+                **extra,
             )
 
-        generated = output_ids[0][inputs["input_ids"].shape[1] :]
+        generated = output_ids[0][prompt_len:].tolist()
         text = self.tokenizer.decode(generated, skip_special_tokens=True).strip()
+        stats = generation_stats(generated, eos_ids, 512, stopping.stopped(0))
         LOGGER.info("Raw LLM output: %s", text)
-        return text
+        LOGGER.info("Generation stats: %s", stats)
+        return text, stats
@@ -1,36 +1,354 @@
 from __future__ import annotations
 
+import asyncio
+import os
+import re
+import signal
 import subprocess
+import tempfile
 import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from pathlib import Path
+from threading import Lock
 
-from maestro.config import RunnerConfig
+from maestro.config import CommandCheck, RunnerConfig
+from maestro.orch.impact import affected_checks
+from maestro.trace import NULL_TRACER
 
 
-def run_checks(repo: Path, cfg: RunnerConfig, patch_applied: bool) -> dict:
-    commands = []
-    all_ok = True
-    for chk in cfg.checks:
-        start = time.time()
-        p = subprocess.run(chk.cmd, shell=True, cwd=repo / chk.cwd, capture_output=True, text=True, timeout=chk.timeout_s)
-        duration_ms = int((time.time() - start) * 1000)
-        ok = p.returncode == 0
-        if chk.required and not ok:
-            all_ok = False
-        commands.append(
-            {
-                "name": chk.name,
-                "exit_code": p.returncode,
-                "duration_ms": duration_ms,
-                "stdout_tail": p.stdout[-400:],
-                "stderr_tail": p.stderr[-400:],
-            }
-        )
+def _command_result(
+    chk: CommandCheck, exit_code: int | None, duration_ms: int, stdout: str, stderr: str, tail_chars: int = 400
+) -> dict:
     return {
+        "name": chk.name,
+        "exit_code": exit_code,
+        "duration_ms": duration_ms,
+        "stdout_tail": stdout[-tail_chars:] if tail_chars else "",
+        "stderr_tail": stderr[-tail_chars:] if tail_chars else "",
+    }
+
+
+class _Capture:
+    """Check stdout/stderr written straight to files, so memory use does not grow with output.
+
+    With ``log_dir`` the files are kept as ``<log_dir>/<n>_<name>.{stdout,stderr}.log``
+    and reported relative to the directory holding ``checks.json``; otherwise
+    they are anonymous temp files. Only the last ``tail_chars`` characters are
+    read back.
+    """
+
+    def __init__(self, log_dir: Path | None, idx: int, chk: CommandCheck, tail_chars: int):
+        self.tail_chars = tail_chars
+        self.paths: dict[str, Path] = {}
+        self.files = {}
+        if log_dir is not None:
+            log_dir.mkdir(parents=True, exist_ok=True)
+            stem = f"{idx}_{re.sub(r'[^A-Za-z0-9_.-]', '_', chk.name)}"
+        for stream in ("stdout", "stderr"):
+            if log_dir is None:
+                self.files[stream] = tempfile.TemporaryFile()
+            else:
+                self.paths[stream] = log_dir / f"{stem}.{stream}.log"
+                self.files[stream] = open(self.paths[stream], "w+b")
+
+    def _tail(self, stream: str) -> tuple[str, int]:
+        fh = self.files[stream]
+        fh.flush()
+        size = os.fstat(fh.fileno()).st_size
+        # Up to 4 bytes per UTF-8 character; a split leading character decodes as U+FFFD and is cut off.
+        fh.seek(max(0, size - self.tail_chars * 4))
+        text = fh.read().decode("utf-8", errors="replace")
+        return text[-self.tail_chars:] if self.tail_chars else "", size
+
+    def result(self, chk: CommandCheck, exit_code: int, duration_ms: int) -> dict:
+        (stdout, stdout_bytes), (stderr, stderr_bytes) = self._tail("stdout"), self._tail("stderr")
+        result = _command_result(chk, exit_code, duration_ms, stdout, stderr, self.tail_chars)
+        result["stdout_bytes"] = stdout_bytes
+        result["stderr_bytes"] = stderr_bytes
+        for stream, path in self.paths.items():
+            result[f"{stream}_log"] = f"{path.parent.name}/{path.name}"
+        return result
+
+    def close(self) -> None:
+        for fh in self.files.values():
+            fh.close()
+
+
+def _not_run(chk: CommandCheck, status: str, reason: str) -> dict:
+    result = _command_result(chk, None, 0, "", "")
+    result.update({"status": status, "reason": reason})
+    return result
+
+
+def _passed(result: dict) -> bool:
+    # A check the changed paths cannot affect counts as passing.
+    return result["exit_code"] == 0 or result.get("unaffected", False)
+
+
+def _summarize(
+    cfg: RunnerConfig, commands: list[dict], patch_applied: bool, wall_ms: int = 0, changed: list[str] | None = None
+) -> dict:
+    all_ok = all(_passed(cmd) for chk, cmd in zip(cfg.checks, commands) if chk.required)
+    summary = {
         "patch_applied": patch_applied,
         "format_ok": all_ok if commands else None,
         "lint_ok": all_ok if commands else None,
         "tests_ok": all_ok if commands else None,
         "summary": "ok" if all_ok and patch_applied else "failed",
+        "wall_ms": wall_ms,
         "commands": commands,
     }
+    if changed is not None:
+        summary["impact"] = {
+            "changed": sorted(changed),
+            "skipped": [cmd["name"] for cmd in commands if cmd.get("unaffected")],
+        }
+    return summary
+
+
+class _Schedule:
+    """Decides which checks may start, given ``depends_on``, ``parallel`` and fail-fast.
+
+    A check starts once all its dependencies exited 0; if one did not, it is
+    skipped. ``parallel=False`` checks run alone, so a config without these
+    settings runs its checks one after another, in order. Both runners drive
+    the same schedule, so they start checks in the same order.
+    """
+
+    def __init__(self, checks: list[CommandCheck], workers: int, fail_fast: bool, selected: list[bool] | None = None):
+        self.checks = checks
+        self.workers = max(1, workers)
+        self.fail_fast = fail_fast
+        self.index = {chk.name: idx for idx, chk in enumerate(checks)}
+        self.results: dict[int, dict] = {}
+        for idx, run in enumerate(selected or []):
+            if not run:
+                self.results[idx] = _not_run(checks[idx], "skipped", "unaffected")
+                self.results[idx]["unaffected"] = True
+        self.running: set[int] = set()
+        self.failed_fast = False
+
+    @property
+    def done(self) -> bool:
+        return len(self.results) == len(self.checks)
+
+    def _blocked(self, idx: int) -> str | None:
+        for dep in self.checks[idx].depends_on:
+            result = self.results.get(self.index[dep])
+            if result is not None and not _passed(result):
+                return dep
+        return None
+
+    def _ready(self, idx: int) -> bool:
+        return all(self.index[dep] in self.results for dep in self.checks[idx].depends_on)
+
+    def startable(self) -> list[int]:
+        """Mark newly blocked checks as skipped and return the checks to start now, in config order."""
+        pending = [idx for idx in range(len(self.checks)) if idx not in self.results and idx not in self.running]
+        for idx in pending:
+            if self.failed_fast:
+                self.results[idx] = _not_run(self.checks[idx], "skipped", "fail-fast")
+            elif (dep := self._blocked(idx)) is not None:
+                self.results[idx] = _not_run(self.checks[idx], "skipped", f"dependency {dep} failed")
+        if self.failed_fast:
+            return []
+        # A skipped check blocks its own dependents in turn.
+        if any(idx in self.results for idx in pending):
+            return self.startable()
+
+        start: list[int] = []
+        exclusive_running = any(not self.checks[idx].parallel for idx in self.running)
+        for idx in pending:
+            if exclusive_running or len(self.running) + len(start) >= self.workers or not self._ready(idx):
+                continue
+            if not self.checks[idx].parallel:
+                if not self.running and not start:
+                    start.append(idx)
+                break
+            start.append(idx)
+        return start
+
+    def finish(self, idx: int, result: dict) -> bool:
+        """Record a result; returns True when running checks should be cancelled."""
+        self.running.discard(idx)
+        result["status"] = "ok" if result["exit_code"] == 0 else "failed"
+        self.results[idx] = result
+        if self.fail_fast and result["exit_code"] != 0 and self.checks[idx].required and not self.failed_fast:
+            self.failed_fast = True
+            return bool(self.running)
+        return False
+
+    def cancelled(self, idx: int, duration_ms: int) -> None:
+        self.running.discard(idx)
+        result = _not_run(self.checks[idx], "cancelled", "fail-fast")
+        result["duration_ms"] = duration_ms
+        self.results[idx] = result
+
+    def commands(self) -> list[dict]:
+        return [self.results[idx] for idx in range(len(self.checks))]
+
+
+def _kill(proc) -> None:
+    """Kill a check's whole process group; ``sh -c`` children would otherwise outlive it."""
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _workers() -> int:
+    return os.cpu_count() or 1
+
+
+def _schedule(repo: Path, cfg: RunnerConfig, changed: list[str] | None) -> _Schedule:
+    selected = affected_checks(repo, cfg.checks, changed) if changed is not None else None
+    return _Schedule(cfg.checks, min(_workers(), len(cfg.checks) or 1), cfg.checks_fail_fast, selected)
+
+
+def run_checks(
+    repo: Path,
+    cfg: RunnerConfig,
+    patch_applied: bool,
+    changed: list[str] | None = None,
+    log_dir: Path | None = None,
+    tracer=NULL_TRACER,
+) -> dict:
+    """Run ``cfg.checks`` in ``repo``; with ``changed``, only the checks those paths can affect.
+
+    Full output goes to per-check files in ``log_dir`` (if given); results keep a
+    ``cfg.check_tail_chars`` tail of each stream. Each check that runs is a span
+    on its own ``tracer`` lane.
+    """
+    wall_start = time.time()
+    schedule = _schedule(repo, cfg, changed)
+    procs: dict[int, subprocess.Popen] = {}
+    cancelled: set[int] = set()
+    lock = Lock()
+
+    def run_one(idx: int) -> dict:
+        chk = cfg.checks[idx]
+        start = time.time()
+        with lock:
+            if idx in cancelled:
+                return _not_run(chk, "cancelled", "fail-fast")
+        with tracer.track(f"check {chk.name}").span(chk.name, cat="check") as span:
+            capture = _Capture(log_dir, idx, chk, cfg.check_tail_chars)
+            try:
+                with lock:
+                    proc = subprocess.Popen(
+                        chk.cmd,
+                        shell=True,
+                        cwd=repo / chk.cwd,
+                        stdout=capture.files["stdout"],
+                        stderr=capture.files["stderr"],
+                        start_new_session=True,
+                    )
+                    procs[idx] = proc
+                try:
+                    proc.wait(timeout=chk.timeout_s)
+                except subprocess.TimeoutExpired:
+                    _kill(proc)
+                    proc.wait()
+                    raise subprocess.TimeoutExpired(chk.cmd, chk.timeout_s) from None
+                finally:
+                    with lock:
+                        procs.pop(idx, None)
+                span.set(exit_code=proc.returncode)
+                duration_ms = int((time.time() - start) * 1000)
+                return capture.result(chk, proc.returncode, duration_ms)
+            finally:
+                capture.close()
+
+    def cancel_running() -> None:
+        with lock:
+            cancelled.update(schedule.running)
+            for proc in procs.values():
+                _kill(proc)
+
+    futures: dict[Future, tuple[int, float]] = {}
+    with ThreadPoolExecutor(max_workers=schedule.workers, thread_name_prefix="maestro-check") as pool:
+        try:
+            while not schedule.done:
+                for idx in schedule.startable():
+                    schedule.running.add(idx)
+                    futures[pool.submit(run_one, idx)] = (idx, time.time())
+                if not futures:
+                    continue
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    idx, started = futures.pop(fut)
+                    result = fut.result()
+                    if idx in cancelled and result["exit_code"] != 0:
+                        schedule.cancelled(idx, int((time.time() - started) * 1000))
+                    elif schedule.finish(idx, result):
+                        cancel_running()
+        except BaseException:
+            cancel_running()
+            raise
+    return _summarize(cfg, schedule.commands(), patch_applied, int((time.time() - wall_start) * 1000), changed)
+
+
+async def _run_one_async(
+    repo: Path, idx: int, chk: CommandCheck, log_dir: Path | None, tail_chars: int, tracer=NULL_TRACER
+) -> dict:
+    start = time.time()
+    with tracer.track(f"check {chk.name}").span(chk.name, cat="check") as span:
+        capture = _Capture(log_dir, idx, chk, tail_chars)
+        try:
+            proc = await asyncio.create_subprocess_shell(
+                chk.cmd,
+                cwd=repo / chk.cwd,
+                stdout=capture.files["stdout"],
+                stderr=capture.files["stderr"],
+                start_new_session=True,
+            )
+            try:
+                await asyncio.wait_for(proc.wait(), timeout=chk.timeout_s)
+            except asyncio.TimeoutError:
+                _kill(proc)
+                await proc.wait()
+                raise subprocess.TimeoutExpired(chk.cmd, chk.timeout_s) from None
+            except asyncio.CancelledError:
+                _kill(proc)
+                await proc.wait()
+                raise
+            span.set(exit_code=proc.returncode)
+            duration_ms = int((time.time() - start) * 1000)
+            return capture.result(chk, proc.returncode, duration_ms)
+        finally:
+            capture.close()
+
+
+async def run_checks_async(
+    repo: Path,
+    cfg: RunnerConfig,
+    patch_applied: bool,
+    changed: list[str] | None = None,
+    log_dir: Path | None = None,
+    tracer=NULL_TRACER,
+) -> dict:
+    wall_start = time.time()
+    schedule = await asyncio.to_thread(_schedule, repo, cfg, changed)
+    tasks: dict[asyncio.Task, tuple[int, float]] = {}
+    try:
+        while not schedule.done:
+            for idx in schedule.startable():
+                schedule.running.add(idx)
+                run = _run_one_async(repo, idx, cfg.checks[idx], log_dir, cfg.check_tail_chars, tracer)
+                tasks[asyncio.ensure_future(run)] = (idx, time.time())
+            if not tasks:
+                continue
+            finished, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                idx, started = tasks.pop(task)
+                if task.cancelled():
+                    schedule.cancelled(idx, int((time.time() - started) * 1000))
+                elif schedule.finish(idx, task.result()):
+                    for other in tasks:
+                        other.cancel()
+    finally:
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+    return _summarize(cfg, schedule.commands(), patch_applied, int((time.time() - wall_start) * 1000), changed)
@@ -1,6 +1,152 @@
 from __future__ import annotations
 
 import json
+import re
+
+_SID_PLACEHOLDER = "<sid>"
+_RUNID_PLACEHOLDER = "<runid>"
+
+
+_TOKEN_PIECE = re.compile(r"[A-Za-z]+|\d{1,3}|\n[ \t]*|[ \t]{2,}|[^\sA-Za-z\d]")
+
+# (tag, minimum share of the token budget); the order is also the priority for
+# spare budget. Sections are always emitted in the fixed wire order below.
+_SECTION_SHARES = (
+    ("REQUEST", 0.10),
+    ("PATCH_APPLY", 0.05),
+    ("CHECKS", 0.20),
+    ("LAST_TMPS", 0.15),
+    ("ARTIFACT", 0.25),
+    ("REPO_SUMMARY", 0.0),
+)
+_WIRE_ORDER = ("REQUEST", "REPO_SUMMARY", "ARTIFACT_KIND", "ARTIFACT", "PATCH_APPLY", "CHECKS", "LAST_TMPS")
+_CHECK_TAILS = (200, 80, 0)
+_AFTER_NEWLINE = re.compile(r"(?<=\n)")
+
+
+def _lines(text: str) -> list[str]:
+    """Lines of ``text`` with their ``\n``; unlike ``splitlines``, ``\r``, ``\x0c`` or ``\u2028`` do not end a line."""
+    lines = _AFTER_NEWLINE.split(text)
+    if not lines[-1]:
+        lines.pop()
+    return lines
+
+
+def estimate_tokens(text: str) -> int:
+    """Tokenizer-free token estimate, calibrated to err slightly high for BPE tokenizers on code.
+
+    Letter runs cost one token per 4 characters, digit groups and punctuation one
+    each, and line breaks with their indentation one; single spaces merge into
+    the following word.
+    """
+    total = 0
+    for piece in _TOKEN_PIECE.findall(text):
+        total += -(-len(piece) // 4) if piece[0].isalpha() else 1
+    return total
+
+
+def _fit_lines(text: str, budget: int, count) -> str:
+    """Longest prefix of whole lines within ``budget`` tokens, with an omission marker.
+
+    Only a first line that alone exceeds the budget is cut mid-line.
+    """
+    if count(text) <= budget:
+        return text
+    lines = _lines(text)
+    kept, used = [], 0
+    for line in lines:
+        cost = count(line)
+        if used + cost > budget - 8:
+            if not kept and budget > 8:
+                kept.append(line[: max(0, len(line) * (budget - 8) // max(cost, 1))] + "...")
+            break
+        kept.append(line)
+        used += cost
+    omitted = len(lines) - len(kept)
+    return "".join(kept).rstrip("\n") + (f"\n... [{omitted} of {len(lines)} lines omitted]" if omitted else "")
+
+
+def _split_diff(text: str) -> list[list[str]]:
+    """Diff split into files, each a list of [header, hunk, hunk, ...] chunks."""
+    lines = _lines(text)
+    files: list[list[str]] = []
+    for i, line in enumerate(lines):
+        plain_header = (
+            line.startswith("--- ")
+            and i + 1 < len(lines)
+            and lines[i + 1].startswith("+++ ")
+            and not (files and len(files[-1]) == 1 and files[-1][0].startswith("diff --git "))
+        )
+        if line.startswith("diff --git ") or plain_header or not files:
+            files.append([line])
+        elif line.startswith("@@"):
+            files[-1].append(line)
+        else:
+            files[-1][-1] += line
+    return files
+
+
+def _fit_artifact(kind: str, text: str, budget: int, count) -> str:
+    """Trim an artifact at hunk (diff) or file (FILE blocks) boundaries, never mid-line."""
+    if count(text) <= budget:
+        return text
+    if kind == "diff":
+        units = _split_diff(text)
+    elif kind == "file_blocks":
+        units = [[block] for block in re.split(r"(?m)^(?=FILE: )", text) if block]
+    else:
+        return _fit_lines(text, budget, count)
+    kept, used, omitted, total = [], 0, 0, sum(max(1, len(u) - 1) for u in units)
+    for unit in units:
+        header, hunks = unit[0], unit[1:] or []
+        if not hunks:
+            cost = count(header)
+            if used + cost <= budget - 12:
+                kept.append(header)
+                used += cost
+            else:
+                omitted += 1
+            continue
+        header_cost = count(header)
+        taken = []
+        for hunk in hunks:
+            cost = count(hunk)
+            if used + header_cost * (not taken) + cost <= budget - 12:
+                if not taken:
+                    used += header_cost
+                taken.append(hunk)
+                used += cost
+            else:
+                omitted += 1
+        if taken:
+            kept.append(header + "".join(taken))
+    if not kept:
+        return _fit_lines(text, budget, count)
+    unit_name = "hunks" if kind == "diff" else "files"
+    return "".join(kept).rstrip("\n") + f"\n... [{omitted} of {total} {unit_name} omitted]"
+
+
+def _fit_checks(checks: dict, budget: int, count) -> str:
+    """Checks JSON within ``budget``: shorten output tails before touching anything else."""
+    text = json.dumps(checks, sort_keys=True)
+    if count(text) <= budget:
+        return text
+    for tail in _CHECK_TAILS:
+        trimmed = dict(checks)
+        trimmed["commands"] = [
+            {**cmd, "stdout_tail": cmd.get("stdout_tail", "")[-tail:] if tail else "",
+             "stderr_tail": cmd.get("stderr_tail", "")[-tail:] if tail else ""}
+            for cmd in checks.get("commands", [])
+        ]
+        text = json.dumps(trimmed, sort_keys=True)
+        if count(text) <= budget:
+            return text
+    summary = {k: v for k, v in checks.items() if k != "commands"}
+    summary["commands"] = [
+        {"name": cmd.get("name"), "status": cmd.get("status"), "exit_code": cmd.get("exit_code")}
+        for cmd in checks.get("commands", [])
+    ]
+    return json.dumps(summary, sort_keys=True)
 
 
 def build_validator_input(
@@ -18,19 +164,97 @@ def build_validator_input(
     runid: str,
     turn: int,
     budget_after_turn: int,
+    token_budget: int = 0,
+    count_tokens=None,
 ) -> str:
-    payload = (
+    """Validator prompt fitted to ``token_budget`` tokens (and ``cap`` characters).
+
+    Each section first gets up to its minimum share of the budget, then spare
+    budget goes to sections in priority order (request, patch status, checks,
+    last TMP-S, artifact, repo summary). Sections are trimmed at line, hunk or
+    file boundaries, and check output tails shrink before check results do.
+    The rendered payload is never cut; only a ``cap`` too small for the
+    section headers themselves can be exceeded. ``count_tokens`` defaults to
+    :func:`estimate_tokens`.
+    """
+    count = count_tokens or estimate_tokens
+    header = (
         f"[SID] {sid}\n"
         f"[RUNID] {runid}\n"
         f"[TURN] {turn}\n"
         f"[BUDGET_AFTER_TURN] {budget_after_turn}\n"
         f"[MODE] {mode}\n"
-        f"[REQUEST] {request}\n"
-        f"[REPO_SUMMARY] {repo_summary}\n"
-        f"[ARTIFACT_KIND] {artifact_kind}\n"
-        f"[ARTIFACT] {artifact[:8000]}\n"
-        f"[PATCH_APPLY] {json.dumps(patch_apply, sort_keys=True)}\n"
-        f"[CHECKS] {json.dumps(checks, sort_keys=True)}\n"
-        f"[LAST_TMPS] {last_tmps if last_tmps else 'NONE'}\n"
     )
-    return payload[:cap]
+    sections = {
+        "REQUEST": request,
+        "REPO_SUMMARY": repo_summary,
+        "ARTIFACT_KIND": artifact_kind,
+        "ARTIFACT": artifact,
+        "PATCH_APPLY": json.dumps(patch_apply, sort_keys=True),
+        "CHECKS": json.dumps(checks, sort_keys=True),
+        "LAST_TMPS": last_tmps if last_tmps else "NONE",
+    }
+
+    def render(parts: dict) -> str:
+        return header + "".join(f"[{tag}] {parts[tag]}\n" for tag in _WIRE_ORDER)
+
+    payload = render(sections)
+    budget = token_budget if token_budget > 0 else None
+    alloc: int | None = None  # tokens shared out among the sections by the last fit
+    while True:
+        tokens = count(payload)
+        if (budget is None or tokens <= budget) and len(payload) <= cap:
+            return payload
+        if alloc == 0:
+            return payload  # every section is at its minimum; only the headers remain over ``cap``
+        if alloc is None:
+            limits = [budget] if budget is not None else []
+        else:
+            # Shrink from what the last fit actually produced, by at least 5% a pass, so
+            # fitting overshoot (omission markers, whole hunks) cannot stall the loop.
+            limits = [alloc - max(1, alloc // 20)]
+            if budget is not None and tokens > budget:
+                limits.append(alloc - (tokens - budget))
+        if len(payload) > cap:
+            limits.append(int(tokens * cap / len(payload) * 0.95))
+        alloc = max(0, min(limits))
+        fixed = count(header) + count(f"[ARTIFACT_KIND] {artifact_kind}\n") + 4 * len(_WIRE_ORDER)
+        available = max(0, alloc - fixed)
+        sizes = {tag: count(sections[tag]) for tag, _ in _SECTION_SHARES}
+        shares = {tag: min(sizes[tag], int(share * available)) for tag, share in _SECTION_SHARES}
+        spare = available - sum(shares.values())
+        for tag, _ in _SECTION_SHARES:
+            extra = min(sizes[tag] - shares[tag], max(0, spare))
+            shares[tag] += extra
+            spare -= extra
+        parts = dict(sections)
+        parts["REQUEST"] = _fit_lines(request, shares["REQUEST"], count)
+        parts["REPO_SUMMARY"] = _fit_lines(repo_summary, shares["REPO_SUMMARY"], count) if shares["REPO_SUMMARY"] else ""
+        parts["ARTIFACT"] = _fit_artifact(artifact_kind, artifact, shares["ARTIFACT"], count)
+        parts["PATCH_APPLY"] = _fit_lines(sections["PATCH_APPLY"], shares["PATCH_APPLY"], count)
+        parts["CHECKS"] = _fit_checks(checks, shares["CHECKS"], count)
+        parts["LAST_TMPS"] = _fit_lines(sections["LAST_TMPS"], shares["LAST_TMPS"], count)
+        payload = render(parts)
+
+
+def _swap_run_ids(text: str, sid: str, runid: str, new_sid: str, new_runid: str) -> str:
+    text = text.replace(f"[SID] {sid}\n", f"[SID] {new_sid}\n", 1)
+    text = text.replace(f"[RUNID] {runid}\n", f"[RUNID] {new_runid}\n", 1)
+    v_line = re.compile(rf"(?m)^((?:\[(?:LAST_TMPS|VALIDATOR)\] )?V [^|\n]*)\|{re.escape(sid)}\|{re.escape(runid)}\|")
+    return v_line.sub(lambda m: f"{m.group(1)}|{new_sid}|{new_runid}|", text)
+
+
+def anonymize_run_ids(text: str, sid: str, runid: str) -> str:
+    """Replace this run's ids in validator input/TMP-S V lines with placeholders."""
+    return _swap_run_ids(text, sid, runid, _SID_PLACEHOLDER, _RUNID_PLACEHOLDER)
+
+
+def restore_run_ids(text: str, sid: str, runid: str) -> str:
+    return _swap_run_ids(text, _SID_PLACEHOLDER, _RUNID_PLACEHOLDER, sid, runid)
+
+
+def validator_input_fingerprint(text: str, sid: str, runid: str) -> str:
+    """Validator input with the parts that differ between reruns of the same request
+    (run ids and check durations) blanked out, for cache keys."""
+    text = anonymize_run_ids(text, sid, runid)
+    return re.sub(r'"(duration_ms|wall_ms)": \d+', r'"\1": 0', text)
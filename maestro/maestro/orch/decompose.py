@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from maestro.orch.sandbox import ensure_private, remove_tree
+from maestro.tmps.types import BLine
+
+
+@dataclass
+class BranchResult:
+    pri: int
+    agent: str
+    prompt: str
+    output: str
+    kind: str
+    payload: str
+    patch_apply: dict
+    repo: Path
+    paths: list[str] = field(default_factory=list)
+
+
+def independent_steps(b_lines: list[BLine], agents: dict) -> list[BLine]:
+    """B-lines that can run concurrently: one per configured specialist, in priority order.
+
+    Later B-lines for an agent that already has a step are follow-ups of that step,
+    and pseudo-agents such as ``orch``/``sys`` have no specialist to dispatch to.
+    """
+    steps: list[BLine] = []
+    seen: set[str] = set()
+    for line in b_lines:
+        if line.agent in agents and line.agent not in seen:
+            seen.add(line.agent)
+            steps.append(line)
+    return steps
+
+
+def _read(path: Path) -> tuple[bytes, int] | None:
+    """Content and permission bits of ``path`` (a mode-only change is a change too)."""
+    if not path.is_file():
+        return None
+    return path.read_bytes(), path.stat().st_mode & 0o777
+
+
+def merge_branches(base: Path, branches: list[BranchResult]) -> dict:
+    """Copy each branch's changed files into ``base`` with file-level conflict detection.
+
+    A path changed by several branches to different contents is a conflict; the
+    highest-priority (lowest ``pri``) branch's version is kept and the conflict is
+    reported so the validator can route a repair.
+    """
+    changes: dict[str, tuple[int, tuple[bytes, int] | None]] = {}
+    conflicts: list[str] = []
+    report = []
+    for idx, br in enumerate(branches):
+        report.append(
+            {
+                "pri": br.pri,
+                "agent": br.agent,
+                "kind": br.kind,
+                "ok": bool(br.patch_apply.get("ok", False)),
+                "error": br.patch_apply.get("error"),
+                "paths": br.paths,
+            }
+        )
+        if not br.patch_apply.get("ok", False):
+            continue
+        for rel in br.paths:
+            content = _read(br.repo / rel)
+            if content == _read(base / rel):
+                continue
+            if rel in changes:
+                if changes[rel][1] != content and rel not in conflicts:
+                    conflicts.append(rel)
+                continue
+            changes[rel] = (idx, content)
+
+    for rel, (_, content) in changes.items():
+        target = base / rel
+        if content is None:
+            if target.is_file():
+                target.unlink()
+            continue
+        data, mode = content
+        target.parent.mkdir(parents=True, exist_ok=True)
+        ensure_private(target)
+        target.write_bytes(data)
+        os.chmod(target, mode)
+
+    all_applied = all(item["ok"] for item in report)
+    result = {
+        "ok": all_applied and not conflicts and bool(changes),
+        "branches": report,
+        "merged": sorted(changes),
+        "conflicts": conflicts,
+    }
+    if conflicts:
+        result["error"] = "conflicting changes to " + ", ".join(conflicts)
+    elif not all_applied:
+        result["error"] = "; ".join(f"{item['agent']}: {item['error']}" for item in report if not item["ok"])
+    elif not changes:
+        result["error"] = "no changes"
+    return result
+
+
+def remove_branch_repos(branches: list[BranchResult]) -> None:
+    for br in branches:
+        if br.repo.exists():
+            remove_tree(br.repo)
@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import re
+from pathlib import Path
+
 
 def dotpath_to_relpath(dotpath: str) -> str:
     if not dotpath.startswith("f."):
@@ -24,7 +27,172 @@ def relpath_to_dotpath(relpath: str) -> str:
     return "f." + ".".join(parts)
 
 
-def extract_delta(focus: str, last_artifact: str, checks_summary: str) -> str:
-    if focus == "*":
-        return f"last_artifact={last_artifact[:3000]}\nchecks={checks_summary}"
-    return f"focus={focus}\nartifact={last_artifact[:3000]}"
+_HUNK_COUNTS = re.compile(r"^@@ -\d+(?:,(\d+))? \+\d+(?:,(\d+))? @@")
+_HUNK_NEW_RANGE = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+_REGION_CONTEXT = 3
+_CHECK_TAIL_CHARS = 600
+
+
+def _strip_prefix(path: str) -> str | None:
+    path = path.split("\t", 1)[0].strip()
+    if path == "/dev/null":
+        return None
+    return path[2:] if path.startswith(("a/", "b/")) else path
+
+
+def index_artifact(payload: str) -> dict[str, list[str]]:
+    """Artifact split by file: diff hunks (``@@`` header included) or the whole FILE block."""
+    files: dict[str, list[str]] = {}
+    if payload.lstrip().startswith("FILE: "):
+        for block in re.split(r"(?m)^(?=FILE: )", payload):
+            if block.startswith("FILE: "):
+                files.setdefault(block.splitlines()[0][6:].strip(), []).append(block)
+        return files
+    lines = [line + "\n" for line in payload.split("\n")]
+    lines[-1] = lines[-1][:-1]
+    current: str | None = None
+    old_path: str | None = None
+    hunk: list[str] | None = None
+    old_left = new_left = 0
+    for i, line in enumerate(lines):
+        if hunk is not None and current is not None and (old_left > 0 or new_left > 0):
+            # Inside the lines an @@ header counts: "--- x" is a removed "-- x" line, not a header.
+            if line.startswith("-"):
+                old_left -= 1
+            elif line.startswith("+"):
+                new_left -= 1
+            elif not line.startswith("\\"):
+                old_left -= 1
+                new_left -= 1
+            hunk.append(line)
+            files[current][-1] = "".join(hunk)
+            continue
+        if line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+            old_path, hunk = _strip_prefix(line[4:]), None
+            continue
+        if line.startswith("+++ ") and hunk is None:
+            current = _strip_prefix(line[4:]) or old_path
+            continue
+        if line.startswith("diff --git "):
+            hunk = None
+            continue
+        if line.startswith("@@") and current is not None:
+            m = _HUNK_COUNTS.match(line)
+            old_left, new_left = (int(m.group(1) or 1), int(m.group(2) or 1)) if m else (0, 0)
+            hunk = [line]
+            files.setdefault(current, []).append("")
+        elif hunk is None or current is None:
+            continue
+        else:
+            hunk.append(line)
+        files[current][-1] = "".join(hunk)
+    return files
+
+
+def _focus_matches(dotpath: str, rel: str) -> bool:
+    """``dotpath`` names ``rel`` itself, a symbol inside it, or a directory above it."""
+    if not dotpath.startswith("f."):
+        return False
+    mapped = dotpath_to_relpath(dotpath)
+    if mapped == rel:
+        return True
+    rel_dot = relpath_to_dotpath(rel)
+    return dotpath.startswith(rel_dot + ".") or rel_dot.startswith(dotpath + ".")
+
+
+def _current_regions(repo: Path, rel: str, hunks: list[str]) -> str:
+    path = Path(repo) / rel
+    try:
+        lines = path.read_text(errors="replace").splitlines()
+    except OSError:
+        return ""
+    spans: list[list[int]] = []
+    for hunk in hunks:
+        m = _HUNK_NEW_RANGE.match(hunk)
+        if not m:
+            continue
+        start = int(m.group(1))
+        length = int(m.group(2)) if m.group(2) is not None else 1
+        lo, hi = max(1, start - _REGION_CONTEXT), min(len(lines), start + length + _REGION_CONTEXT - 1)
+        if spans and lo <= spans[-1][1] + 1:
+            spans[-1][1] = max(spans[-1][1], hi)
+        elif lo <= hi:
+            spans.append([lo, hi])
+    out = []
+    for lo, hi in spans:
+        out.append(f"[CURRENT {rel}:{lo}-{hi}]\n")
+        out.extend(f"{n:>5} {lines[n - 1]}\n" for n in range(lo, hi + 1))
+    return "".join(out)
+
+
+def _failing_checks(checks: dict | None, focus_files: list[str]) -> list[str]:
+    failing = [
+        cmd for cmd in (checks or {}).get("commands", [])
+        if cmd.get("exit_code") not in (0, None) or cmd.get("status") == "failed"
+    ]
+    names = {rel.rsplit("/", 1)[-1] for rel in focus_files}
+    # Prefer the failures that mention a focused file; otherwise report them all.
+    mentioning = [
+        cmd for cmd in failing
+        if any(name in cmd.get("stdout_tail", "") + cmd.get("stderr_tail", "") for name in names)
+    ]
+    out = []
+    for cmd in mentioning or failing:
+        tail = (cmd.get("stderr_tail", "") + "\n" + cmd.get("stdout_tail", "")).strip()[-_CHECK_TAIL_CHARS:]
+        out.append(f"[CHECK {cmd.get('name')} exit={cmd.get('exit_code')}]\n{tail}\n")
+    return out
+
+
+def _bounded(parts: list[str], max_chars: int) -> str:
+    if sum(map(len, parts)) > max_chars:
+        # Something will be omitted: keep room for the marker saying so.
+        max_chars = max(0, max_chars - len(f"... [{len(parts)} sections omitted]\n"))
+    out, used, dropped = [], 0, 0
+    for part in parts:
+        if used + len(part) > max_chars:
+            dropped += 1
+            continue
+        out.append(part)
+        used += len(part)
+    if not out and parts:
+        # Nothing fits whole: keep the leading lines of the first part.
+        kept = []
+        for line in parts[0].splitlines(keepends=True):
+            if used + len(line) > max_chars:
+                break
+            kept.append(line)
+            used += len(line)
+        out.append("".join(kept))
+    if dropped:
+        out.append(f"... [{dropped} sections omitted]\n")
+    return "".join(out).rstrip("\n")
+
+
+def extract_delta(
+    focus: str,
+    last_artifact: str,
+    checks_summary: str,
+    *,
+    checks: dict | None = None,
+    repo: Path | None = None,
+    max_chars: int = 3000,
+) -> str:
+    """Repair context for the next specialist turn, at most ``max_chars`` characters.
+
+    With dotpath ``focus`` only the artifact hunks of the focused files, their
+    current regions in ``repo`` and the failing check tails are included; with
+    ``*`` (or a focus that matches no changed file) every hunk competes for the
+    budget. Hunks are dropped whole rather than cut mid-hunk.
+    """
+    files = index_artifact(last_artifact)
+    dotpaths = [] if focus == "*" else [dp.strip() for dp in focus.split(",") if dp.strip()]
+    focused = [rel for rel in files if any(_focus_matches(dp, rel) for dp in dotpaths)]
+    head = f"focus={focus}\nchecks={checks_summary}\n"
+    if not files:
+        return head + f"artifact={last_artifact[: max(0, max_chars - len(head) - len('artifact='))]}"
+    selected = focused or list(files)
+    parts = [f"[FILE {rel}]\n{hunk}" for rel in selected for hunk in files[rel]]
+    if repo is not None and focused:
+        parts += [region for rel in focused if (region := _current_regions(repo, rel, files[rel]))]
+    parts += _failing_checks(checks, selected)
+    return head + _bounded(parts, max(0, max_chars - len(head)))
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import ast
+import os
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Iterable
+
+_IGNORED_DIRS = {".git", ".maestro", "__pycache__", ".venv", "venv", "node_modules"}
+_PARSE_MEMO: dict[tuple[str, int, int], frozenset[str]] = {}
+_PARSE_MEMO_MAX = 50_000
+
+
+@lru_cache(maxsize=256)
+def _glob_regex(pattern: str) -> re.Pattern:
+    out = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]")
+            i += 1
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    return re.compile("".join(out) + r"\Z")
+
+
+def match_any(path: str, patterns: Iterable[str]) -> bool:
+    """True if the repo-relative ``path`` matches a glob (``*`` stays within a directory, ``**`` crosses them)."""
+    return any(_glob_regex(pattern).match(path) for pattern in patterns)
+
+
+def _python_files(repo: Path) -> list[str]:
+    files = []
+    for dirpath, dirnames, filenames in os.walk(repo):
+        dirnames[:] = [d for d in dirnames if d not in _IGNORED_DIRS]
+        rel_dir = Path(dirpath).relative_to(repo)
+        files.extend((rel_dir / name).as_posix() for name in filenames if name.endswith(".py"))
+    return files
+
+
+def _module_names(rel: str) -> list[str]:
+    """Importable names of a repo file, from the repo root and from a ``src/`` layout."""
+    parts = rel[:-3].split("/")
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    names = [".".join(parts)] if parts else []
+    if len(parts) > 1 and parts[0] == "src":
+        names.append(".".join(parts[1:]))
+    return names
+
+
+def _imports(repo: Path, rel: str) -> frozenset[str]:
+    """Absolute module names imported by ``rel`` (memoised on size and mtime)."""
+    path = repo / rel
+    try:
+        st = path.stat()
+    except OSError:
+        return frozenset()
+    key = (str(path), st.st_size, st.st_mtime_ns)
+    cached = _PARSE_MEMO.get(key)
+    if cached is not None:
+        return cached
+    try:
+        tree = ast.parse(path.read_bytes(), filename=rel)
+    except (SyntaxError, ValueError):
+        tree = None
+    names: set[str] = set()
+    package = rel.split("/")[:-1]  # for __init__.py this is the package itself
+    for node in ast.walk(tree) if tree is not None else ():
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                if node.level - 1 > len(package):
+                    continue
+                base = package[: len(package) - (node.level - 1)]
+                module = ".".join(base + ([node.module] if node.module else []))
+            else:
+                module = node.module or ""
+            if module:
+                names.add(module)
+            # ``from pkg import sub`` may import the submodule pkg.sub.
+            names.update(f"{module}.{alias.name}" if module else alias.name for alias in node.names)
+    if len(_PARSE_MEMO) >= _PARSE_MEMO_MAX:
+        _PARSE_MEMO.clear()
+    result = frozenset(names)
+    _PARSE_MEMO[key] = result
+    return result
+
+
+def python_import_impact(repo: Path, changed: list[str]) -> set[str]:
+    """Changed Python files plus every repo file that imports one of them, transitively.
+
+    Importing ``a.b.c`` also runs ``a/__init__.py`` and ``a/b/__init__.py``, so
+    those count as dependencies too. Non-Python changes have no import edges.
+    """
+    repo = Path(repo)
+    files = _python_files(repo)
+    by_module: dict[str, str] = {}
+    for rel in files:
+        for name in _module_names(rel):
+            by_module.setdefault(name, rel)
+
+    importers: dict[str, set[str]] = {}
+    for rel in files:
+        for name in _imports(repo, rel):
+            parts = name.split(".")
+            for depth in range(1, len(parts) + 1):
+                target = by_module.get(".".join(parts[:depth]))
+                if target is not None and target != rel:
+                    importers.setdefault(target, set()).add(rel)
+
+    impacted = {rel for rel in changed if rel.endswith(".py")}
+    frontier = list(impacted)
+    while frontier:
+        for importer in importers.get(frontier.pop(), ()):
+            if importer not in impacted:
+                impacted.add(importer)
+                frontier.append(importer)
+    return impacted
+
+
+IMPACT_MAPPERS: dict[str, Callable[[Path, list[str]], set[str]]] = {
+    "python-imports": python_import_impact,
+}
+
+
+def affected_checks(repo: Path, checks: list, changed: list[str]) -> list[bool]:
+    """Which checks the ``changed`` paths can affect, one flag per check.
+
+    A check without ``paths`` or ``impact`` always runs. ``paths`` globs select
+    checks whose files changed directly; an ``impact`` mapper widens the changed
+    set first (e.g. to the modules importing a changed one) and, without
+    ``paths``, selects the check whenever the widened set is non-empty.
+    """
+    widened: dict[str, set[str]] = {}
+    flags = []
+    for chk in checks:
+        if not chk.paths and not chk.impact:
+            flags.append(True)
+            continue
+        hit = bool(chk.paths) and any(match_any(rel, chk.paths) for rel in changed)
+        if not hit and chk.impact:
+            if chk.impact not in widened:
+                widened[chk.impact] = IMPACT_MAPPERS[chk.impact](repo, changed)
+            impacted = widened[chk.impact]
+            hit = any(match_any(rel, chk.paths) for rel in impacted) if chk.paths else bool(impacted)
+        flags.append(hit)
+    return flags
@@ -1,27 +1,116 @@
 from __future__ import annotations
 
+import asyncio
+import inspect
 import json
-import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from dataclasses import dataclass, field, replace
 from pathlib import Path
 
+from maestro.cache import CacheStats, DiskCache, cache_key, tree_hash
 from maestro.config import RunnerConfig
+from maestro.index import RepoIndex, refreshed_index
+from maestro.llm.metrics import rollup
 from maestro.llm.prompts import VALIDATOR_SYSTEM_PROMPT, build_specialist_prompt
 from maestro.log import RunLogger
-from maestro.orch.artifact import parse_artifact
-from maestro.orch.checks import run_checks
-from maestro.orch.context import build_validator_input
+from maestro.orch.artifact import Artifact, parse_artifact
+from maestro.orch.checks import run_checks, run_checks_async
+from maestro.orch.context import (
+    anonymize_run_ids,
+    build_validator_input,
+    estimate_tokens,
+    restore_run_ids,
+    validator_input_fingerprint,
+)
+from maestro.orch.decompose import BranchResult, independent_steps, merge_branches, remove_branch_repos
 from maestro.orch.delta import extract_delta
 from maestro.orch.escalate import synthetic_meta_escalation
-from maestro.orch.patch import apply_diff, apply_file_blocks
+from maestro.orch.patch import apply_diff, apply_diff_async, apply_file_blocks, diff_paths, touched_paths
 from maestro.orch.routing import route_initial_agent
+from maestro.orch.sandbox import prepare_sandbox
+from maestro.runs_db import record_turn, turn_record
 from maestro.store import RunStore
 from maestro.tmps.normalize import normalize_tmps
 from maestro.tmps.parser import ParseError, parse_tmps
+from maestro.tmps.types import BLine
 from maestro.tmps.validate import TMPSValidationError, validate_tmps_semantics
+from maestro.trace import NULL_TRACER, Tracer
 
 MAX_TMPS_RETRIES = 2
 
 
+@dataclass
+class _Call:
+    """A blocking step of a run, performed by the sync or the async driver."""
+
+    op: str
+    args: tuple = ()
+    kwargs: dict = field(default_factory=dict)
+
+
+@dataclass
+class _RunCache:
+    """A shared disk cache plus one run's statistics and ids for it."""
+
+    cache: DiskCache
+    sid: str
+    runid: str
+    stats: CacheStats = field(default_factory=CacheStats)
+    tree_memo: dict = field(default_factory=dict)
+
+    def get(self, key: str) -> dict | None:
+        return self.cache.get(key, self.stats)
+
+    def put(self, key: str, value: dict) -> None:
+        self.cache.put(key, value, self.stats)
+
+    def branch(self) -> "_RunCache":
+        """A view for one fan-out branch thread: same cache and memo, its own statistics."""
+        return replace(self, stats=CacheStats())
+
+    def merge(self, branch: "_RunCache") -> None:
+        for name, value in branch.stats.to_dict().items():
+            setattr(self.stats, name, getattr(self.stats, name) + value)
+
+
+def _combined_artifact(branches: list[BranchResult]) -> Artifact:
+    kinds = {br.kind for br in branches}
+    kind = kinds.pop() if len(kinds) == 1 else "mixed"
+    return Artifact(kind, "\n".join(br.payload.rstrip("\n") for br in branches) + "\n")
+
+
+def _branch_join(branches: list[BranchResult], attr: str) -> str:
+    return "\n".join(f"=== B{br.pri}:{br.agent} ===\n{getattr(br, attr)}" for br in branches)
+
+
+def _close_store(store: RunStore, tracer) -> None:
+    if tracer.path is not None:
+        store.write_json(tracer.path, tracer.to_json())
+    store.close()
+
+
+async def _agenerate(client, *args, **kwargs) -> str:
+    if inspect.iscoroutinefunction(client.generate):
+        return await client.generate(*args, **kwargs)
+    return await asyncio.to_thread(client.generate, *args, **kwargs)
+
+
+def _generate_with_stats(client, *args, **kwargs) -> tuple[str, dict | None]:
+    if hasattr(client, "generate_with_stats"):
+        return client.generate_with_stats(*args, **kwargs)
+    return client.generate(*args, **kwargs), None
+
+
+async def _agenerate_with_stats(client, *args, **kwargs) -> tuple[str, dict | None]:
+    if not hasattr(client, "generate_with_stats"):
+        return await _agenerate(client, *args, **kwargs), None
+    if inspect.iscoroutinefunction(client.generate_with_stats):
+        return await client.generate_with_stats(*args, **kwargs)
+    return await asyncio.to_thread(client.generate_with_stats, *args, **kwargs)
+
+
 class Orchestrator:
     def __init__(self, cfg: RunnerConfig, llm_client, validator_client=None):
         self.cfg = cfg
@@ -29,26 +118,176 @@ class Orchestrator:
         self.validator_llm = validator_client or llm_client
 
     def run(self, repo: Path, request_text: str) -> dict:
-        store = RunStore(repo)
+        return self._drive(self._run_steps(Path(repo), request_text))
+
+    async def run_async(self, repo: Path, request_text: str) -> dict:
+        """Same loop as :meth:`run`, but LLM calls, checks and patch application are awaited.
+
+        Many runs can be interleaved on one event loop. Clients whose ``generate`` is a
+        coroutine function are awaited directly; blocking clients run in a worker thread.
+        """
+        return await self._drive_async(self._run_steps(Path(repo), request_text))
+
+    def _perform(self, call: _Call):
+        if call.op == "specialist":
+            return _generate_with_stats(self.llm, *call.args, **call.kwargs)
+        if call.op == "validator":
+            return _generate_with_stats(self.validator_llm, *call.args, **call.kwargs)
+        if call.op == "clone":
+            store, *args = call.args
+            return store.clone_repo_to_work(*args, **call.kwargs)
+        if call.op == "apply_diff":
+            return apply_diff(*call.args, **call.kwargs)
+        if call.op == "apply_file_blocks":
+            return apply_file_blocks(*call.args, **call.kwargs)
+        if call.op == "checks":
+            return run_checks(*call.args, **call.kwargs)
+        if call.op == "final_diff":
+            return diff_paths(*call.args)
+        if call.op == "index":
+            return refreshed_index(*call.args)
+        if call.op == "runs_index":
+            return record_turn(*call.args)
+        if call.op == "sandbox":
+            return prepare_sandbox(*call.args, **call.kwargs)
+        if call.op == "fanout":
+            (branches,) = call.args
+            with ThreadPoolExecutor(max_workers=len(branches)) as pool:
+                return list(pool.map(self._drive, branches))
+        raise ValueError(f"unknown orchestrator op: {call.op}")
+
+    async def _perform_async(self, call: _Call):
+        if call.op == "specialist":
+            return await _agenerate_with_stats(self.llm, *call.args, **call.kwargs)
+        if call.op == "validator":
+            return await _agenerate_with_stats(self.validator_llm, *call.args, **call.kwargs)
+        if call.op == "clone":
+            store, *args = call.args
+            return await asyncio.to_thread(store.clone_repo_to_work, *args, **call.kwargs)
+        if call.op == "apply_diff":
+            return await apply_diff_async(*call.args, **call.kwargs)
+        if call.op == "apply_file_blocks":
+            return await asyncio.to_thread(apply_file_blocks, *call.args, **call.kwargs)
+        if call.op == "checks":
+            return await run_checks_async(*call.args, **call.kwargs)
+        if call.op == "final_diff":
+            return await asyncio.to_thread(diff_paths, *call.args)
+        if call.op == "index":
+            return await asyncio.to_thread(refreshed_index, *call.args)
+        if call.op == "runs_index":
+            return await asyncio.to_thread(record_turn, *call.args)
+        if call.op == "sandbox":
+            return await asyncio.to_thread(prepare_sandbox, *call.args, **call.kwargs)
+        if call.op == "fanout":
+            (branches,) = call.args
+            return list(await asyncio.gather(*(self._drive_async(branch) for branch in branches)))
+        raise ValueError(f"unknown orchestrator op: {call.op}")
+
+    def _drive(self, steps):
+        value, error = None, None
+        while True:
+            try:
+                call = steps.throw(error) if error is not None else steps.send(value)
+            except StopIteration as stop:
+                return stop.value
+            value, error = None, None
+            try:
+                value = self._perform(call)
+            except Exception as err:  # re-raised inside the step generator
+                error = err
+
+    async def _drive_async(self, steps):
+        value, error = None, None
+        while True:
+            try:
+                call = steps.throw(error) if error is not None else steps.send(value)
+            except StopIteration as stop:
+                return stop.value
+            value, error = None, None
+            try:
+                value = await self._perform_async(call)
+            except Exception as err:  # re-raised inside the step generator
+                error = err
+
+    def _run_steps(self, repo: Path, request_text: str):
+        cfg = self.cfg
+        store = RunStore(
+            repo,
+            async_writes=cfg.store_async_writes,
+            fsync=cfg.store_fsync,
+            journal=cfg.store_journal,
+            compress=cfg.store_compress,
+        )
+        tracer = Tracer() if cfg.trace else NULL_TRACER
+        try:
+            with tracer.span("run"):
+                result = yield from self._run_turns(store, request_text, tracer)
+        except BaseException:
+            # Still write what is queued, but a store error must not replace the run's own.
+            with suppress(Exception):
+                _close_store(store, tracer)
+            raise
+        _close_store(store, tracer)
+        return result
+
+    def _run_turns(self, store: RunStore, request_text: str, tracer=NULL_TRACER):
+        repo = store.repo_path
         run = store.init_run()
         sid, runid = run["sid"], run["runid"]
         run_root, work_repo = run["run_root"], run["work_repo"]
-        store.clone_repo_to_work(work_repo)
+        if tracer.enabled:
+            tracer.path = run_root / "trace.json"
+        started = time.perf_counter()
+        with tracer.span("clone", "io") as span:
+            clone_strategy = yield _Call("clone", (store, work_repo, self.cfg.clone_strategy), self._clone_kwargs())
+            span.set(strategy=clone_strategy)
+        clone_ms = int((time.perf_counter() - started) * 1000)
         logger = RunLogger(run_root)
         store.write_text(run_root / "request.txt", request_text)
         store.write_json(run_root / "cfg.json", json.loads(json.dumps(self.cfg, default=lambda o: o.__dict__)))
+        store.write_json(run_root / "clone.json", {"strategy": clone_strategy, "ms": clone_ms})
+
+        validator_cache = specialist_cache = None
+        if self.cfg.validator_cache:
+            disk = DiskCache(store.cache_dir("validator"), self.cfg.validator_cache_max_mb * 1024 * 1024)
+            validator_cache = _RunCache(disk, sid, runid)
+        if self.cfg.specialist_cache:
+            disk = DiskCache(store.cache_dir("specialist"), self.cfg.specialist_cache_max_mb * 1024 * 1024)
+            specialist_cache = _RunCache(disk, sid, runid)
+
+        repo_index = RepoIndex()
+        if self.cfg.repo_summary_chars:
+            with tracer.span("index", "io"):
+                repo_index, index_stats = yield _Call("index", (store.index_path(), store.repo_path))
+            store.write_json(run_root / "repo_index.json", index_stats)
+        repo_summary = repo_index.summary(self.cfg.repo_summary_chars)
 
         turn = 0
         budget = self.cfg.max_retries
         abs_remaining = self.cfg.abs_max_turns
         last_tmps_raw = "NONE"
 
+        # LLM calls of the current turn (including the specialist call that produced its
+        # artifact) and of the whole run, with their token and timing metrics.
+        calls: list[dict] = []
+        run_calls: list[dict] = []
+
         agent = route_initial_agent(request_text)
         specialist_prompt = request_text + "\nOutput unified diff or FILE blocks only."
-        specialist_output = self._call_specialist(agent, specialist_prompt)
+        if repo_summary:
+            specialist_prompt = f"{request_text}\n[REPO] {repo_summary}\nOutput unified diff or FILE blocks only."
+        specialist_output = yield from self._call_specialist(
+            agent, specialist_prompt, repo=work_repo, cache=specialist_cache, tracer=tracer, calls=calls
+        )
+        branches: list[BranchResult] = []
+        # Every path any artifact wrote to, across turns; the final patch only diffs these.
+        touched: dict[str, None] = {}
+        # Paths changed since the checks last passed; path-scoped checks run only if these affect them.
+        unverified: dict[str, None] = {}
 
         while True:
             budget_before_turn = budget
+            turn_started = time.time()
             budget_after_turn = max(budget_before_turn - 1, 0)
 
             tdir = logger.turn_dir(turn)
@@ -56,86 +295,189 @@ class Orchestrator:
             store.write_text(tdir / "specialist_prompt.txt", specialist_prompt)
             store.write_text(tdir / "specialist_output.txt", specialist_output)
 
-            artifact = parse_artifact(specialist_output)
-            store.write_json(tdir / "artifact_kind.json", {"kind": artifact.kind})
+            if branches:
+                artifact = _combined_artifact(branches)
+                store.write_json(tdir / "artifact_kind.json", {"kind": artifact.kind})
+                for br in branches:
+                    bdir = tdir / "branches" / f"{br.pri}_{br.agent}"
+                    store.write_text(bdir / "specialist_prompt.txt", br.prompt)
+                    store.write_text(bdir / "specialist_output.txt", br.output)
+                    store.write_json(bdir / "patch_apply.json", br.patch_apply)
+                with tracer.span("merge_branches", "patch"):
+                    patch_apply = merge_branches(work_repo, branches)
+                turn_paths = [rel for br in branches for rel in br.paths]
+                remove_branch_repos(branches)
+            else:
+                with tracer.span("parse_artifact", "parse") as span:
+                    artifact = parse_artifact(specialist_output)
+                    span.set(kind=artifact.kind)
+                store.write_json(tdir / "artifact_kind.json", {"kind": artifact.kind})
 
-            patch_apply = {"ok": False, "error": "invalid artifact"}
-            if artifact.kind == "diff":
-                patch_apply = apply_diff(work_repo, artifact.payload, self.cfg.allow_renames)
-            elif artifact.kind == "file_blocks":
-                patch_apply = apply_file_blocks(work_repo, artifact.payload)
+                patch_apply = {"ok": False, "error": "invalid artifact"}
+                turn_paths = []
+                if artifact.kind in {"diff", "file_blocks"}:
+                    with tracer.span("patch_apply", "patch", kind=artifact.kind) as span:
+                        if artifact.kind == "diff":
+                            patch_apply = yield _Call(
+                                "apply_diff",
+                                (work_repo, artifact.payload, self.cfg.allow_renames),
+                                self._patch_kwargs(),
+                            )
+                        else:
+                            patch_apply = yield _Call("apply_file_blocks", (work_repo, artifact.payload))
+                        span.set(ok=bool(patch_apply.get("ok")))
+                if artifact.kind in {"diff", "file_blocks"}:
+                    turn_paths = touched_paths(artifact.kind, artifact.payload)
             store.write_json(tdir / "patch_apply.json", patch_apply)
+            touched.update(dict.fromkeys(turn_paths))
+            unverified.update(dict.fromkeys(turn_paths))
+            if self.cfg.repo_summary_chars and turn_paths:
+                # In-memory view of the work repo; the persisted index tracks the source repo.
+                repo_index.update(work_repo, turn_paths)
+                repo_summary = repo_index.summary(self.cfg.repo_summary_chars, focus=touched)
 
-            checks = run_checks(work_repo, self.cfg, patch_apply.get("ok", False))
+            with tracer.span("checks", "checks", turn=turn) as span:
+                checks = yield _Call(
+                    "checks",
+                    (work_repo, self.cfg, patch_apply.get("ok", False)),
+                    {**self._checks_kwargs(unverified, tracer), "log_dir": tdir / "checks"},
+                )
+                span.set(summary=checks["summary"])
             store.write_json(tdir / "checks.json", checks)
+            if checks["summary"] == "ok":
+                unverified.clear()
 
-            val_input = build_validator_input(
-                "NORMAL",
-                request_text,
-                "",
-                artifact.kind,
-                artifact.payload,
-                patch_apply,
-                checks,
-                last_tmps_raw,
-                self.cfg.validator_input_cap,
-                sid=sid,
-                runid=runid,
-                turn=turn,
-                budget_after_turn=budget_after_turn,
-            )
+            with tracer.span("validator_input", "parse"):
+                val_input = build_validator_input(
+                    "NORMAL",
+                    request_text,
+                    repo_summary,
+                    artifact.kind,
+                    artifact.payload,
+                    patch_apply,
+                    checks,
+                    last_tmps_raw,
+                    self.cfg.validator_input_cap,
+                    sid=sid,
+                    runid=runid,
+                    turn=turn,
+                    budget_after_turn=budget_after_turn,
+                    token_budget=self.cfg.validator_input_tokens,
+                    count_tokens=self._count_tokens,
+                )
             store.write_text(tdir / "validator_input.txt", val_input)
 
-            raw, parsed = self._validate_tmps_with_retry(
+            generations: list[dict] = []
+            raw, parsed = yield from self._validate_tmps_with_retry(
                 val_input,
                 sid=sid,
                 runid=runid,
                 turn=turn,
                 budget_after_turn=budget_after_turn,
+                generations=generations,
+                cache=validator_cache,
+                tracer=tracer,
+                calls=calls,
             )
             store.write_text(tdir / "tmps_raw.txt", raw)
 
-            parsed_snapshot = json.dumps(parsed, default=lambda o: o.__dict__, sort_keys=True)
-            normalized = normalize_tmps(parsed, budget_after_turn)
-            normalized_snapshot = json.dumps(normalized, default=lambda o: o.__dict__, sort_keys=True)
+            with tracer.span("normalize", "parse"):
+                parsed_snapshot = json.dumps(parsed, default=lambda o: o.__dict__, sort_keys=True)
+                normalized = normalize_tmps(parsed, budget_after_turn)
+                normalized_snapshot = json.dumps(normalized, default=lambda o: o.__dict__, sort_keys=True)
 
             if self.cfg.strict_mode and normalized_snapshot != parsed_snapshot:
                 strict_reason = "strict_mode: normalization changed TMP-S record"
-                raw, parsed = self._validate_tmps_with_retry(
+                raw, parsed = yield from self._validate_tmps_with_retry(
                     val_input,
                     sid=sid,
                     runid=runid,
                     turn=turn,
                     budget_after_turn=budget_after_turn,
                     initial_reason=strict_reason,
+                    generations=generations,
+                    cache=validator_cache,
+                    tracer=tracer,
+                    calls=calls,
                 )
                 store.write_text(tdir / "tmps_raw_retry_strict.txt", raw)
-                parsed_snapshot = json.dumps(parsed, default=lambda o: o.__dict__, sort_keys=True)
-                normalized = normalize_tmps(parsed, budget_after_turn)
-                normalized_snapshot = json.dumps(normalized, default=lambda o: o.__dict__, sort_keys=True)
+                with tracer.span("normalize", "parse"):
+                    parsed_snapshot = json.dumps(parsed, default=lambda o: o.__dict__, sort_keys=True)
+                    normalized = normalize_tmps(parsed, budget_after_turn)
+                    normalized_snapshot = json.dumps(normalized, default=lambda o: o.__dict__, sort_keys=True)
                 if normalized_snapshot != parsed_snapshot:
                     raise ParseError(strict_reason)
 
+            if validator_cache is not None:
+                store.write_json(run_root / "validator_cache.json", validator_cache.stats.to_dict())
+            if specialist_cache is not None:
+                store.write_json(run_root / "specialist_cache.json", specialist_cache.stats.to_dict())
+            store.write_json(
+                tdir / "validator_generation.json",
+                {"calls": generations, "tokens_saved": sum(g.get("tokens_saved", 0) for g in generations)},
+            )
+            turn_calls = list(calls)
+            calls.clear()
+            run_calls.extend(turn_calls)
+            store.write_json(tdir / "llm_calls.json", {"calls": turn_calls, **rollup(turn_calls)})
             store.write_json(tdir / "tmps_parsed.json", json.loads(json.dumps(parsed, default=lambda o: o.__dict__)))
             store.write_json(tdir / "tmps_normalized.json", json.loads(json.dumps(normalized, default=lambda o: o.__dict__)))
             last_tmps_raw = raw
 
             final_dir = run_root / "final"
-            final_dir.mkdir(parents=True, exist_ok=True)
             decision = normalized.c.decision
+            checks_full = None
+            if decision == "A" and checks.get("impact", {}).get("skipped"):
+                # Never accept on a partial check run: run the whole suite first.
+                with tracer.span("checks", "checks", turn=turn, full=True) as span:
+                    checks_full = yield _Call(
+                        "checks",
+                        (work_repo, self.cfg, patch_apply.get("ok", False)),
+                        {"log_dir": tdir / "checks_full", **self._checks_kwargs({}, tracer, scoped=False)},
+                    )
+                    span.set(summary=checks_full["summary"])
+                store.write_json(tdir / "checks_full.json", checks_full)
+                if checks_full["summary"] != "ok":
+                    decision = "R"
             store.write_text(final_dir / "decision.txt", decision)
+            outcome = "A" if decision == "A" else "E" if decision == "E" or abs_remaining <= 0 else None
+            if outcome is not None:
+                store.write_json(final_dir / "llm_metrics.json", {"turns": turn + 1, **rollup(run_calls)})
+            duration_ms = int((time.time() - turn_started) * 1000)
+            store.write_json(
+                tdir / "turn.json", {"started_at": turn_started, "duration_ms": duration_ms, "decision": decision}
+            )
+            if self.cfg.runs_index:
+                record = turn_record(
+                    sid,
+                    runid,
+                    turn,
+                    started_at=turn_started,
+                    duration_ms=duration_ms,
+                    agent=agent,
+                    artifact_kind=artifact.kind,
+                    patch_apply=patch_apply,
+                    checks=checks,
+                    checks_full=checks_full,
+                    generations=generations,
+                    calls=turn_calls,
+                    parse_failed=not raw,
+                    decision=decision,
+                    outcome=outcome,
+                )
+                yield _Call("runs_index", (store.runs_db_path(), record))
+            if checks_full is not None:
+                checks = checks_full
 
             if decision == "A":
-                diff = subprocess.run(
-                    ["git", "diff", "--no-index", str(repo), str(work_repo)], capture_output=True, text=True
-                ).stdout
+                with tracer.span("final_diff", "io"):
+                    diff = yield _Call("final_diff", (repo, work_repo, list(touched)))
                 store.write_text(final_dir / "final_patch.diff", diff)
                 store.write_text(final_dir / "final_summary.md", f"Accepted on turn {turn}. checks={checks['summary']}\n")
                 return {"decision": "A", "run_root": str(run_root)}
 
             if decision == "E" or abs_remaining <= 0:
                 esc = final_dir / "escalation_bundle"
-                esc.mkdir(parents=True, exist_ok=True)
                 store.write_text(esc / "last_tmps_raw.txt", raw)
                 store.write_json(esc / "last_tmps_normalized.json", json.loads(json.dumps(normalized, default=lambda o: o.__dict__)))
                 store.write_text(esc / "last_specialist_output.txt", specialist_output)
@@ -146,14 +488,133 @@ class Orchestrator:
             if decision in {"R", "X"}:
                 budget = budget_after_turn
 
-            agent = normalized.b[0].agent
-            task = normalized.b[0].action
             focus = normalized.c.focus
-            delta = extract_delta(focus, artifact.payload, checks["summary"])
-            specialist_prompt = build_specialist_prompt(normalized.c.strategy, agent, request_text, raw, delta, task)
+            delta = extract_delta(focus, artifact.payload, checks["summary"], checks=checks, repo=work_repo)
+            steps = independent_steps(normalized.b, self.cfg.agents) if self.cfg.parallel_decompose else []
+            store.flush()
             turn += 1
             abs_remaining -= 1
-            specialist_output = self._call_specialist(agent, specialist_prompt)
+            if len(steps) > 1:
+                branches = yield from self._decompose(
+                    steps, normalized.c.strategy, request_text, raw, delta, work_repo, turn, specialist_cache,
+                    repo_summary=repo_summary,
+                    tracer=tracer,
+                    calls=calls,
+                )
+                agent = ",".join(br.agent for br in branches)
+                specialist_prompt = _branch_join(branches, "prompt")
+                specialist_output = _branch_join(branches, "output")
+                continue
+
+            branches = []
+            agent = normalized.b[0].agent
+            task = normalized.b[0].action
+            specialist_prompt = build_specialist_prompt(
+                normalized.c.strategy, agent, request_text, raw, delta, task, repo_summary
+            )
+            specialist_output = yield from self._call_specialist(
+                agent, specialist_prompt, repo=work_repo, cache=specialist_cache, tracer=tracer, calls=calls
+            )
+
+    def _decompose(
+        self,
+        steps: list[BLine],
+        strategy: int,
+        request_text: str,
+        raw: str,
+        delta: str,
+        work_repo: Path,
+        turn: int,
+        cache: _RunCache | None = None,
+        *,
+        repo_summary: str = "",
+        tracer=NULL_TRACER,
+        calls: list[dict] | None = None,
+    ):
+        """Fan independent B-lines out to their specialists, each in a sandbox copy of the work repo."""
+        branch_root = work_repo.parent / "branches" / str(turn)
+        plans = []
+        # Branches may run on separate threads: each gets its own cache statistics and
+        # call list, merged in B-line order once they are done.
+        branch_caches = [cache.branch() if cache is not None else None for _ in steps]
+        branch_calls: list[list[dict]] = [[] for _ in steps]
+        for line, branch_cache, line_calls in zip(steps, branch_caches, branch_calls):
+            prompt = build_specialist_prompt(strategy, line.agent, request_text, raw, delta, line.action, repo_summary)
+            branch_repo = branch_root / f"{line.pri}_{line.agent}" / "repo"
+            lane = tracer.track(f"branch {line.pri}:{line.agent}")
+            plans.append(self._branch_steps(line, prompt, work_repo, branch_repo, branch_cache, lane, line_calls))
+        with tracer.span("fanout", "run", turn=turn, branches=len(plans)):
+            results = yield _Call("fanout", (plans,))
+        for branch_cache, line_calls in zip(branch_caches, branch_calls):
+            if cache is not None:
+                cache.merge(branch_cache)
+            if calls is not None:
+                calls.extend(line_calls)
+        return results
+
+    def _branch_steps(
+        self,
+        line: BLine,
+        prompt: str,
+        base_repo: Path,
+        branch_repo: Path,
+        cache: _RunCache | None = None,
+        tracer=NULL_TRACER,
+        calls: list[dict] | None = None,
+    ):
+        with tracer.span("sandbox", "io"):
+            yield _Call("sandbox", (base_repo, branch_repo, self.cfg.clone_strategy), self._clone_kwargs())
+        output = yield from self._call_specialist(
+            line.agent, prompt, repo=branch_repo, cache=cache, tracer=tracer, calls=calls
+        )
+        with tracer.span("parse_artifact", "parse") as span:
+            artifact = parse_artifact(output)
+            span.set(kind=artifact.kind)
+        patch_apply = {"ok": False, "error": "invalid artifact"}
+        if artifact.kind in {"diff", "file_blocks"}:
+            with tracer.span("patch_apply", "patch", kind=artifact.kind) as span:
+                if artifact.kind == "diff":
+                    patch_apply = yield _Call(
+                        "apply_diff", (branch_repo, artifact.payload, self.cfg.allow_renames), self._patch_kwargs()
+                    )
+                else:
+                    patch_apply = yield _Call("apply_file_blocks", (branch_repo, artifact.payload))
+                span.set(ok=bool(patch_apply.get("ok")))
+        return BranchResult(
+            pri=line.pri,
+            agent=line.agent,
+            prompt=prompt,
+            output=output,
+            kind=artifact.kind,
+            payload=artifact.payload,
+            patch_apply=patch_apply,
+            repo=branch_repo,
+            paths=touched_paths(artifact.kind, artifact.payload) if artifact.kind != "invalid" else [],
+        )
+
+    def _count_tokens(self, text: str) -> int:
+        # The validator's own tokenizer when the backend exposes one (HF, once loaded).
+        counter = getattr(self.validator_llm, "count_tokens", None)
+        if callable(counter) and not inspect.iscoroutinefunction(counter):
+            count = counter(self.cfg.validator_model, text)
+            if isinstance(count, int):
+                return count
+        return estimate_tokens(text)
+
+    def _clone_kwargs(self) -> dict:
+        # Check commands (formatters, codegen) may rewrite files in place, which would
+        # write through a hardlink farm into the source repo.
+        return {"allow_hardlink": not self.cfg.checks}
+
+    def _checks_kwargs(self, unverified: dict[str, None], tracer=NULL_TRACER, *, scoped: bool = True) -> dict:
+        kwargs = {"tracer": tracer} if tracer.enabled else {}
+        if scoped and any(chk.paths or chk.impact for chk in self.cfg.checks):
+            kwargs["changed"] = list(unverified)
+        return kwargs
+
+    def _patch_kwargs(self) -> dict:
+        cfg = self.cfg
+        return {"engine": cfg.patch_engine, "fuzz": cfg.patch_fuzz, "max_offset": cfg.patch_max_offset}
 
     def _validator_options(self) -> dict[str, int | float | bool]:
         options: dict[str, int | float | bool] = {
@@ -167,6 +628,19 @@ class Orchestrator:
             options["seed"] = int(self.cfg.validator_seed)
         return options
 
+    def _validator_cache_key(self, prompt: str, options: dict) -> str:
+        # Validator decoding is deterministic (see _validator_options), so the output is a
+        # function of the backend, weights, prompts, options and decoding constraints.
+        return cache_key(
+            self.cfg.validator_backend,
+            self.cfg.validator_model,
+            self.cfg.validator_adapter_path,
+            VALIDATOR_SYSTEM_PROMPT,
+            prompt,
+            options,
+            {"constrained": self.cfg.validator_constrained, "early_stop": self.cfg.validator_early_stop},
+        )
+
     def _validate_tmps_with_retry(
         self,
         val_input: str,
@@ -176,7 +650,11 @@ class Orchestrator:
         turn: int,
         budget_after_turn: int,
         initial_reason: str | None = None,
-    ) -> tuple[str, object]:
+        generations: list[dict] | None = None,
+        cache: _RunCache | None = None,
+        tracer=NULL_TRACER,
+        calls: list[dict] | None = None,
+    ):
         reason = initial_reason
 
         for attempt in range(MAX_TMPS_RETRIES + 1):
@@ -184,16 +662,43 @@ class Orchestrator:
             if reason:
                 prompt = f"{val_input}\n[INVALID_TMP-S] reason={reason} regenerate strictly valid TMP-S only"
 
-            raw = self.validator_llm.generate(
-                self.cfg.validator_model,
-                prompt,
-                options=self._validator_options(),
-                system=VALIDATOR_SYSTEM_PROMPT,
-            )
+            options = self._validator_options()
+            key = None
+            hit = None
+            with tracer.span("validator", "llm", turn=turn, attempt=attempt, retry_reason=reason) as span:
+                if cache is not None:
+                    key = self._validator_cache_key(validator_input_fingerprint(prompt, sid, runid), options)
+                    hit = cache.get(key)
+                if hit is not None:
+                    raw = restore_run_ids(hit["raw"], sid, runid)
+                    stats = dict(hit.get("stats") or {}, cached=True)
+                else:
+                    raw, stats = yield _Call(
+                        "validator",
+                        (self.cfg.validator_model, prompt),
+                        {"options": options, "system": VALIDATOR_SYSTEM_PROMPT},
+                    )
+                    if cache is not None:
+                        cache.put(key, {"raw": anonymize_run_ids(raw, sid, runid), "stats": stats})
+                span.set(cached=hit is not None)
+            if generations is not None:
+                generations.append({"attempt": attempt, "retry_reason": reason, **(stats or {})})
+            if calls is not None:
+                calls.append(
+                    {
+                        "role": "validator",
+                        "model": self.cfg.validator_model,
+                        "turn": turn,
+                        "attempt": attempt,
+                        **(stats or {}),
+                        "cached": hit is not None,
+                    }
+                )
 
             try:
-                parsed = parse_tmps(raw, strict=True)
-                validate_tmps_semantics(parsed, expected_budget_after_turn=budget_after_turn)
+                with tracer.span("validate_tmps", "parse"):
+                    parsed = parse_tmps(raw, strict=True)
+                    validate_tmps_semantics(parsed, expected_budget_after_turn=budget_after_turn)
                 return raw, parsed
             except (ParseError, TMPSValidationError) as err:
                 reason = str(err)
@@ -204,20 +709,44 @@ class Orchestrator:
         parsed = synthetic_meta_escalation(sid, runid, turn)
         return "", parsed
 
-    def _call_specialist(self, agent: str, prompt: str) -> str:
-        output = self._call_agent(agent, prompt)
-        for _ in range(2):
+    def _call_specialist(
+        self,
+        agent: str,
+        prompt: str,
+        *,
+        repo: Path | None = None,
+        cache: _RunCache | None = None,
+        tracer=NULL_TRACER,
+        calls: list[dict] | None = None,
+    ):
+        with tracer.span("specialist", "llm", agent=agent, attempt=0):
+            output = yield from self._call_agent(agent, prompt, repo=repo, cache=cache, calls=calls)
+        for attempt in range(1, 3):
             if parse_artifact(output).kind != "invalid":
                 return output
-            output = self._call_agent(
-                agent,
-                prompt
-                + "\n\n[FORMAT_ERROR] Return ONLY one unified diff (starting with 'diff --git') "
-                + "or FILE blocks (starting with 'FILE: '). No prose, no markdown fences.",
-            )
+            with tracer.span("specialist", "llm", agent=agent, attempt=attempt, retry_reason="format"):
+                output = yield from self._call_agent(
+                    agent,
+                    prompt
+                    + "\n\n[FORMAT_ERROR] Return ONLY one unified diff (starting with 'diff --git') "
+                    + "or FILE blocks (starting with 'FILE: '). No prose, no markdown fences.",
+                    repo=repo,
+                    cache=cache,
+                    calls=calls,
+                    attempt=attempt,
+                )
         return output
 
-    def _call_agent(self, agent: str, prompt: str) -> str:
+    def _call_agent(
+        self,
+        agent: str,
+        prompt: str,
+        *,
+        repo: Path | None = None,
+        cache: _RunCache | None = None,
+        calls: list[dict] | None = None,
+        attempt: int = 0,
+    ):
         cfg = self.cfg.agents.get(agent)
         model = cfg.model if cfg else self.cfg.validator_model
         options = None
@@ -229,4 +758,27 @@ class Orchestrator:
             }
             if cfg.seed_optional is not None:
                 options["seed"] = cfg.seed_optional
-        return self.llm.generate(model, prompt, options=options)
+
+        record = {"role": "specialist", "agent": agent, "model": model, "attempt": attempt}
+        # Only seeded greedy agents are reproducible enough to cache.
+        cacheable = cache is not None and repo is not None and cfg is not None
+        cacheable = cacheable and cfg.seed_optional is not None and cfg.temperature == 0
+        key = None
+        if cacheable:
+            key = cache_key(
+                model,
+                options,
+                anonymize_run_ids(prompt, cache.sid, cache.runid),
+                tree_hash(repo, cache.tree_memo),
+            )
+            hit = cache.get(key)
+            if hit is not None:
+                if calls is not None:
+                    calls.append({**record, "cached": True})
+                return hit["output"]
+        output, stats = yield _Call("specialist", (model, prompt), {"options": options})
+        if key is not None:
+            cache.put(key, {"output": output})
+        if calls is not None:
+            calls.append({**record, **(stats or {}), "cached": False})
+        return output
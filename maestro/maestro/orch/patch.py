@@ -1,8 +1,17 @@
 from __future__ import annotations
 
+import asyncio
+import difflib
+import os
+import re
 import subprocess
+import tempfile
+from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
 
+from maestro.orch.sandbox import ensure_private
+
 
 def _reject_unsafe_diff(diff: str, allow_renames: bool = False) -> str | None:
     for line in diff.splitlines():
@@ -17,17 +26,488 @@ def _reject_unsafe_diff(diff: str, allow_renames: bool = False) -> str | None:
     return None
 
 
-def apply_diff(repo: Path, diff: str, allow_renames: bool = False) -> dict:
-    reason = _reject_unsafe_diff(diff, allow_renames)
-    if reason:
-        return {"ok": False, "error": reason}
+def _strip_prefix(path: str) -> str | None:
+    path = path.split("\t", 1)[0].strip()
+    if path == "/dev/null":
+        return None
+    if path.startswith(("a/", "b/")):
+        return path[2:]
+    return path
+
+
+_HUNK_HEADER = re.compile(r"^@@ -\d+(?:,(\d+))? \+\d+(?:,(\d+))? @@")
+
+
+def touched_paths(kind: str, payload: str) -> list[str]:
+    """Repo-relative paths an artifact writes to, in first-seen order."""
+    seen: dict[str, None] = {}
+    old_left = new_left = 0
+    for line in payload.split("\n"):
+        line = line.rstrip("\r")
+        path = None
+        if kind == "file_blocks":
+            if line.startswith("FILE: "):
+                path = line[6:].strip()
+        elif old_left > 0 or new_left > 0:
+            # Inside a hunk: "--- x" is a removed "-- x" line, not a header.
+            if line.startswith("-"):
+                old_left -= 1
+            elif line.startswith("+"):
+                new_left -= 1
+            elif not line.startswith("\\"):
+                old_left -= 1
+                new_left -= 1
+            continue
+        elif m := _HUNK_HEADER.match(line):
+            old_left = int(m.group(1) or 1)
+            new_left = int(m.group(2) or 1)
+        elif line.startswith(("--- ", "+++ ")):
+            path = _strip_prefix(line[4:])
+        elif line.startswith("rename from "):
+            path = line[len("rename from "):].strip()
+        elif line.startswith("rename to "):
+            path = line[len("rename to "):].strip()
+        if path:
+            seen.setdefault(path, None)
+    return list(seen)
+
+
+def _file_state(root: Path, rel: str) -> tuple[bytes | None, str | None]:
+    path = root / rel
+    if path.is_symlink():
+        return os.readlink(path).encode("utf-8"), "120000"
+    if not path.is_file():
+        return None, None
+    return path.read_bytes(), "100755" if os.access(path, os.X_OK) else "100644"
+
+
+def _split_keepends(text: str) -> list[str]:
+    """Lines of ``text`` ending at ``\n`` only, as git sees them (``splitlines`` also breaks on ``\x0c``, ``\u2028``, ...)."""
+    lines = [line + "\n" for line in text.split("\n")]
+    lines[-1] = lines[-1][:-1]
+    if not lines[-1]:
+        lines.pop()
+    return lines
+
+
+def _diff_lines(old: str, new: str, rel: str, old_exists: bool, new_exists: bool) -> list[str]:
+    out = []
+    a = _split_keepends(old)
+    b = _split_keepends(new)
+    fromfile = f"a/{rel}" if old_exists else "/dev/null"
+    tofile = f"b/{rel}" if new_exists else "/dev/null"
+    for line in difflib.unified_diff(a, b, fromfile, tofile, lineterm="\n"):
+        if line.endswith("\n"):
+            out.append(line)
+        else:
+            out.append(line + "\n\\ No newline at end of file\n")
+    return out
+
+
+def diff_paths(base: Path, work: Path, paths) -> str:
+    """Unified git-style diff of ``paths`` between ``base`` and ``work``.
+
+    Only the given repo-relative paths are read, so the cost is proportional to
+    the number of changed files rather than the size of the trees. The result
+    uses ``a/``/``b/`` prefixes and applies with ``git apply`` inside ``base``.
+    """
+    base_root, work_root = base.resolve(), work.resolve()
+    chunks: list[str] = []
+    for rel in sorted(set(paths)):
+        rel = Path(rel).as_posix()
+        if rel.startswith("/") or ".." in rel.split("/") or rel in {"", "."}:
+            continue
+        old, old_mode = _file_state(base_root, rel)
+        new, new_mode = _file_state(work_root, rel)
+        if old == new and old_mode == new_mode:
+            continue
+        header = [f"diff --git a/{rel} b/{rel}\n"]
+        if old is None:
+            header.append(f"new file mode {new_mode}\n")
+        elif new is None:
+            header.append(f"deleted file mode {old_mode}\n")
+        elif old_mode != new_mode:
+            header += [f"old mode {old_mode}\n", f"new mode {new_mode}\n"]
+        if old == new:
+            chunks.append("".join(header))
+            continue
+        try:
+            old_text = (old or b"").decode("utf-8")
+            new_text = (new or b"").decode("utf-8")
+        except UnicodeDecodeError:
+            old_text = new_text = None
+        if old_text is None or "\0" in old_text or "\0" in new_text:
+            a = f"a/{rel}" if old is not None else "/dev/null"
+            b = f"b/{rel}" if new is not None else "/dev/null"
+            header.append(f"Binary files {a} and {b} differ\n")
+            chunks.append("".join(header))
+            continue
+        chunks.append("".join(header + _diff_lines(old_text, new_text, rel, old is not None, new is not None)))
+    return "".join(chunks)
+
+
+_HUNK_RANGE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+_NO_NEWLINE = "\\ No newline at end of file"
+
+
+@dataclass
+class _Hunk:
+    old_start: int
+    new_start: int
+    lines: list[tuple[str, str]] = field(default_factory=list)  # (" "|"-"|"+", text)
+    old_no_newline: bool = False
+    new_no_newline: bool = False
+    missing: int = 0  # counted lines the diff ended before supplying
+
+
+@dataclass
+class _FilePatch:
+    old_path: str | None
+    new_path: str | None
+    hunks: list[_Hunk] = field(default_factory=list)
+    new_mode: str | None = None
+    rename: bool = False
+
+
+def _parse_diff(diff: str) -> list[_FilePatch]:
+    """Parse a (git-style or plain) unified diff.
+
+    Lines are split on ``\n`` only, so hunk bodies keep ``\r`` and any other
+    characters ``str.splitlines`` would break on. A hunk may run past its
+    ``@@`` counts, but one that ends before supplying them is marked with the
+    number of ``missing`` lines and fails to apply.
+    """
+    files: list[_FilePatch] = []
+    current: _FilePatch | None = None
+    lines = diff.split("\n")
+    if lines and lines[-1] == "":
+        lines.pop()
+    i = 0
+    while i < len(lines):
+        line = lines[i].rstrip("\r")
+        if line.startswith("diff --git "):
+            parts = line[len("diff --git "):].split(" ")
+            old = _strip_prefix(parts[0]) if parts else None
+            new = _strip_prefix(parts[-1]) if len(parts) > 1 else old
+            current = _FilePatch(old, new)
+            files.append(current)
+        elif line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+            old, new = _strip_prefix(line[4:]), _strip_prefix(lines[i + 1][4:].rstrip("\r"))
+            if current is None or current.hunks:
+                current = _FilePatch(old, new)
+                files.append(current)
+            else:
+                current.old_path, current.new_path = old, new
+            i += 1
+        elif current is not None and line.startswith(("new file mode ", "new mode ")):
+            current.new_mode = line.rsplit(" ", 1)[-1]
+            if line.startswith("new file mode "):
+                current.old_path = None
+        elif current is not None and line.startswith("deleted file mode "):
+            current.new_path = None
+        elif current is not None and line.startswith("rename from "):
+            current.old_path, current.rename = line[len("rename from "):].strip(), True
+        elif current is not None and line.startswith("rename to "):
+            current.new_path, current.rename = line[len("rename to "):].strip(), True
+        elif current is not None and (m := _HUNK_RANGE.match(line)):
+            hunk = _Hunk(int(m.group(1)), int(m.group(3)))
+            old_left, new_left = int(m.group(2) or 1), int(m.group(4) or 1)
+            i += 1
+            while i < len(lines):
+                body = lines[i]
+                if body.startswith("\\"):
+                    if hunk.lines and hunk.lines[-1][0] != "+":
+                        hunk.old_no_newline = True
+                    if hunk.lines and hunk.lines[-1][0] != "-":
+                        hunk.new_no_newline = True
+                    i += 1
+                    continue
+                counted = old_left > 0 or new_left > 0
+                if body == "" and counted:
+                    body = " "  # blank context line whose leading space was stripped
+                if not body or body[0] not in " +-" or body.startswith(("@@", "diff --git ")):
+                    break
+                if not counted and (body.startswith("--- ") or body.startswith("+++ ")):
+                    break
+                op = body[0]
+                hunk.lines.append((op, body[1:]))
+                if op != "+":
+                    old_left -= 1
+                if op != "-":
+                    new_left -= 1
+                i += 1
+            hunk.missing = max(old_left, new_left, 0)
+            current.hunks.append(hunk)
+            continue
+        i += 1
+    return files
+
+
+def _match(lines: list[str], pattern: list[str], at: int, loose: bool) -> bool:
+    if at < 0 or at + len(pattern) > len(lines):
+        return False
+    if loose:
+        return all(a.rstrip() == b.rstrip() for a, b in zip(lines[at : at + len(pattern)], pattern))
+    return lines[at : at + len(pattern)] == pattern
+
+
+def _locate(lines: list[str], pattern: list[str], expected: int, max_offset: int, loose: bool) -> int | None:
+    """Nearest position to ``expected`` (within ``max_offset`` lines) where ``pattern`` matches."""
+    if not pattern:
+        return min(max(expected, 0), len(lines))
+    for delta in range(max_offset + 1):
+        for at in (expected - delta, expected + delta) if delta else (expected,):
+            if _match(lines, pattern, at, loose):
+                return at
+    return None
+
+
+def _apply_hunk(lines: list[str], hunk: _Hunk, shift: int, fuzz: int, max_offset: int) -> tuple[list[str], dict] | None:
+    """Apply one hunk to ``lines``; ``shift`` is the line delta from earlier hunks.
+
+    Tries an exact context match first, then (up to ``fuzz``) drops outer context
+    lines and finally ignores trailing whitespace, like ``patch --fuzz``.
+    """
+    if any(op != "+" for op, _ in hunk.lines):
+        start = hunk.old_start - 1
+    else:
+        start = hunk.old_start  # pure insertion after line ``old_start``
+    leading = next((n for n, (op, _) in enumerate(hunk.lines) if op != " "), len(hunk.lines))
+    trailing = next((n for n, (op, _) in enumerate(reversed(hunk.lines)) if op != " "), len(hunk.lines))
+    for level in range(fuzz + 1):
+        for loose in (False, True) if level else (False,):
+            top, bottom = min(level, leading), min(level, trailing)
+            body = hunk.lines[top : len(hunk.lines) - bottom]
+            old = [text for op, text in body if op != "+"]
+            if not old and (top or bottom):
+                continue  # never fuzz a hunk down to no anchor at all
+            at = _locate(lines, old, start + shift + top, max_offset, loose)
+            if at is None:
+                continue
+            out, pos = [], at
+            for op, text in body:
+                if op == " ":
+                    out.append(lines[pos])  # keep the file's own context line
+                    pos += 1
+                elif op == "-":
+                    pos += 1
+                else:
+                    out.append(text)
+            new_lines = lines[:at] + out + lines[pos:]
+            info = {"offset": at - (start + shift + top), "fuzz": level, "loose_whitespace": loose, "at_eof": pos == len(lines)}
+            return new_lines, info
+    return None
+
+
+def _safe_target(root: Path, rel: str) -> Path | None:
+    target = (root / rel).resolve()
+    if root not in target.parents:
+        return None
+    return target
+
+
+@lru_cache(maxsize=1)
+def _new_file_mode() -> int:
+    """Mode ``open()`` would give a new file: ``0o666`` less the process umask (read once)."""
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def _write_atomic(path: Path, data: bytes, mode: int | None) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".maestro-patch")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        if mode is not None:
+            os.chmod(tmp, mode)
+        # A fresh inode also detaches the file from hardlink-farm clones.
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def _apply_python(repo: Path, diff: str, fuzz: int, max_offset: int) -> dict:
+    root = Path(repo).resolve()
+    files = _parse_diff(diff)
+    if not files:
+        return {"ok": False, "engine": "python", "error": "no file patches found", "hunks": []}
+
+    hunks_report: list[dict] = []
+    # path -> (new bytes or None for delete, mode or None)
+    writes: dict[Path, tuple[bytes | None, int | None]] = {}
+    error = None
+    for fp in files:
+        rel = fp.new_path or fp.old_path
+        if rel is None:
+            error = "patch without a file path"
+            break
+        src = _safe_target(root, fp.old_path) if fp.old_path else None
+        dst = _safe_target(root, fp.new_path) if fp.new_path else None
+        if (fp.old_path and src is None) or (fp.new_path and dst is None):
+            error = f"{rel}: path traversal"
+            break
+        if src is not None and src in writes:
+            current = writes[src][0]
+        elif src is not None:
+            current = src.read_bytes() if src.is_file() else None
+        else:
+            current = None
+        if fp.old_path is not None and current is None:
+            error = f"{fp.old_path}: No such file"
+            break
+        if fp.old_path is None and (writes[dst][0] is not None if dst in writes else dst.exists()):
+            error = f"{fp.new_path}: already exists"
+            break
+        try:
+            text = (current or b"").decode("utf-8")
+        except UnicodeDecodeError:
+            error = f"{rel}: not a UTF-8 text file"
+            break
+        lines = text.split("\n")
+        eof_newline = text.endswith("\n") or not text
+        if lines and lines[-1] == "":
+            lines.pop()
+        shift = 0
+        for idx, hunk in enumerate(fp.hunks):
+            if hunk.missing:
+                hunks_report.append(
+                    {"path": rel, "hunk": idx, "ok": False, "error": f"hunk ends {hunk.missing} line(s) short of its @@ counts"}
+                )
+                error = f"{rel}: malformed patch (hunk {idx})"
+                break
+            applied = _apply_hunk(lines, hunk, shift, fuzz, max_offset)
+            entry = {"path": rel, "hunk": idx, "ok": applied is not None}
+            if applied is None:
+                entry["error"] = f"hunk @@ -{hunk.old_start} +{hunk.new_start} @@ does not match"
+                hunks_report.append(entry)
+                error = f"{rel}: patch does not apply (hunk {idx})"
+                break
+            new_lines, info = applied
+            shift += len(new_lines) - len(lines)
+            lines = new_lines
+            if info.pop("at_eof"):
+                eof_newline = not hunk.new_no_newline
+            entry.update(info)
+            hunks_report.append(entry)
+        if error:
+            break
+        mode = None
+        if fp.new_mode:
+            mode = 0o755 if fp.new_mode.endswith("755") else 0o644
+        elif src is not None and src.exists():
+            mode = src.stat().st_mode & 0o777
+        else:
+            mode = _new_file_mode()  # not mkstemp's 0600
+        if fp.new_path is None:
+            if lines:
+                error = f"{rel}: deleted file still has content"
+                break
+            writes[src] = (None, None)
+            continue
+        data = ("\n".join(lines) + ("\n" if eof_newline and lines else "")).encode("utf-8")
+        if fp.rename and src is not None and src != dst:
+            writes[src] = (None, None)
+        writes[dst] = (data, mode)
+
+    result = {"ok": error is None, "engine": "python", "hunks": hunks_report}
+    if error is not None:
+        result["error"] = error
+        return result
+
+    # Snapshot originals so a failed write restores every file touched so far.
+    originals = {path: (path.read_bytes(), path.stat().st_mode & 0o777) if path.is_file() else None for path in writes}
+    done: list[Path] = []
+    try:
+        for path, (data, mode) in writes.items():
+            done.append(path)
+            if data is None:
+                path.unlink(missing_ok=True)
+            else:
+                _write_atomic(path, data, mode)
+    except OSError as err:
+        for path in done:
+            original = originals[path]
+            if original is None:
+                path.unlink(missing_ok=True)
+            else:
+                _write_atomic(path, *original)
+        return {"ok": False, "engine": "python", "hunks": hunks_report, "error": f"write failed, rolled back: {err}"}
+    result["files"] = sorted(path.relative_to(root).as_posix() for path in writes)
+    return result
+
+
+PATCH_ENGINES = ("python", "git")
+
+
+def _git_apply(repo: Path, diff: str) -> dict:
     p = subprocess.run(["git", "apply", "--check", "-"], input=diff, text=True, cwd=repo, capture_output=True)
     if p.returncode != 0:
-        return {"ok": False, "error": p.stderr.strip() or "apply check failed"}
+        return {"ok": False, "engine": "git", "error": p.stderr.strip() or "apply check failed"}
     p2 = subprocess.run(["git", "apply", "-"], input=diff, text=True, cwd=repo, capture_output=True)
     if p2.returncode != 0:
-        return {"ok": False, "error": p2.stderr.strip() or "apply failed"}
-    return {"ok": True}
+        return {"ok": False, "engine": "git", "error": p2.stderr.strip() or "apply failed"}
+    return {"ok": True, "engine": "git"}
+
+
+def apply_diff(
+    repo: Path,
+    diff: str,
+    allow_renames: bool = False,
+    *,
+    engine: str = "python",
+    fuzz: int = 2,
+    max_offset: int = 100,
+) -> dict:
+    """Apply a unified diff to ``repo``; all-or-nothing.
+
+    The ``python`` engine applies hunks in-process, tolerating hunks that moved by
+    up to ``max_offset`` lines and (with ``fuzz`` > 0) slightly wrong context; the
+    result lists per-hunk ``offset``/``fuzz``. ``git`` shells out to ``git apply``.
+    """
+    reason = _reject_unsafe_diff(diff, allow_renames)
+    if reason:
+        return {"ok": False, "error": reason}
+    if engine == "git":
+        return _git_apply(repo, diff)
+    return _apply_python(repo, diff, max(0, fuzz), max(0, max_offset))
+
+
+async def _git_apply_async(repo: Path, diff: str, *extra: str) -> tuple[int, str]:
+    proc = await asyncio.create_subprocess_exec(
+        "git", "apply", *extra, "-",
+        cwd=repo,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    _, stderr = await proc.communicate(diff.encode("utf-8"))
+    return proc.returncode, stderr.decode("utf-8", errors="replace")
+
+
+async def apply_diff_async(
+    repo: Path,
+    diff: str,
+    allow_renames: bool = False,
+    *,
+    engine: str = "python",
+    fuzz: int = 2,
+    max_offset: int = 100,
+) -> dict:
+    reason = _reject_unsafe_diff(diff, allow_renames)
+    if reason:
+        return {"ok": False, "error": reason}
+    if engine != "git":
+        return await asyncio.to_thread(_apply_python, repo, diff, max(0, fuzz), max(0, max_offset))
+    code, stderr = await _git_apply_async(repo, diff, "--check")
+    if code != 0:
+        return {"ok": False, "engine": "git", "error": stderr.strip() or "apply check failed"}
+    code, stderr = await _git_apply_async(repo, diff)
+    if code != 0:
+        return {"ok": False, "engine": "git", "error": stderr.strip() or "apply failed"}
+    return {"ok": True, "engine": "git"}
 
 
 def apply_file_blocks(repo: Path, payload: str) -> dict:
@@ -41,6 +521,7 @@ def apply_file_blocks(repo: Path, payload: str) -> dict:
         if repo.resolve() not in target.parents and target != repo.resolve():
             return "path traversal"
         target.parent.mkdir(parents=True, exist_ok=True)
+        ensure_private(target)
         target.write_text("\n".join(buf).rstrip("\n") + "\n")
         return None
 
@@ -1,10 +1,180 @@
 from __future__ import annotations
 
+import errno
+import os
 import shutil
+import subprocess
 from pathlib import Path
 
+CLONE_STRATEGIES = ("auto", "reflink", "hardlink", "worktree", "copy")
 
-def prepare_sandbox(src_repo: Path, sandbox_repo: Path) -> None:
-    if sandbox_repo.exists():
-        shutil.rmtree(sandbox_repo)
-    shutil.copytree(src_repo, sandbox_repo, ignore=shutil.ignore_patterns(".maestro", ".git"))
+_IGNORED = {".maestro", ".git"}
+_FICLONE = 0x40049409  # _IOW(0x94, 9, int), Linux
+_UNSUPPORTED = {errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EBADF}
+
+
+class CloneUnsupported(OSError):
+    """The requested clone strategy cannot be used for this source/destination."""
+
+
+def _walk(src: Path):
+    """Yield (relative dir, dirnames, filenames) like copytree with ``.maestro``/``.git`` ignored."""
+    for dirpath, dirnames, filenames in os.walk(src):
+        dirnames[:] = [d for d in dirnames if d not in _IGNORED]
+        rel = Path(dirpath).relative_to(src)
+        yield rel, dirnames, [f for f in filenames if f not in _IGNORED]
+
+
+def _mirror(src: Path, dst: Path, link_file) -> None:
+    dst.mkdir(parents=True)
+    shutil.copystat(src, dst)
+    for rel, dirnames, filenames in _walk(src):
+        for name in dirnames:
+            s = src / rel / name
+            if s.is_symlink():
+                os.symlink(os.readlink(s), dst / rel / name)
+            else:
+                (dst / rel / name).mkdir()
+        for name in filenames:
+            s, d = src / rel / name, dst / rel / name
+            if s.is_symlink():
+                os.symlink(os.readlink(s), d)
+            else:
+                link_file(s, d)
+
+
+def _reflink_file(src: Path, dst: Path) -> None:
+    import fcntl
+
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        except OSError as err:
+            if err.errno in _UNSUPPORTED:
+                raise CloneUnsupported(err.errno, f"reflink not supported: {err.strerror}") from None
+            raise
+    shutil.copymode(src, dst)
+
+
+def _hardlink_file(src: Path, dst: Path) -> None:
+    try:
+        os.link(src, dst)
+    except OSError as err:
+        if err.errno in {errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP}:
+            raise CloneUnsupported(err.errno, f"hardlink not possible: {err.strerror}") from None
+        raise
+
+
+def _git(src: Path, *args: str, text: bool = True) -> subprocess.CompletedProcess:
+    return subprocess.run(["git", "-C", str(src), *args], capture_output=True, text=text)
+
+
+def _is_git_checkout(src: Path) -> bool:
+    p = _git(src, "rev-parse", "--show-toplevel")
+    return p.returncode == 0 and Path(p.stdout.strip()).resolve() == src.resolve()
+
+
+def _clone_worktree(src: Path, dst: Path) -> None:
+    if not _is_git_checkout(src):
+        raise CloneUnsupported(errno.ENOTSUP, "not the top level of a git checkout")
+    p = _git(src, "worktree", "add", "--detach", "--force", str(dst), "HEAD")
+    if p.returncode != 0:
+        raise CloneUnsupported(errno.ENOTSUP, p.stderr.strip() or "git worktree add failed")
+    # Overlay what HEAD does not have: uncommitted edits, deletions, untracked and
+    # ignored files, so the work tree matches what copytree would have produced.
+    status = _git(
+        src, "status", "--porcelain", "-z", "--untracked-files=all", "--ignored=traditional", "--no-renames", text=False
+    )
+    for entry in status.stdout.split(b"\0"):
+        if len(entry) < 4:
+            continue
+        code, rel = entry[:2].decode(), os.fsdecode(entry[3:])
+        if set(Path(rel).parts) & _IGNORED:
+            continue
+        s, d = src / rel, dst / rel
+        if "D" in code and not s.exists():
+            if d.is_file() or d.is_symlink():
+                d.unlink()
+            continue
+        if s.is_dir() and not s.is_symlink():
+            shutil.copytree(s, d, ignore=shutil.ignore_patterns(*_IGNORED), dirs_exist_ok=True)
+            continue
+        d.parent.mkdir(parents=True, exist_ok=True)
+        if d.is_symlink() or d.exists():
+            d.unlink()
+        if s.is_symlink():
+            os.symlink(os.readlink(s), d)
+        else:
+            shutil.copy2(s, d)
+
+
+def _copy(src: Path, dst: Path) -> None:
+    shutil.copytree(src, dst, ignore=shutil.ignore_patterns(*_IGNORED))
+
+
+def remove_tree(path: Path) -> None:
+    """Remove a cloned tree, unregistering it first if it is a git worktree."""
+    git_file = path / ".git"
+    if git_file.is_file():
+        common = _git(path, "rev-parse", "--git-common-dir")
+        shutil.rmtree(path)
+        if common.returncode == 0:
+            git_dir = path / common.stdout.strip()  # absolute output stays absolute
+            subprocess.run(["git", "--git-dir", str(git_dir), "worktree", "prune"], capture_output=True)
+        return
+    shutil.rmtree(path)
+
+
+def clone_tree(src_repo: Path, dst_repo: Path, strategy: str = "copy", *, allow_hardlink: bool = True) -> str:
+    """Materialise ``src_repo`` at ``dst_repo`` (without ``.git``/``.maestro``); returns the strategy used.
+
+    ``auto`` tries, in order: reflink copies (copy-on-write at the filesystem level),
+    a hardlink farm (only if ``allow_hardlink``; writers must call
+    :func:`ensure_private` before modifying a file in place), a ``git worktree``
+    when the source is a git checkout, and finally a plain copy.
+    """
+    if strategy not in CLONE_STRATEGIES:
+        raise ValueError(f"unknown clone strategy: {strategy}")
+    src_repo, dst_repo = Path(src_repo), Path(dst_repo)
+    if dst_repo.exists() or dst_repo.is_symlink():
+        remove_tree(dst_repo)
+    dst_repo.parent.mkdir(parents=True, exist_ok=True)
+
+    candidates = [strategy]
+    if strategy == "auto":
+        candidates = ["reflink", "hardlink", "worktree"] if allow_hardlink else ["reflink", "worktree"]
+    for name in candidates:
+        try:
+            if name == "reflink":
+                _mirror(src_repo, dst_repo, _reflink_file)
+            elif name == "hardlink":
+                _mirror(src_repo, dst_repo, _hardlink_file)
+            elif name == "worktree":
+                _clone_worktree(src_repo, dst_repo)
+            else:
+                _copy(src_repo, dst_repo)
+            return name
+        except CloneUnsupported:
+            if strategy != "auto":
+                raise
+            if dst_repo.exists():
+                remove_tree(dst_repo)
+    _copy(src_repo, dst_repo)
+    return "copy"
+
+
+def ensure_private(path: Path) -> None:
+    """Copy-up for hardlink-farm clones: give ``path`` its own inode before it is modified in place."""
+    try:
+        st = os.lstat(path)
+    except FileNotFoundError:
+        return
+    if st.st_nlink <= 1 or not os.path.isfile(path) or os.path.islink(path):
+        return
+    tmp = path.with_name(f".{path.name}.maestro-copyup")
+    shutil.copy2(path, tmp)
+    os.replace(tmp, path)
+
+
+def prepare_sandbox(src_repo: Path, sandbox_repo: Path, strategy: str = "copy", *, allow_hardlink: bool = True) -> str:
+    return clone_tree(src_repo, sandbox_repo, strategy, allow_hardlink=allow_hardlink)
@@ -0,0 +1,373 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from urllib.parse import quote
+
+from maestro.store import artifact_exists, read_artifact
+
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    sid TEXT NOT NULL,
+    runid TEXT NOT NULL,
+    started_at REAL,
+    updated_at REAL,
+    first_agent TEXT,
+    turns INTEGER NOT NULL DEFAULT 0,
+    outcome TEXT,
+    accepted_turn INTEGER,
+    PRIMARY KEY (sid, runid)
+);
+CREATE TABLE IF NOT EXISTS turns (
+    sid TEXT NOT NULL,
+    runid TEXT NOT NULL,
+    turn INTEGER NOT NULL,
+    started_at REAL,
+    duration_ms INTEGER,
+    agent TEXT,
+    artifact_kind TEXT,
+    patch_ok INTEGER,
+    checks_summary TEXT,
+    checks_failed INTEGER,
+    checks_ms INTEGER,
+    validator_calls INTEGER,
+    validator_retries INTEGER,
+    parse_failed INTEGER,
+    decision TEXT,
+    prompt_tokens INTEGER,
+    new_tokens INTEGER,
+    PRIMARY KEY (sid, runid, turn)
+);
+CREATE TABLE IF NOT EXISTS checks (
+    sid TEXT NOT NULL,
+    runid TEXT NOT NULL,
+    turn INTEGER NOT NULL,
+    full INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    started_at REAL,
+    status TEXT,
+    exit_code INTEGER,
+    duration_ms INTEGER,
+    PRIMARY KEY (sid, runid, turn, full, name)
+);
+CREATE INDEX IF NOT EXISTS runs_started ON runs (started_at);
+CREATE INDEX IF NOT EXISTS runs_outcome ON runs (outcome, started_at, first_agent, accepted_turn);
+CREATE INDEX IF NOT EXISTS turns_agent ON turns (agent);
+CREATE INDEX IF NOT EXISTS turns_started ON turns (started_at);
+CREATE INDEX IF NOT EXISTS checks_started ON checks (started_at);
+"""
+
+_TURN_COLUMNS = (
+    "sid", "runid", "turn", "started_at", "duration_ms", "agent", "artifact_kind", "patch_ok", "checks_summary",
+    "checks_failed", "checks_ms", "validator_calls", "validator_retries", "parse_failed", "decision",
+    "prompt_tokens", "new_tokens",
+)
+_CHECK_COLUMNS = ("sid", "runid", "turn", "full", "name", "started_at", "status", "exit_code", "duration_ms")
+
+
+def connect(path: Path, readonly: bool = False) -> sqlite3.Connection:
+    """Open the runs index, creating it (in WAL mode, so readers never block the writer) if needed."""
+    path = Path(path)
+    if readonly:
+        return sqlite3.connect(f"file:{quote(str(path))}?mode=ro", uri=True, timeout=30)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def turn_record(
+    sid: str,
+    runid: str,
+    turn: int,
+    *,
+    started_at: float | None,
+    duration_ms: int | None,
+    agent: str,
+    artifact_kind: str,
+    patch_apply: dict,
+    checks: dict,
+    checks_full: dict | None,
+    generations: list[dict],
+    calls: list[dict],
+    parse_failed: bool,
+    decision: str,
+    outcome: str | None,
+) -> dict:
+    """One turn's rows for :func:`record_turn`, built from the same data the turn writes to disk."""
+    failed = sum(1 for cmd in checks.get("commands", []) if cmd.get("status") == "failed")
+    tokens = [call for call in calls if not call.get("cached")]
+    row = {
+        "sid": sid,
+        "runid": runid,
+        "turn": turn,
+        "started_at": started_at,
+        "duration_ms": duration_ms,
+        "agent": agent,
+        "artifact_kind": artifact_kind,
+        "patch_ok": int(bool(patch_apply.get("ok"))),
+        "checks_summary": checks.get("summary"),
+        "checks_failed": failed,
+        "checks_ms": checks.get("wall_ms"),
+        "validator_calls": len(generations),
+        "validator_retries": max(len(generations) - 1, 0),
+        "parse_failed": int(parse_failed),
+        "decision": decision,
+        "prompt_tokens": sum(call.get("prompt_tokens") or 0 for call in tokens),
+        "new_tokens": sum(call.get("new_tokens") or 0 for call in tokens),
+    }
+    check_rows = []
+    for full, summary in ((0, checks), (1, checks_full or {})):
+        for cmd in summary.get("commands", []):
+            check_rows.append(
+                {
+                    "sid": sid,
+                    "runid": runid,
+                    "turn": turn,
+                    "full": full,
+                    "name": cmd.get("name"),
+                    "started_at": started_at,
+                    "status": cmd.get("status"),
+                    "exit_code": cmd.get("exit_code"),
+                    "duration_ms": cmd.get("duration_ms"),
+                }
+            )
+    return {"turn": row, "checks": check_rows, "outcome": outcome}
+
+
+def _write(conn: sqlite3.Connection, records: list[dict]) -> None:
+    conn.executemany(
+        f"INSERT OR REPLACE INTO turns ({','.join(_TURN_COLUMNS)}) VALUES ({','.join('?' * len(_TURN_COLUMNS))})",
+        [tuple(rec["turn"][col] for col in _TURN_COLUMNS) for rec in records],
+    )
+    conn.executemany(
+        f"INSERT OR REPLACE INTO checks ({','.join(_CHECK_COLUMNS)}) VALUES ({','.join('?' * len(_CHECK_COLUMNS))})",
+        [tuple(row[col] for col in _CHECK_COLUMNS) for rec in records for row in rec["checks"]],
+    )
+    for rec in records:
+        row = rec["turn"]
+        first_agent = row["agent"] if row["turn"] == 0 else None
+        conn.execute(
+            """
+            INSERT INTO runs (sid, runid, started_at, updated_at, first_agent, turns, outcome, accepted_turn)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (sid, runid) DO UPDATE SET
+                started_at = COALESCE(MIN(runs.started_at, excluded.started_at), runs.started_at, excluded.started_at),
+                updated_at = MAX(COALESCE(runs.updated_at, 0), excluded.updated_at),
+                first_agent = COALESCE(excluded.first_agent, runs.first_agent),
+                turns = MAX(runs.turns, excluded.turns),
+                outcome = COALESCE(excluded.outcome, runs.outcome),
+                accepted_turn = COALESCE(excluded.accepted_turn, runs.accepted_turn)
+            """,
+            (
+                row["sid"],
+                row["runid"],
+                row["started_at"],
+                (row["started_at"] or 0) + (row["duration_ms"] or 0) / 1000,
+                first_agent,
+                row["turn"] + 1,
+                rec["outcome"],
+                row["turn"] if rec["outcome"] == "A" else None,
+            ),
+        )
+
+
+def record_turn(path: Path, record: dict) -> None:
+    """Upsert one finished turn (and its run's summary row); called at the end of every turn."""
+    conn = connect(path)
+    try:
+        with conn:
+            _write(conn, [record])
+    finally:
+        conn.close()
+
+
+def forget_runs(path: Path, keys: list[tuple[str, str]]) -> None:
+    """Delete the rows of the ``(sid, runid)`` runs, e.g. after ``maestro gc`` removed their directories."""
+    conn = connect(path)
+    try:
+        with conn:
+            for table in ("checks", "turns", "runs"):
+                conn.executemany(f"DELETE FROM {table} WHERE sid = ? AND runid = ?", keys)
+    finally:
+        conn.close()
+
+
+def _read_json(path: Path) -> dict | list | None:
+    try:
+        return json.loads(read_artifact(path))
+    except (OSError, ValueError):
+        return None
+
+
+def _read_text(path: Path) -> str | None:
+    try:
+        return read_artifact(path)
+    except OSError:
+        return None
+
+
+def scan_run(run_root: Path) -> list[dict]:
+    """Rebuild a run's turn records from its artifacts on disk."""
+    run_root = Path(run_root)
+    sid, runid = run_root.parent.name, run_root.name
+    final = run_root / "final"
+    outcome = None
+    if artifact_exists(final / "final_summary.md"):
+        outcome = "A"
+    elif (final / "escalation_bundle").is_dir():
+        outcome = "E"
+    turn_dirs = sorted(
+        (int(p.name), p) for p in (run_root / "turns").glob("*") if p.is_dir() and p.name.isdigit()
+    )
+    records = []
+    for turn, tdir in turn_dirs:
+        meta = _read_json(tdir / "turn.json") or {}
+        generation = _read_json(tdir / "validator_generation.json")
+        if generation is None:
+            continue  # the turn did not get as far as the validator
+        raw = _read_text(tdir / "tmps_raw.txt")
+        normalized = _read_json(tdir / "tmps_normalized.json") or {}
+        decision = meta.get("decision") or (normalized.get("c") or {}).get("decision")
+        last = turn == turn_dirs[-1][0]
+        records.append(
+            turn_record(
+                sid,
+                runid,
+                turn,
+                started_at=meta.get("started_at"),
+                duration_ms=meta.get("duration_ms"),
+                agent=(_read_text(tdir / "specialist_agent.txt") or "").strip(),
+                artifact_kind=(_read_json(tdir / "artifact_kind.json") or {}).get("kind"),
+                patch_apply=_read_json(tdir / "patch_apply.json") or {},
+                checks=_read_json(tdir / "checks.json") or {},
+                checks_full=_read_json(tdir / "checks_full.json"),
+                generations=generation.get("calls", []),
+                calls=(_read_json(tdir / "llm_calls.json") or {}).get("calls", []),
+                parse_failed=raw is not None and not raw.strip(),
+                decision=decision,
+                outcome=outcome if last else None,
+            )
+        )
+    return records
+
+
+def run_roots(maestro_dir: Path) -> list[Path]:
+    return sorted(p for p in (Path(maestro_dir) / "runs").glob("*/*") if (p / "turns").is_dir())
+
+
+def rebuild(maestro_dir: Path, path: Path, workers: int | None = None) -> dict:
+    """Recreate the index from every run under ``maestro_dir``; runs are scanned on a process pool."""
+    started = time.perf_counter()
+    roots = run_roots(maestro_dir)
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(roots) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            scanned = list(pool.map(scan_run, roots, chunksize=max(1, len(roots) // (workers * 4))))
+    else:
+        scanned = [scan_run(root) for root in roots]
+    # Build into a scratch file, then copy it over the live index in one write
+    # transaction with SQLite's backup API: orchestrators writing concurrently
+    # never see a missing or half-built index. (Replacing the file itself would
+    # pair the new database with the old one's -wal file.)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, scratch = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".rebuild")
+    os.close(fd)
+    try:
+        src = connect(Path(scratch))
+        try:
+            with src:
+                _write(src, [rec for records in scanned for rec in records])
+            dst = connect(path)
+            try:
+                src.backup(dst)
+            finally:
+                dst.close()
+        finally:
+            src.close()
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{scratch}{suffix}").unlink(missing_ok=True)
+    return {
+        "runs": len(roots),
+        "turns": sum(len(records) for records in scanned),
+        "ms": int((time.perf_counter() - started) * 1000),
+    }
+
+
+def query(path: Path, sql: str, params: tuple = ()) -> tuple[list[str], list[tuple]]:
+    """Run a read-only query; returns column names and rows."""
+    conn = connect(path, readonly=True)
+    try:
+        cur = conn.execute(sql, params)
+        return [col[0] for col in cur.description or ()], cur.fetchall()
+    finally:
+        conn.close()
+
+
+def _percentile(values: list[float], pct: float) -> float | None:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[max(0, math.ceil(pct / 100 * len(values)) - 1)]  # nearest rank
+
+
+def stats(path: Path, since: float | None = None) -> dict:
+    """Accept rates, turns to accept (p50/p95) per first agent, validator retry and parse failure rates."""
+    conn = connect(path, readonly=True)
+    # A bare ``started_at >= ?`` (no COALESCE) lets SQLite use the started_at indexes.
+    since_sql, params = (" AND started_at >= ?", (since,)) if since is not None else ("", ())
+    try:
+        runs = conn.execute(
+            "SELECT COUNT(*), SUM(outcome = 'A'), SUM(outcome = 'E'), SUM(outcome IS NULL) FROM runs WHERE 1"
+            + since_sql,
+            params,
+        ).fetchone()
+        per_agent: dict[str, list[int]] = {}
+        for agent, turns in conn.execute(
+            "SELECT first_agent, accepted_turn + 1 FROM runs WHERE outcome = 'A'" + since_sql, params
+        ):
+            per_agent.setdefault(agent or "?", []).append(turns)
+        turns = conn.execute(
+            "SELECT COUNT(*), SUM(validator_calls), SUM(validator_retries), SUM(parse_failed), AVG(duration_ms),"
+            " SUM(patch_ok) FROM turns WHERE 1" + since_sql,
+            params,
+        ).fetchone()
+        checks = conn.execute(
+            "SELECT name, COUNT(*), SUM(status = 'failed') FROM checks WHERE status IN ('ok', 'failed')"
+            + since_sql
+            + " GROUP BY name ORDER BY name",
+            params,
+        ).fetchall()
+    finally:
+        conn.close()
+    n_turns, validator_calls, retries, parse_failed, avg_ms, patch_ok = turns
+    return {
+        "runs": runs[0],
+        "accepted": runs[1] or 0,
+        "escalated": runs[2] or 0,
+        "unfinished": runs[3] or 0,
+        "turns_to_accept": {
+            agent: {"runs": len(v), "p50": _percentile(v, 50), "p95": _percentile(v, 95)}
+            for agent, v in sorted(per_agent.items())
+        },
+        "turns": n_turns,
+        "turn_ms_avg": round(avg_ms, 1) if avg_ms is not None else None,
+        "patch_apply_rate": round(patch_ok / n_turns, 4) if n_turns else None,
+        "validator_retry_rate": round(retries / validator_calls, 4) if validator_calls else None,
+        "parse_failure_rate": round(parse_failed / n_turns, 4) if n_turns else None,
+        "check_failure_rate": {name: round(failed / total, 4) for name, total, failed in checks},
+    }
@@ -1,10 +1,18 @@
 from __future__ import annotations
 
+import gzip
+import hashlib
 import json
+import os
+import queue
 import random
-import shutil
 import string
+import tempfile
+import time
 from pathlib import Path
+from threading import Lock, Thread
+
+from maestro.orch.sandbox import clone_tree
 
 
 def random_base36(n: int) -> str:
@@ -12,9 +20,121 @@ def random_base36(n: int) -> str:
     return "".join(random.choice(chars) for _ in range(n))
 
 
+FSYNC_POLICIES = ("never", "turn", "always")
+BLOB_SUFFIX = ".blob"
+_BLOB_MIN_BYTES = 256
+_FLUSH = object()
+
+
+class BlobStore:
+    """Content-addressed, gzip-compressed artifact blobs at ``<root>/<sha[:2]>/<sha>.gz``.
+
+    Identical payloads (the same request, config or prompt across turns and
+    runs) are stored once. Blobs are written to a temp file and renamed into
+    place; re-putting an existing blob only bumps its mtime, which keeps
+    ``maestro gc`` from sweeping it before the new pointer is written.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def path(self, digest: str) -> Path:
+        return self.root / digest[:2] / f"{digest}.gz"
+
+    def put(self, data: bytes, fsync: bool = False) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        try:
+            os.utime(path)
+            return digest
+        except FileNotFoundError:
+            pass
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-", suffix=".gz")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(gzip.compress(data, compresslevel=6, mtime=0))
+                if fsync:
+                    fh.flush()
+                    os.fsync(fh.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        return gzip.decompress(self.path(digest).read_bytes())
+
+
+def read_pointer(pointer: Path) -> str:
+    """The blob digest recorded in a ``<name>.blob`` pointer file."""
+    return pointer.read_text().strip().removeprefix("sha256:")
+
+
+def _blob_root(pointer: Path) -> Path:
+    for parent in pointer.parents:
+        if (parent / "blobs").is_dir():
+            return parent / "blobs"
+    raise FileNotFoundError(f"no blob store above {pointer}")
+
+
+def artifact_exists(path: Path) -> bool:
+    path = Path(path)
+    return path.exists() or path.with_name(path.name + BLOB_SUFFIX).exists()
+
+
+def read_artifact(path: Path) -> str:
+    """Read a run artifact written by :class:`RunStore`, plain or stored as a compressed blob."""
+    path = Path(path)
+    if path.exists():
+        return path.read_text()
+    pointer = path.with_name(path.name + BLOB_SUFFIX)
+    if not pointer.exists():
+        raise FileNotFoundError(path)
+    return BlobStore(_blob_root(pointer)).get(read_pointer(pointer)).decode("utf-8")
+
+
 class RunStore:
-    def __init__(self, repo_path: Path):
+    """Writes a run's artifacts under ``<repo>/.maestro``.
+
+    With ``async_writes`` the ``write_*`` calls only serialise the payload and
+    queue it; a background thread creates directories (once per directory) and
+    writes the files, so callers never wait on disk I/O. :meth:`flush` marks a
+    turn boundary and :meth:`close` drains the queue. ``fsync`` is ``never``,
+    ``turn`` (files written since the last flush are synced at the flush) or
+    ``always``. With ``journal`` every write is also appended to the run's
+    ``journal.jsonl``. With ``compress`` artifacts of at least 256 bytes go to
+    the shared :class:`BlobStore` and the artifact path holds a ``.blob``
+    pointer instead; use :func:`read_artifact` to read either form.
+    """
+
+    def __init__(
+        self,
+        repo_path: Path,
+        *,
+        async_writes: bool = False,
+        fsync: str = "never",
+        journal: bool = False,
+        compress: bool = False,
+    ):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"unknown fsync policy: {fsync}")
         self.repo_path = repo_path.resolve()
+        self.fsync = fsync
+        self.journal = journal
+        self.journal_path: Path | None = None
+        self.blobs = BlobStore(self.blob_dir()) if compress else None
+        self._dirs: set[Path] = set()
+        self._unsynced: list[Path] = []
+        self._lock = Lock()
+        self._error: BaseException | None = None
+        self._queue: queue.Queue | None = None
+        self._thread: Thread | None = None
+        if async_writes:
+            self._queue = queue.Queue()
+            self._thread = Thread(target=self._worker, name="maestro-store-writer", daemon=True)
+            self._thread.start()
 
     def init_run(self, sid: str | None = None, runid: str | None = None) -> dict[str, Path | str]:
         sid = sid or random_base36(random.randint(1, 16))
@@ -23,19 +143,131 @@ class RunStore:
         work_repo = self.repo_path / ".maestro" / "work" / sid / runid / "repo"
         (run_root / "turns").mkdir(parents=True, exist_ok=True)
         work_repo.parent.mkdir(parents=True, exist_ok=True)
+        if self.journal:
+            self.journal_path = run_root / "journal.jsonl"
         return {"sid": sid, "runid": runid, "run_root": run_root, "work_repo": work_repo}
 
-    def clone_repo_to_work(self, work_repo: Path) -> None:
-        if work_repo.exists():
-            shutil.rmtree(work_repo)
-        shutil.copytree(self.repo_path, work_repo, ignore=shutil.ignore_patterns(".maestro", ".git"))
+    def index_path(self) -> Path:
+        return self.repo_path / ".maestro" / "index" / "index.json"
 
-    @staticmethod
-    def write_json(path: Path, payload: dict) -> None:
-        path.parent.mkdir(parents=True, exist_ok=True)
-        path.write_text(json.dumps(payload, indent=2, sort_keys=True))
+    def cache_dir(self, name: str) -> Path:
+        return self.repo_path / ".maestro" / "cache" / name
 
-    @staticmethod
-    def write_text(path: Path, payload: str) -> None:
-        path.parent.mkdir(parents=True, exist_ok=True)
-        path.write_text(payload)
+    def blob_dir(self) -> Path:
+        return self.repo_path / ".maestro" / "blobs"
+
+    def runs_db_path(self) -> Path:
+        return self.repo_path / ".maestro" / "runs.sqlite"
+
+    def clone_repo_to_work(self, work_repo: Path, strategy: str = "copy", *, allow_hardlink: bool = True) -> str:
+        return clone_tree(self.repo_path, work_repo, strategy, allow_hardlink=allow_hardlink)
+
+    def write_json(self, path: Path, payload: dict) -> None:
+        self._submit(path, json.dumps(payload, indent=2, sort_keys=True), payload)
+
+    def write_text(self, path: Path, payload: str) -> None:
+        self._submit(path, payload, None)
+
+    def flush(self, wait: bool = False) -> None:
+        """Turn boundary: sync pending files under the ``turn`` policy; ``wait`` blocks until written."""
+        if self._queue is None:
+            self._sync_pending()
+            return
+        self._queue.put(_FLUSH)
+        if wait:
+            self._queue.join()
+            self._raise_error()
+
+    def close(self) -> None:
+        """Write everything still queued and stop the writer thread."""
+        if self._queue is not None and self._thread is not None:
+            self._queue.put(_FLUSH)
+            self._queue.put(None)
+            self._thread.join()
+            self._queue = self._thread = None
+        else:
+            self._sync_pending()
+        self._raise_error()
+
+    def _submit(self, path: Path, text: str, payload: dict | None) -> None:
+        self._raise_error()
+        event = None
+        if self.journal_path is not None:
+            rel = os.path.relpath(path, self.journal_path.parent)
+            event = {"ts": time.time(), "path": rel, "bytes": len(text.encode("utf-8"))}
+            if payload is not None:
+                event["json"] = payload
+            event = json.dumps(event, sort_keys=True, default=str)
+        if self._queue is None:
+            self._write(Path(path), text, event)
+        else:
+            self._queue.put((Path(path), text, event))
+
+    def _worker(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                if item is _FLUSH:
+                    self._sync_pending()
+                else:
+                    self._write(*item)
+            except BaseException as err:  # surfaced on the next write/flush/close
+                self._error = self._error or err
+            finally:
+                self._queue.task_done()
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            err, self._error = self._error, None
+            raise err
+
+    def _ensure_dir(self, path: Path) -> None:
+        if path not in self._dirs:
+            path.mkdir(parents=True, exist_ok=True)
+            self._dirs.add(path)
+
+    def _write(self, path: Path, text: str, event: str | None) -> None:
+        self._ensure_dir(path.parent)
+        if self.blobs is not None:
+            pointer = path.with_name(path.name + BLOB_SUFFIX)
+            data = text.encode("utf-8")
+            if len(data) >= _BLOB_MIN_BYTES:
+                text = "sha256:" + self.blobs.put(data, fsync=self.fsync != "never") + "\n"
+                path, stale = pointer, path
+            else:
+                stale = pointer
+            stale.unlink(missing_ok=True)  # a rewrite may switch between the two forms
+        with open(path, "w") as fh:
+            fh.write(text)
+            if self.fsync == "always":
+                fh.flush()
+                os.fsync(fh.fileno())
+        if event is not None and self.journal_path is not None:
+            self._ensure_dir(self.journal_path.parent)
+            with open(self.journal_path, "a") as fh:
+                fh.write(event + "\n")
+                if self.fsync == "always":
+                    fh.flush()
+                    os.fsync(fh.fileno())
+        if self.fsync == "turn":
+            with self._lock:
+                self._unsynced.append(path)
+
+    def _sync_pending(self) -> None:
+        if self.fsync != "turn":
+            return
+        with self._lock:
+            paths, self._unsynced = self._unsynced, []
+        if paths and self.journal_path is not None and self.journal_path.exists():
+            paths.append(self.journal_path)
+        for target in dict.fromkeys([*paths, *{p.parent for p in paths}]):
+            try:
+                fd = os.open(target, os.O_RDONLY)
+            except FileNotFoundError:
+                continue
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
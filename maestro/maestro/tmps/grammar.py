@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import json
+
+# Regular-language approximation of what ``parse_tmps(raw, strict=True)`` accepts,
+# for backends that constrain decoding with a regex (Ollama/llama.cpp JSON-schema
+# ``pattern``). It is slightly stricter than the parser (single-digit C integers,
+# plain ``-?[0-9]+`` V turn) and cannot express increasing B priorities, which
+# ``TMPSPrefixChecker`` and the parser still enforce.
+_FIELD = r"(?:[^|\n\\]|\\.)*"
+_WORD = r"(?:[^ \t\n|\\]|\\.)+"
+_DOTPATH = r"[A-Za-z0-9_]+(?:\.[A-Za-z0-9_*-]+)*"
+
+TMPS_V_REGEX = rf"V {_FIELD}\|{_FIELD}\|{_FIELD}\|-?[0-9]+"
+TMPS_A_REGEX = rf"A [01]{{4}}\|[0-9]{{4}}\|[PWFH]\|[ \t]*(?:{_WORD}(?:[ \t]+{_WORD}){{0,11}})?[ \t]*"
+TMPS_E_REGEX = rf"E {_DOTPATH}\|[CHML]\|{_FIELD}(?:\|{_FIELD})?"
+TMPS_B_REGEX = rf"B [1-7]:[a-z]{{2,4}}\|{_FIELD}"
+TMPS_C_REGEX = rf"C [ARXE]\|[0-5]\|[0-9]\|(?:\*|{_DOTPATH}(?:,{_DOTPATH}){{0,2}})"
+
+TMPS_REGEX = (
+    rf"^{TMPS_V_REGEX}\n{TMPS_A_REGEX}\n(?:{TMPS_E_REGEX}\n)*(?:{TMPS_B_REGEX}\n){{3,7}}{TMPS_C_REGEX}$"
+)
+
+TMPS_JSON_FIELD = "tmps"
+
+
+def tmps_json_schema() -> dict:
+    """JSON schema wrapping one TMP-S record, for Ollama's structured ``format`` option."""
+    return {
+        "type": "object",
+        "properties": {TMPS_JSON_FIELD: {"type": "string", "pattern": TMPS_REGEX}},
+        "required": [TMPS_JSON_FIELD],
+    }
+
+
+def unwrap_json_field(text: str, field: str = TMPS_JSON_FIELD) -> str:
+    """Extract ``field`` from a structured-output response; returns ``text`` unchanged if it is not such an object."""
+    try:
+        body = json.loads(text)
+    except ValueError:
+        return text
+    if isinstance(body, dict) and isinstance(body.get(field), str):
+        return body[field]
+    return text
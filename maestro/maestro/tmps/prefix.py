@@ -0,0 +1,485 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Callable
+
+from .parser import (
+    ParseError,
+    parse_a_line,
+    parse_b_line,
+    parse_c_line,
+    parse_e_line,
+    parse_v_line,
+    split_with_escape,
+)
+
+PREFIX_INCOMPLETE = "incomplete"
+PREFIX_COMPLETE = "complete"
+PREFIX_INVALID = "invalid"
+
+_LINE_BREAKS = "\r\n\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+_DOTPATH_PREFIX = re.compile(r"^(?:[A-Za-z0-9_]+(?:\.[A-Za-z0-9_\-*]+)*\.?)?$")
+_AGENT_PREFIX = re.compile(r"^[a-z]{0,4}$")
+
+
+@dataclass
+class PrefixStatus:
+    state: str
+    end: int = 0
+    reason: str | None = None
+    can_end: bool = False
+
+
+@dataclass
+class _Stage:
+    expect: str = "V"
+    b_count: int = 0
+    last_pri: int = 0
+
+
+def _int_prefix_ok(text: str, lo: int | None = None, hi: int | None = None) -> bool:
+    negative = text.startswith("-")
+    digits = text[1:] if negative else text
+    if digits and not digits.isdigit():
+        return False
+    if negative:
+        return lo is None
+    if hi is None or not digits:
+        return True
+    stripped = digits.lstrip("0")
+    return any(str(v).startswith(stripped) for v in range(lo or 0, hi + 1))
+
+
+def _int_ok(text: str, lo: int, hi: int) -> bool:
+    return text.isdigit() and lo <= int(text) <= hi
+
+
+def _focus_prefix_ok(text: str) -> bool:
+    if text in {"", "*"}:
+        return True
+    parts = text.split(",")
+    if len(parts) > 3:
+        return False
+    *done, last = parts
+    if any(not p or not _DOTPATH_PREFIX.fullmatch(p) or p.endswith(".") for p in done):
+        return False
+    return bool(_DOTPATH_PREFIX.fullmatch(last))
+
+
+def _fields_prefix_ok(tag: str, body: str, checks: list) -> str | None:
+    fields = split_with_escape(body)
+    if len(fields) > len(checks):
+        return f"invalid {tag}"
+    for idx, field in enumerate(fields):
+        name, check = checks[idx]
+        if not check(field, idx == len(fields) - 1):
+            return name
+    return None
+
+
+def _any(_text: str, _partial: bool) -> bool:
+    return True
+
+
+def _v_prefix(body: str) -> str | None:
+    return _fields_prefix_ok(
+        "V",
+        body,
+        [("V ver", _any), ("V sid", _any), ("V runid", _any), ("invalid V turn", lambda s, p: _int_prefix_ok(s))],
+    )
+
+
+def _a_prefix(body: str) -> str | None:
+    return _fields_prefix_ok(
+        "A",
+        body,
+        [
+            ("hard4", lambda s, p: bool(re.fullmatch(r"[01]{0,4}", s)) and (p or len(s) == 4)),
+            ("soft4", lambda s, p: bool(re.fullmatch(r"\d{0,4}", s)) and (p or len(s) == 4)),
+            ("verdict", lambda s, p: s in {"P", "W", "F", "H"} or (p and s == "")),
+            ("rationale wordcount", lambda s, p: len(s.split()) <= 12),
+        ],
+    )
+
+
+def _e_prefix(body: str) -> str | None:
+    return _fields_prefix_ok(
+        "E",
+        body,
+        [
+            ("E dotpath", lambda s, p: bool(_DOTPATH_PREFIX.fullmatch(s)) and (p or (s != "" and not s.endswith(".")))),
+            ("E severity", lambda s, p: s in {"C", "H", "M", "L"} or (p and s == "")),
+            ("E fix_hint", _any),
+            ("E turn_ref", _any),
+        ],
+    )
+
+
+def _b_prefix(body: str, last_pri: int) -> str | None:
+    left, sep, right = body.partition("|")
+    pri_s, colon, agent = left.partition(":")
+    if not _int_prefix_ok(pri_s, last_pri + 1, 7):
+        return "B pri"
+    if colon and not _int_ok(pri_s, last_pri + 1, 7):
+        return "B pri"
+    if not colon and sep:
+        return "invalid B"
+    if not _AGENT_PREFIX.fullmatch(agent):
+        return "B agent"
+    if sep:
+        if len(agent) < 2:
+            return "B agent"
+        if len(split_with_escape(right)) != 1:
+            return "B action (unescaped pipe)"
+    return None
+
+
+def _c_prefix(body: str) -> str | None:
+    return _fields_prefix_ok(
+        "C",
+        body,
+        [
+            ("decision", lambda s, p: s in {"A", "R", "X", "E"} or (p and s == "")),
+            ("strategy", lambda s, p: _int_prefix_ok(s, 0, 5) if p else _int_ok(s, 0, 5)),
+            ("max_retries", lambda s, p: _int_prefix_ok(s, 0, 9) if p else _int_ok(s, 0, 9)),
+            ("focus", lambda s, p: _focus_prefix_ok(s)),
+        ],
+    )
+
+
+class TMPSPrefixChecker:
+    """Incremental checker for partially generated TMP-S records.
+
+    Applies the same line rules as ``parse_tmps`` to every complete line and a
+    field-level viability check to the trailing partial line. State for the
+    complete lines is memoized so repeated calls on a growing text (or on many
+    candidate continuations of one prefix) only re-examine the last line.
+    """
+
+    def __init__(self, *, strict: bool = True):
+        self.strict = strict
+        self._consumed = ""
+        self._stage = _Stage()
+        self._c_end = 0
+
+    def reset(self) -> None:
+        self._consumed = ""
+        self._stage = _Stage()
+        self._c_end = 0
+
+    def check(self, text: str) -> PrefixStatus:
+        if not text.startswith(self._consumed):
+            self.reset()
+        stage = _Stage(self._stage.expect, self._stage.b_count, self._stage.last_pri)
+        offset = len(self._consumed)
+        c_end = self._c_end
+
+        rest = text[offset:]
+        lines = rest.splitlines(keepends=True)
+        for raw in lines:
+            content = raw.rstrip(_LINE_BREAKS)
+            if content == raw:
+                break
+            if raw.endswith("\r") and offset + len(raw) == len(text):
+                # A lone trailing CR may still become CRLF; keep it pending.
+                break
+            if stage.expect == "DONE":
+                if self.strict or content.strip():
+                    return PrefixStatus(PREFIX_INVALID, end=c_end, reason="trailing lines")
+                offset += len(raw)
+                continue
+            err = self._consume_line(content, stage)
+            if err is not None:
+                return PrefixStatus(PREFIX_INVALID, end=offset, reason=err)
+            if stage.expect == "DONE":
+                c_end = offset + len(content)
+            offset += len(raw)
+            self._consumed = text[:offset]
+            self._stage = _Stage(stage.expect, stage.b_count, stage.last_pri)
+            self._c_end = c_end
+
+        if stage.expect == "DONE":
+            return PrefixStatus(PREFIX_COMPLETE, end=c_end, can_end=True)
+
+        partial = text[offset:].rstrip("\r")
+        err = self._check_partial(partial, stage)
+        if err is not None:
+            return PrefixStatus(PREFIX_INVALID, end=offset, reason=err)
+        return PrefixStatus(PREFIX_INCOMPLETE, end=len(text), can_end=self._can_end(partial, stage))
+
+    def _consume_line(self, line: str, stage: _Stage) -> str | None:
+        if self.strict:
+            if line == "":
+                return "blank line"
+            if line != line.strip():
+                return "leading/trailing spaces"
+        else:
+            line = line.strip()
+            if not line:
+                return None
+        try:
+            if stage.expect == "V":
+                if not line.startswith("V "):
+                    return "missing V"
+                parse_v_line(line)
+                stage.expect = "A"
+            elif stage.expect == "A":
+                if not line.startswith("A "):
+                    return "missing A"
+                parse_a_line(line)
+                stage.expect = "E"
+            elif line.startswith("E ") and stage.expect == "E":
+                parse_e_line(line)
+            elif line.startswith("B "):
+                b = parse_b_line(line)
+                if stage.b_count >= 7:
+                    return "B count"
+                if b.pri <= stage.last_pri:
+                    return "B order"
+                stage.b_count += 1
+                stage.last_pri = b.pri
+                stage.expect = "B"
+            elif line.startswith("C "):
+                if not 3 <= stage.b_count <= 7:
+                    return "B count"
+                parse_c_line(line)
+                stage.expect = "DONE"
+            elif stage.b_count < 3:
+                return "B count"
+            else:
+                return "missing C"
+        except ParseError as err:
+            return str(err)
+        return None
+
+    def _allowed_tags(self, stage: _Stage) -> set[str]:
+        if stage.expect in {"V", "A"}:
+            return {stage.expect}
+        tags = {"B"} if stage.b_count < 7 else set()
+        if stage.expect == "E":
+            tags.add("E")
+        if stage.b_count >= 3:
+            tags.add("C")
+        return tags
+
+    def _check_partial(self, partial: str, stage: _Stage) -> str | None:
+        if not self.strict:
+            partial = partial.lstrip()
+        if partial == "":
+            return None
+        if partial[0] not in self._allowed_tags(stage):
+            return f"unexpected line tag {partial[0]!r}"
+        if len(partial) == 1:
+            return None
+        if partial[1] != " ":
+            return "missing tag separator"
+        body = partial[2:]
+        tag = partial[0]
+        if tag == "V":
+            return _v_prefix(body)
+        if tag == "A":
+            return _a_prefix(body)
+        if tag == "E":
+            return _e_prefix(body)
+        if tag == "B":
+            return _b_prefix(body, stage.last_pri)
+        return _c_prefix(body)
+
+    def _can_end(self, partial: str, stage: _Stage) -> bool:
+        line = partial if self.strict else partial.strip()
+        if not line.startswith("C ") or not 3 <= stage.b_count <= 7:
+            return False
+        if self.strict and line != line.strip():
+            return False
+        try:
+            parse_c_line(line)
+        except ParseError:
+            return False
+        return True
+
+
+def scan_tmps_prefix(text: str, *, strict: bool = True) -> PrefixStatus:
+    return TMPSPrefixChecker(strict=strict).check(text)
+
+
+def _cutoff(status: PrefixStatus, text: str) -> int | None:
+    if status.state == PREFIX_COMPLETE:
+        return status.end
+    if status.state == PREFIX_INVALID:
+        return len(text)
+    return None
+
+
+def tmps_stream_cutoff(text: str, *, strict: bool = True) -> int | None:
+    """Return the offset at which a streamed TMP-S response should be cut, or None to keep reading."""
+    return _cutoff(scan_tmps_prefix(text, strict=strict), text)
+
+
+def tmps_stream_stopper(*, strict: bool = True) -> Callable[[str], int | None]:
+    """A :func:`tmps_stream_cutoff` for one streamed response.
+
+    Its checker keeps the lines already complete, so calling it with the growing
+    text after every token only examines the trailing line. Use one per request.
+    """
+    checker = TMPSPrefixChecker(strict=strict)
+
+    def cutoff(text: str) -> int | None:
+        return _cutoff(checker.check(text), text)
+
+    return cutoff
+
+
+_LEGACY_A_RE = re.compile(r"^A ([01]{4})\|(\d{4})\|([^|]+)\|(.+)$")
+_LEGACY_C_RE = re.compile(r"^C ([^|]+)\|strategy=(\d+)\|max_retries=(\d+)\|focus=(.+)$")
+_UNBOUNDED = 1 << 30
+_LEGACY_A_PATTERN = [
+    "A ",
+    ("[01]", 4, 4),
+    "|",
+    (r"\d", 4, 4),
+    "|",
+    ("[^|]", 1, _UNBOUNDED),
+    "|",
+    (".", 1, _UNBOUNDED),
+]
+_LEGACY_C_PATTERN = [
+    "C ",
+    ("[^|]", 1, _UNBOUNDED),
+    "|strategy=",
+    (r"\d", 1, _UNBOUNDED),
+    "|max_retries=",
+    (r"\d", 1, _UNBOUNDED),
+    "|focus=",
+    (".", 1, _UNBOUNDED),
+]
+
+
+def _pattern_prefix_ok(text: str, pattern: list) -> bool:
+    """Whether ``text`` can be extended to a full match of ``pattern``.
+
+    ``pattern`` items are literals or ``(char_class, min, max)`` runs. Runs are
+    matched greedily, which is exact as long as a run's class never contains
+    the first character of the literal that follows it.
+    """
+    pos = 0
+    for item in pattern:
+        if isinstance(item, str):
+            n = min(len(item), len(text) - pos)
+            if text[pos : pos + n] != item[:n]:
+                return False
+            pos += n
+        else:
+            cls, lo, hi = item
+            count = 0
+            while pos < len(text) and count < hi and re.fullmatch(cls, text[pos]):
+                pos += 1
+                count += 1
+            if pos < len(text) and count < lo:
+                return False
+        if pos == len(text):
+            return True
+    return False
+
+
+def _legacy_c_ok(line: str) -> bool:
+    match = _LEGACY_C_RE.match(line)
+    return bool(match) and int(match.group(2)) <= 5
+
+
+class LegacyTMPSPrefixChecker:
+    """Prefix checker for the record format accepted by ``maestro.tmps_validator.validate_tmps``.
+
+    That dialect (used by ``TMPSValidatorModel``/``TMPSController``) has a free-form
+    V line, ``C <decision>|strategy=N|max_retries=N|focus=...`` and no E-lines
+    after the first B-line. Records are short, so every call rescans the text.
+    """
+
+    def reset(self) -> None:
+        pass
+
+    def check(self, text: str) -> PrefixStatus:
+        # TMPSValidatorModel strips its output before validate_tmps sees it.
+        stripped = text.lstrip()
+        lead = len(text) - len(stripped)
+        status = self._check(stripped)
+        status.end += lead
+        return status
+
+    def _check(self, text: str) -> PrefixStatus:
+        stage = _Stage()
+        offset = 0
+        c_end = 0
+        for raw in text.splitlines(keepends=True):
+            line = raw.rstrip(_LINE_BREAKS)
+            if line == raw or (raw.endswith("\r") and offset + len(raw) == len(text)):
+                break
+            if stage.expect == "DONE":
+                return PrefixStatus(PREFIX_INVALID, end=c_end, reason="extra lines after C-line")
+            err = self._consume_line(line, stage)
+            if err is not None:
+                return PrefixStatus(PREFIX_INVALID, end=offset, reason=err)
+            if stage.expect == "DONE":
+                c_end = offset + len(line)
+            offset += len(raw)
+
+        partial = text[offset:].rstrip("\r")
+        if stage.expect == "DONE":
+            if partial:
+                return PrefixStatus(PREFIX_INVALID, end=c_end, reason="extra lines after C-line")
+            return PrefixStatus(PREFIX_COMPLETE, end=c_end, can_end=True)
+        err = self._check_partial(partial, stage)
+        if err is not None:
+            return PrefixStatus(PREFIX_INVALID, end=offset, reason=err)
+        can_end = 3 <= stage.b_count <= 7 and _legacy_c_ok(partial)
+        return PrefixStatus(PREFIX_INCOMPLETE, end=len(text), can_end=can_end)
+
+    @staticmethod
+    def _consume_line(line: str, stage: _Stage) -> str | None:
+        if stage.expect == "V":
+            if not line.startswith("V "):
+                return "first line must start with 'V '"
+            stage.expect = "A"
+        elif stage.expect == "A":
+            if not _LEGACY_A_RE.match(line):
+                return "invalid A-line format"
+            stage.expect = "E"
+        elif line.startswith("E ") and stage.expect == "E":
+            pass
+        elif line.startswith("B "):
+            if stage.b_count >= 7:
+                return "B-lines must be between 3 and 7"
+            stage.b_count += 1
+            stage.expect = "B"
+        elif stage.b_count < 3:
+            return "B-lines must be between 3 and 7"
+        elif not _legacy_c_ok(line):
+            return "invalid C-line format"
+        else:
+            stage.expect = "DONE"
+        return None
+
+    @staticmethod
+    def _check_partial(partial: str, stage: _Stage) -> str | None:
+        if partial == "":
+            return None
+        if stage.expect == "V":
+            return None if "V ".startswith(partial[:2]) else "first line must start with 'V '"
+        if stage.expect == "A":
+            return None if _pattern_prefix_ok(partial, _LEGACY_A_PATTERN) else "invalid A-line format"
+        tags = {"B"} if stage.b_count < 7 else set()
+        if stage.expect == "E":
+            tags.add("E")
+        if stage.b_count >= 3:
+            tags.add("C")
+        if partial[0] not in tags:
+            return f"unexpected line tag {partial[0]!r}"
+        if len(partial) > 1 and partial[1] != " ":
+            return "missing tag separator"
+        if partial[0] == "C":
+            if not _pattern_prefix_ok(partial, _LEGACY_C_PATTERN):
+                return "invalid C-line format"
+            strategy = re.search(r"\|strategy=(\d+)", partial)
+            if strategy and not _int_prefix_ok(strategy.group(1), 0, 5):
+                return "strategy must be in range 0..5"
+        return None
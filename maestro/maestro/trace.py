@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import itertools
+import os
+import threading
+import time
+from pathlib import Path
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "cat", "args", "start")
+
+    def __init__(self, tracer: "Tracer", name: str, cat: str, args: dict):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.start = 0.0
+
+    def set(self, **args) -> None:
+        self.args.update(args)
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        end = time.perf_counter()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.add(self.name, self.start, end - self.start, self.cat, self.args)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def set(self, **args) -> None:
+        pass
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """Collects a run's spans as Chrome trace events (``about:tracing``, Perfetto).
+
+    Spans are complete (``"ph": "X"``) events timed with ``perf_counter`` and
+    relative to the tracer's creation. :meth:`track` returns a tracer on a
+    named lane (``tid``) sharing the same event list, for work that overlaps
+    the main lane such as decomposed branches or parallel checks.
+    """
+
+    enabled = True
+
+    def __init__(self, name: str = "run", *, parent: "Tracer | None" = None):
+        self.events: list[dict] = [] if parent is None else parent.events
+        self.origin = time.perf_counter() if parent is None else parent.origin
+        self._lanes = itertools.count() if parent is None else parent._lanes
+        self._tracks: dict[str, Tracer] = {} if parent is None else parent._tracks
+        self._tracks_lock = threading.Lock() if parent is None else parent._tracks_lock
+        self.tid = next(self._lanes)
+        self.path: Path | None = None
+        self.events.append({"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": self.tid, "args": {"name": name}})
+
+    def track(self, name: str) -> "Tracer":
+        """The lane called ``name``, created on first use; safe to call from several threads."""
+        with self._tracks_lock:
+            lane = self._tracks.get(name)
+            if lane is None:
+                lane = self._tracks[name] = Tracer(name, parent=self)
+            return lane
+
+    def span(self, name: str, cat: str = "run", **args) -> _Span:
+        return _Span(self, name, cat, args)
+
+    def add(self, name: str, start: float, duration: float, cat: str = "run", args: dict | None = None) -> None:
+        self.events.append(
+            {
+                "name": name,
+                "cat": cat,
+                "ph": "X",
+                "ts": round((start - self.origin) * 1e6, 1),
+                "dur": round(duration * 1e6, 1),
+                "pid": os.getpid(),
+                "tid": self.tid,
+                "args": args or {},
+            }
+        )
+
+    def to_json(self) -> dict:
+        return {"traceEvents": self.events, "displayTimeUnit": "ms"}
+
+
+class _NullTracer:
+    """Stands in for :class:`Tracer` when tracing is off; every call is a no-op."""
+
+    enabled = False
+    path = None
+
+    def track(self, name: str) -> "_NullTracer":
+        return self
+
+    def span(self, name: str, cat: str = "run", **args) -> _NullSpan:
+        return _NULL_SPAN
+
+    def add(self, name: str, start: float, duration: float, cat: str = "run", args: dict | None = None) -> None:
+        pass
+
+
+NULL_TRACER = _NullTracer()
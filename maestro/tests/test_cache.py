@@ -0,0 +1,98 @@
+import os
+import time
+
+from maestro.cache import CacheStats, DiskCache, cache_key
+from maestro.orch.context import anonymize_run_ids, restore_run_ids, validator_input_fingerprint
+
+
+def test_cache_key_is_stable_and_order_independent_for_dicts():
+    assert cache_key("ollama", {"a": 1, "b": 2}) == cache_key("ollama", {"b": 2, "a": 1})
+    assert cache_key("ollama", "p") != cache_key("hf", "p")
+
+
+def test_disk_cache_roundtrip_and_stats(tmp_path):
+    cache = DiskCache(tmp_path / "c", max_bytes=1 << 20)
+    stats = CacheStats()
+    key = cache_key("k")
+
+    assert cache.get(key, stats) is None
+    cache.put(key, {"raw": "V 1"}, stats)
+    assert cache.get(key, stats) == {"raw": "V 1"}
+    assert stats.to_dict() == {"hits": 1, "misses": 1, "writes": 1, "evicted": 0}
+    assert not list((tmp_path / "c").glob("*/.tmp-*"))
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(tmp_path / "c", max_bytes=250)
+    keys = [cache_key(i) for i in range(3)]
+    for i, key in enumerate(keys[:2]):
+        cache.put(key, {"raw": "x" * 80})
+        path = cache._path(key)
+        os.utime(path, (time.time() - 100 + i, time.time() - 100 + i))
+    assert cache.get(keys[0]) is not None  # refreshes keys[0]
+
+    stats = CacheStats()
+    cache.put(keys[2], {"raw": "y" * 80}, stats)
+
+    assert stats.evicted == 1
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+
+
+def test_validator_input_fingerprint_masks_run_ids_and_durations():
+    a = '[SID] s1\n[RUNID] r1\n[CHECKS] {"duration_ms": 12}\n[LAST_TMPS] V 2.4|s1|r1|0\n'
+    b = '[SID] s2\n[RUNID] r2\n[CHECKS] {"duration_ms": 40}\n[LAST_TMPS] V 2.4|s2|r2|0\n'
+    assert validator_input_fingerprint(a, "s1", "r1") == validator_input_fingerprint(b, "s2", "r2")
+
+    raw = "V 2.4|s1|r1|0\nA 1111|9999|P|ok"
+    assert restore_run_ids(anonymize_run_ids(raw, "s1", "r1"), "s2", "r2") == "V 2.4|s2|r2|0\nA 1111|9999|P|ok"
+
+
+def test_tree_hash_tracks_content_and_ignores_metadata_dirs(tmp_path):
+    from maestro.cache import tree_hash
+
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "a.py").write_text("x = 1\n")
+    memo = {}
+    before = tree_hash(tmp_path, memo)
+
+    (tmp_path / ".maestro").mkdir()
+    (tmp_path / ".maestro" / "run.json").write_text("{}")
+    assert tree_hash(tmp_path, memo) == before
+
+    (tmp_path / "src" / "a.py").write_text("x = 2\n")
+    assert tree_hash(tmp_path, memo) != before
+
+
+def test_disk_cache_scans_only_when_over_budget_or_periodically(tmp_path, monkeypatch):
+    cache = DiskCache(tmp_path / "c", max_bytes=1 << 20)
+    scans = []
+    evict = cache.evict
+    monkeypatch.setattr(cache, "evict", lambda: scans.append(1) or evict())
+    for i in range(DiskCache.RESCAN_EVERY + 2):
+        cache.put(cache_key(i), {"raw": "x" * 40})
+    assert len(scans) == 2  # the first put, then one periodic rescan
+
+    cache.max_bytes = 500
+    stats = CacheStats()
+    cache.put(cache_key("big"), {"raw": "y" * 100}, stats)
+    assert len(scans) == 3 and stats.evicted > 0
+    assert sum(p.stat().st_size for p in (tmp_path / "c").glob("*/*.json")) <= 500
+
+
+def test_tree_hash_rehashes_racily_clean_files(tmp_path):
+    from maestro.cache import tree_hash
+
+    old, fresh = tmp_path / "old.py", tmp_path / "fresh.py"
+    old.write_text("a = 1\n")
+    os.utime(old, (time.time() - 60, time.time() - 60))
+    fresh.write_text("b = 1\n")
+    memo = {}
+    before = tree_hash(tmp_path, memo)
+    assert [sig[0] for sig in memo] == ["old.py"]
+
+    # Same size and the same mtime, as a rewrite within one timestamp tick would leave it.
+    st = fresh.stat()
+    fresh.write_text("b = 2\n")
+    os.utime(fresh, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert tree_hash(tmp_path, memo) != before
@@ -0,0 +1,150 @@
+import asyncio
+
+import pytest
+
+from maestro.config import RunnerConfig
+from maestro.orch import checks as checks_mod
+from maestro.orch.checks import run_checks, run_checks_async
+
+
+def _cfg(checks, **extra) -> RunnerConfig:
+    return RunnerConfig.from_dict({"validator_model": "val", "checks": checks, **extra})
+
+
+@pytest.fixture(autouse=True)
+def _four_workers(monkeypatch):
+    monkeypatch.setattr(checks_mod, "_workers", lambda: 4)
+
+
+def test_checks_without_dag_settings_run_in_order(tmp_path):
+    cfg = _cfg([{"name": "a", "cmd": "echo a >> log"}, {"name": "b", "cmd": "echo b >> log"}])
+    res = run_checks(tmp_path, cfg, True)
+    assert res["summary"] == "ok"
+    assert (tmp_path / "log").read_text() == "a\nb\n"
+    assert [c["status"] for c in res["commands"]] == ["ok", "ok"]
+    assert "wall_ms" in res
+
+
+@pytest.mark.parametrize("runner", ["sync", "async"])
+def test_parallel_checks_overlap(tmp_path, runner):
+    cfg = _cfg([{"name": n, "cmd": "sleep 0.4", "parallel": True} for n in ("fmt", "lint", "types")])
+    res = run_checks(tmp_path, cfg, True) if runner == "sync" else asyncio.run(run_checks_async(tmp_path, cfg, True))
+    assert res["summary"] == "ok"
+    assert all(c["duration_ms"] >= 350 for c in res["commands"])
+    assert res["wall_ms"] < 1000
+
+
+@pytest.mark.parametrize("runner", ["sync", "async"])
+def test_failed_dependency_skips_dependents(tmp_path, runner):
+    cfg = _cfg(
+        [
+            {"name": "build", "cmd": "exit 3"},
+            {"name": "tests", "cmd": "touch ran", "depends_on": ["build"]},
+            {"name": "lint", "cmd": "true", "required": False},
+        ]
+    )
+    res = run_checks(tmp_path, cfg, True) if runner == "sync" else asyncio.run(run_checks_async(tmp_path, cfg, True))
+    build, tests, lint = res["commands"]
+    assert build["exit_code"] == 3 and build["status"] == "failed"
+    assert tests["status"] == "skipped" and tests["exit_code"] is None and "build" in tests["reason"]
+    assert lint["status"] == "ok"
+    assert res["summary"] == "failed"
+    assert not (tmp_path / "ran").exists()
+
+
+@pytest.mark.parametrize("runner", ["sync", "async"])
+def test_fail_fast_cancels_running_checks(tmp_path, runner):
+    cfg = _cfg(
+        [
+            {"name": "slow", "cmd": "sleep 5", "parallel": True},
+            {"name": "broken", "cmd": "exit 1", "parallel": True},
+            {"name": "after", "cmd": "true", "depends_on": ["slow"]},
+        ],
+        checks_fail_fast=True,
+    )
+    res = run_checks(tmp_path, cfg, True) if runner == "sync" else asyncio.run(run_checks_async(tmp_path, cfg, True))
+    slow, broken, after = res["commands"]
+    assert broken["status"] == "failed"
+    assert slow["status"] == "cancelled"
+    assert after["status"] == "skipped"
+    assert res["wall_ms"] < 3000
+
+
+def test_check_graph_is_validated():
+    with pytest.raises(ValueError, match="unknown check"):
+        _cfg([{"name": "a", "cmd": "true", "depends_on": ["nope"]}])
+    with pytest.raises(ValueError, match="cycle"):
+        _cfg(
+            [
+                {"name": "a", "cmd": "true", "depends_on": ["b"]},
+                {"name": "b", "cmd": "true", "depends_on": ["a"]},
+            ]
+        )
+
+
+def _impact_repo(root):
+    (root / "pkg").mkdir()
+    (root / "pkg" / "__init__.py").write_text("")
+    (root / "pkg" / "a.py").write_text("X = 1\n")
+    (root / "pkg" / "b.py").write_text("from .a import X\n")
+    (root / "pkg" / "c.py").write_text("Y = 2\n")
+    (root / "tests").mkdir()
+    (root / "tests" / "test_b.py").write_text("from pkg import b\n")
+    (root / "docs").mkdir()
+    (root / "docs" / "index.md").write_text("# docs\n")
+
+
+def test_python_import_impact_follows_importers(tmp_path):
+    from maestro.orch.impact import python_import_impact
+
+    _impact_repo(tmp_path)
+    assert python_import_impact(tmp_path, ["pkg/a.py"]) == {"pkg/a.py", "pkg/b.py", "tests/test_b.py"}
+    assert python_import_impact(tmp_path, ["pkg/c.py"]) == {"pkg/c.py"}
+    assert python_import_impact(tmp_path, ["docs/index.md"]) == set()
+
+
+def test_checks_unaffected_by_changed_paths_are_skipped(tmp_path):
+    _impact_repo(tmp_path)
+    cfg = _cfg(
+        [
+            {"name": "docs", "cmd": "touch docs_ran", "paths": ["docs/**"]},
+            {"name": "tests", "cmd": "touch tests_ran", "paths": ["tests/**"], "impact": "python-imports"},
+            {"name": "always", "cmd": "true", "depends_on": ["docs"]},
+        ]
+    )
+    res = run_checks(tmp_path, cfg, True, changed=["pkg/a.py"])
+    docs, tests, always = res["commands"]
+    assert docs["status"] == "skipped" and docs["unaffected"]
+    assert tests["status"] == "ok" and always["status"] == "ok"
+    assert res["summary"] == "ok"
+    assert res["impact"] == {"changed": ["pkg/a.py"], "skipped": ["docs"]}
+    assert not (tmp_path / "docs_ran").exists()
+
+    (tmp_path / "tests_ran").unlink()
+    res = asyncio.run(run_checks_async(tmp_path, cfg, True, changed=["docs/index.md"]))
+    assert res["impact"]["skipped"] == ["tests"]
+    assert (tmp_path / "docs_ran").exists() and not (tmp_path / "tests_ran").exists()
+
+    assert "impact" not in run_checks(tmp_path, cfg, True)
+
+
+@pytest.mark.parametrize("runner", ["sync", "async"])
+def test_check_output_streams_to_log_files(tmp_path, runner):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    log_dir = tmp_path / "turn" / "checks"
+    cmd = "python -c \"import sys; sys.stdout.write('x' * 200000 + 'END'); sys.stderr.write('oops')\""
+    cfg = _cfg([{"name": "unit tests", "cmd": cmd}], check_tail_chars=10)
+    if runner == "sync":
+        res = run_checks(repo, cfg, True, log_dir=log_dir)
+    else:
+        res = asyncio.run(run_checks_async(repo, cfg, True, log_dir=log_dir))
+    cmd_res = res["commands"][0]
+    assert cmd_res["stdout_tail"] == "xxxxxxxEND"
+    assert cmd_res["stderr_tail"] == "oops"
+    assert cmd_res["stdout_bytes"] == 200003 and cmd_res["stderr_bytes"] == 4
+    assert cmd_res["stdout_log"] == "checks/0_unit_tests.stdout.log"
+    assert (log_dir.parent / cmd_res["stdout_log"]).stat().st_size == 200003
+
+    res = run_checks(repo, cfg, True)
+    assert "stdout_log" not in res["commands"][0] and res["commands"][0]["stdout_bytes"] == 200003
@@ -17,15 +17,16 @@ def test_runner_config_ollama_timeout_must_be_positive(value):
         RunnerConfig.from_dict({"validator_model": "val", "ollama_timeout_s": value})
 
 
-def test_parallel_decompose_rejected():
-    with pytest.raises(ValueError):
-        RunnerConfig.from_dict(
-            {
-                "validator_model": "val",
-                "parallel_decompose": True,
-                "agents": {"imp": {"model": "m"}},
-            }
-        )
+def test_parallel_decompose_enabled():
+    cfg = RunnerConfig.from_dict(
+        {
+            "validator_model": "val",
+            "parallel_decompose": True,
+            "agents": {"imp": {"model": "m"}},
+        }
+    )
+    assert cfg.parallel_decompose is True
+    assert RunnerConfig.from_dict({"validator_model": "val"}).parallel_decompose is False
 
 
 def test_validator_backend_must_be_known():
@@ -36,3 +37,9 @@ def test_validator_backend_must_be_known():
 def test_validator_backend_hf_requires_adapter_path():
     with pytest.raises(ValueError, match="validator_adapter_path is required"):
         RunnerConfig.from_dict({"validator_model": "val", "validator_backend": "hf"})
+
+
+def test_ollama_pool_size_default_and_validation():
+    assert RunnerConfig.from_dict({"validator_model": "val"}).ollama_pool_size == 4
+    with pytest.raises(ValueError, match="ollama_pool_size must be > 0"):
+        RunnerConfig.from_dict({"validator_model": "val", "ollama_pool_size": 0})
@@ -0,0 +1,74 @@
+from maestro.orch.delta import extract_delta, index_artifact, relpath_to_dotpath
+
+DIFF = """diff --git a/pkg/core.py b/pkg/core.py
+--- a/pkg/core.py
++++ b/pkg/core.py
+@@ -2,3 +2,3 @@
+ a
+-b = 1
++b = 2
+ c
+diff --git a/docs/guide.md b/docs/guide.md
+--- a/docs/guide.md
++++ b/docs/guide.md
+@@ -1 +1 @@
+-old docs
++new docs
+"""
+
+CHECKS = {
+    "summary": "failed",
+    "commands": [
+        {"name": "lint", "exit_code": 1, "stdout_tail": "", "stderr_tail": "docs/guide.md: bad heading"},
+        {"name": "tests", "exit_code": 1, "stdout_tail": "FAILED pkg/core.py::test_b", "stderr_tail": ""},
+        {"name": "fmt", "exit_code": 0, "stdout_tail": "", "stderr_tail": ""},
+    ],
+}
+
+
+def test_index_artifact_by_file_and_hunk():
+    files = index_artifact(DIFF)
+    assert list(files) == ["pkg/core.py", "docs/guide.md"]
+    assert files["pkg/core.py"] == ["@@ -2,3 +2,3 @@\n a\n-b = 1\n+b = 2\n c\n"]
+
+
+def test_focus_selects_hunks_regions_and_failing_checks(tmp_path):
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "core.py").write_text("".join(f"line{i}\n" for i in range(1, 21)))
+    focus = relpath_to_dotpath("pkg/core.py") + ".compute"  # symbol inside the file
+    delta = extract_delta(focus, DIFF, "failed", checks=CHECKS, repo=tmp_path)
+
+    assert delta.startswith(f"focus={focus}\nchecks=failed\n")
+    assert "[FILE pkg/core.py]\n@@ -2,3 +2,3 @@" in delta
+    assert "guide.md" not in delta.split("[CHECK", 1)[0]
+    assert "[CURRENT pkg/core.py:1-7]\n    1 line1\n" in delta
+    assert "[CHECK tests exit=1]\nFAILED pkg/core.py::test_b" in delta
+    assert "[CHECK lint" not in delta and "[CHECK fmt" not in delta
+
+
+def test_wildcard_focus_is_bounded_at_hunk_boundaries():
+    big = DIFF + "".join(
+        f"diff --git a/m{i}.py b/m{i}.py\n--- a/m{i}.py\n+++ b/m{i}.py\n@@ -1 +1 @@\n-x{i}\n+y{i}\n" for i in range(200)
+    )
+    delta = extract_delta("*", big, "failed", checks=CHECKS, max_chars=600)
+    assert len(delta) <= 600
+    assert "[FILE pkg/core.py]\n@@ -2,3 +2,3 @@\n a\n-b = 1\n+b = 2\n c\n" in delta
+    assert "sections omitted]" in delta
+    assert extract_delta("*", "not an artifact", "ok").endswith("artifact=not an artifact")
+
+
+def test_delta_never_exceeds_max_chars_with_omission_marker():
+    big = "".join(f"--- a/m{i}.py\n+++ b/m{i}.py\n@@ -1 +1 @@\n-{'x' * 30}\n+{'y' * 30}\n" for i in range(40))
+    for max_chars in range(60, 400, 7):
+        delta = extract_delta("*", big, "failed", max_chars=max_chars)
+        assert len(delta) <= max_chars
+        assert "sections omitted]" in delta
+    assert len(extract_delta("*", "z" * 500, "failed", max_chars=100)) == 100
+
+
+def test_index_artifact_reads_header_like_lines_inside_a_hunk():
+    diff = "--- a/q.sql\n+++ b/q.sql\n@@ -1,3 +1,3 @@\n a\n--- x\n+++ y\n b\n--- a/r.py\n+++ b/r.py\n@@ -1 +1 @@\n-1\n+2\n"
+    assert index_artifact(diff) == {
+        "q.sql": ["@@ -1,3 +1,3 @@\n a\n--- x\n+++ y\n b\n"],
+        "r.py": ["@@ -1 +1 @@\n-1\n+2\n"],
+    }
@@ -0,0 +1,96 @@
+import os
+import sys
+from pathlib import Path
+
+from maestro.gc import collect_garbage
+from maestro.runs_db import query, record_turn, turn_record
+from maestro.store import RunStore
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "finetune" / "scripts"))
+from extract_real_pairs import extract_pairs  # noqa: E402
+
+DAY = 86400.0
+NOW = 1_000_000_000.0
+TMPS = "V 2.4|s|r|0\nA 1111|9999|P|good\nB 1:imp|do one\nB 2:tst|do two\nB 3:doc|do three\nC A|1|2|*"
+
+
+def _run(store: RunStore, runid: str, *, finished: bool, age_days: float, prompt: str = "shared prompt\n" * 50):
+    run = store.init_run("s", runid)
+    root = run["run_root"]
+    store.write_text(root / "turns" / "0" / "prompt.txt", prompt)
+    (run["work_repo"]).mkdir(parents=True)
+    (run["work_repo"] / "file.py").write_text("x = 1\n" * 200)
+    if finished:
+        store.write_text(root / "final" / "final_summary.md", "Accepted on turn 0.\n")
+    stamp = NOW - age_days * DAY
+    for path in [root, root / "turns", root / "turns" / "0", root / "final", run["work_repo"].parent]:
+        if path.exists():
+            os.utime(path, (stamp, stamp))
+    return run
+
+
+def _blobs(tmp_path):
+    return list((tmp_path / ".maestro" / "blobs").glob("*/*.gz"))
+
+
+def test_gc_prunes_by_age_and_sweeps_unreferenced_blobs(tmp_path):
+    store = RunStore(tmp_path, compress=True)
+    old = _run(store, "old", finished=True, age_days=30, prompt="old prompt\n" * 50)
+    kept = _run(store, "kept", finished=True, age_days=1)
+    active = _run(store, "active", finished=False, age_days=0)
+    for blob in _blobs(tmp_path):
+        os.utime(blob, (NOW - 30 * DAY,) * 2)
+
+    stats = collect_garbage(tmp_path / ".maestro", max_age_days=7, now=NOW)
+
+    assert not old["run_root"].exists() and not old["work_repo"].exists()
+    assert kept["run_root"].exists() and not kept["work_repo"].exists()
+    assert active["run_root"].exists() and active["work_repo"].exists()
+    assert stats["runs_removed"] == 1 and stats["work_removed"] == 2 and stats["blobs_removed"] == 1
+    assert len(_blobs(tmp_path)) == 1  # the prompt shared by kept and active
+
+
+def test_gc_quota_removes_oldest_runs_first(tmp_path):
+    store = RunStore(tmp_path)
+    runs = [_run(store, f"r{i}", finished=True, age_days=10 - i) for i in range(3)]
+
+    dry = collect_garbage(tmp_path / ".maestro", max_bytes=1, now=NOW, dry_run=True)
+    assert dry["runs_removed"] == 3 and all(run["run_root"].exists() for run in runs)
+
+    size = sum(f.stat().st_size for f in runs[2]["run_root"].rglob("*") if f.is_file())
+    collect_garbage(tmp_path / ".maestro", max_bytes=size, now=NOW)
+    assert [run["run_root"].exists() for run in runs] == [False, False, True]
+
+
+def test_gc_drops_removed_runs_from_the_index(tmp_path):
+    store = RunStore(tmp_path)
+    for runid, age in (("old", 30), ("kept", 1)):
+        _run(store, runid, finished=True, age_days=age)
+        record_turn(
+            store.runs_db_path(),
+            turn_record(
+                "s", runid, 0, started_at=NOW, duration_ms=10, agent="imp", artifact_kind="diff",
+                patch_apply={"ok": True}, checks={"commands": [{"name": "lint", "status": "ok"}]}, checks_full=None,
+                generations=[{}], calls=[], parse_failed=False, decision="A", outcome="A",
+            ),
+        )
+
+    collect_garbage(tmp_path / ".maestro", max_age_days=7, now=NOW, dry_run=True)
+    assert len(query(store.runs_db_path(), "SELECT runid FROM runs")[1]) == 2
+
+    collect_garbage(tmp_path / ".maestro", max_age_days=7, now=NOW)
+    for table in ("runs", "turns", "checks"):
+        assert query(store.runs_db_path(), f"SELECT runid FROM {table}")[1] == [("kept",)]
+
+
+def test_extract_pairs_reads_compressed_runs(tmp_path):
+    store = RunStore(tmp_path, compress=True)
+    turn = store.init_run("s", "r")["run_root"] / "turns" / "0"
+    validator_input = "[REQUEST]\n" + "do the thing\n" * 40
+    store.write_text(turn / "validator_input.txt", validator_input)
+    store.write_text(turn / "tmps_raw.txt", TMPS)
+
+    pairs = extract_pairs(tmp_path / ".maestro" / "runs")
+    assert len(pairs) == 1
+    assert pairs[0]["messages"][1]["content"] == validator_input
+    assert (turn / "validator_input.txt.blob").exists()
@@ -0,0 +1,105 @@
+import threading
+import time
+
+from maestro.llm.hf_client import GenerationRequest, HFClient, MicroBatcher
+
+
+def _req(prompt, **options):
+    return GenerationRequest.from_options(prompt, options, None)
+
+
+def test_generation_request_parses_validator_options():
+    req = _req("p", num_predict=64, temperature=0.0, top_p=1.0, do_sample=False, seed=42)
+    assert req.max_new_tokens == 64
+    assert req.seed == 42
+    assert req.batch_key() == _req("q", max_new_tokens=64, seed=7).batch_key()
+
+
+def test_micro_batcher_coalesces_concurrent_requests():
+    batches = []
+
+    def run_batch(reqs):
+        batches.append([r.prompt for r in reqs])
+        return [r.prompt.upper() for r in reqs]
+
+    batcher = MicroBatcher(run_batch, window_ms=200, max_batch_size=8)
+    results = {}
+    barrier = threading.Barrier(4)
+
+    def call(i):
+        barrier.wait()
+        results[i] = batcher.submit(_req(f"p{i}", max_new_tokens=32))
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == {i: f"P{i}" for i in range(4)}
+    assert [sorted(b) for b in batches] == [["p0", "p1", "p2", "p3"]]
+
+
+def test_micro_batcher_separates_decoding_settings_and_propagates_errors():
+    seen = []
+
+    def run_batch(reqs):
+        seen.append({r.max_new_tokens for r in reqs})
+        if reqs[0].max_new_tokens == 1:
+            raise RuntimeError("boom")
+        return ["ok"] * len(reqs)
+
+    batcher = MicroBatcher(run_batch, window_ms=50, max_batch_size=4)
+    errors = []
+
+    def bad():
+        try:
+            batcher.submit(_req("x", max_new_tokens=1))
+        except RuntimeError as err:
+            errors.append(str(err))
+
+    t = threading.Thread(target=bad)
+    t.start()
+    time.sleep(0.005)
+    assert batcher.submit(_req("y", max_new_tokens=16)) == "ok"
+    t.join()
+
+    assert errors == ["boom"]
+    assert all(len(keys) == 1 for keys in seen)
+
+
+def test_hf_client_without_batching_does_not_start_batcher(monkeypatch):
+    client = HFClient(adapter_path=None)
+    monkeypatch.setattr(client, "_generate_batch", lambda model, reqs: [(f"{model}:{reqs[0].prompt}", {})])
+    assert client.generate("m", "hello") == "m:hello"
+    assert not any(key[0] == "m" for key in HFClient._BATCHERS)
+
+
+class _ChatTokenizer:
+    def __init__(self):
+        self.renders = 0
+
+    def apply_chat_template(self, messages, add_generation_prompt, tokenize):
+        self.renders += 1
+        system, user = messages[0]["content"], messages[1]["content"]
+        return f"<s>{system}</s><u>{user}</u><a>"
+
+    def __call__(self, text, add_special_tokens):
+        return {"input_ids": [ord(ch) for ch in text]}
+
+
+def test_hf_client_caches_system_prompt_template_and_prefix_ids():
+    from maestro.llm.hf_client import LoadedModel
+
+    tokenizer = _ChatTokenizer()
+    entry = LoadedModel(tokenizer, model=None)
+    client = HFClient()
+
+    ids, template = client._encode(entry, GenerationRequest.from_options("turn input", None, "SYS"))
+    _, again = client._encode(entry, GenerationRequest.from_options("other input", None, "SYS"))
+
+    assert again is template
+    assert tokenizer.renders == 1
+    assert (template.head, template.tail) == ("<s>SYS</s><u>", "</u><a>")
+    assert ids[: len(template.head_ids)] == template.head_ids
+    assert "".join(map(chr, ids)) == "<s>SYS</s><u>turn input</u><a>"
@@ -0,0 +1,96 @@
+import os
+
+from maestro import index as index_mod
+from maestro.index import RepoIndex, refreshed_index
+
+
+def _repo(root):
+    (root / "pkg").mkdir(parents=True)
+    (root / "pkg" / "core.py").write_text("import os\n\nclass Engine:\n    def run(self):\n        pass\n\nasync def main():\n    pass\n")
+    (root / "web").mkdir()
+    (root / "web" / "app.ts").write_text("export function render() {}\nexport class View {}\n")
+    (root / "README.md").write_text("# demo\n")
+    (root / ".maestro").mkdir()
+    (root / ".maestro" / "ignored.py").write_text("def nope(): pass\n")
+    _age(root)
+
+
+def _age(root):
+    """Backdate every file, so the index trusts their ``(size, mtime_ns)`` instead of treating them as racily clean."""
+    for path in root.rglob("*"):
+        if path.is_file():
+            os.utime(path, (1_000_000, 1_000_000))
+
+
+def test_index_records_languages_and_symbols(tmp_path):
+    _repo(tmp_path)
+    idx = RepoIndex(tmp_path / "idx.json")
+    stats = idx.refresh(tmp_path)
+    assert stats == {"files": 3, "scanned": 3, "removed": 0}
+    assert idx.files["pkg/core.py"].symbols == ["class Engine", "def main"]
+    assert idx.files["pkg/core.py"].lang == "python"
+    assert idx.files["web/app.ts"].symbols == ["render", "View"]
+    assert ".maestro/ignored.py" not in idx.files
+
+
+def test_index_is_incremental_and_persistent(tmp_path):
+    _repo(tmp_path)
+    path = tmp_path / ".maestro" / "index" / "index.json"
+    _, stats = refreshed_index(path, tmp_path)
+    assert stats["scanned"] == 3 and path.exists()
+
+    _, stats = refreshed_index(path, tmp_path)
+    assert stats["scanned"] == 0
+
+    (tmp_path / "pkg" / "core.py").write_text("def only():\n    pass\n")
+    (tmp_path / "README.md").unlink()
+    _age(tmp_path)
+    idx, stats = refreshed_index(path, tmp_path)
+    assert (stats["scanned"], stats["removed"]) == (1, 1)
+    assert RepoIndex.load(path).files["pkg/core.py"].symbols == ["def only"]
+
+    (tmp_path / "pkg" / "new.py").write_text("class New:\n    pass\n")
+    assert idx.update(tmp_path, ["pkg/new.py", "web/app.ts"])["scanned"] == 1
+    assert idx.files["pkg/new.py"].symbols == ["class New"]
+
+
+def test_index_parallel_build_matches_serial(tmp_path, monkeypatch):
+    for i in range(12):
+        (tmp_path / f"m{i}.py").write_text(f"def f{i}():\n    pass\n")
+    serial = RepoIndex()
+    serial.refresh(tmp_path)
+    monkeypatch.setattr(index_mod, "_PARALLEL_MIN_FILES", 4)
+    parallel = RepoIndex()
+    parallel.refresh(tmp_path, workers=2)
+    assert parallel.files == serial.files
+
+
+def test_summary_is_bounded_and_puts_focus_first(tmp_path):
+    _repo(tmp_path)
+    for i in range(50):
+        (tmp_path / "pkg" / f"mod{i:02d}.py").write_text(f"def fn{i}():\n    pass\n")
+    idx = RepoIndex()
+    idx.refresh(tmp_path)
+    text = idx.summary(300, focus=["pkg/mod49.py"])
+    assert len(text) <= 300
+    lines = text.splitlines()
+    assert lines[0].startswith("files=53 langs=python:51")
+    assert lines[1] == "pkg/mod49.py: def fn49"
+    assert lines[-1].startswith("... ") and lines[-1].endswith(" more files")
+    assert idx.summary(0) == ""
+
+
+def test_index_rereads_racily_clean_files(tmp_path):
+    old, fresh = tmp_path / "old.py", tmp_path / "fresh.py"
+    old.write_text("def a(): pass\n")
+    os.utime(old, (1_000_000, 1_000_000))
+    fresh.write_text("def b(): pass\n")
+    idx = RepoIndex()
+    assert idx.refresh(tmp_path)["scanned"] == 2
+
+    # Same size and mtime, as a rewrite within one timestamp tick would leave it.
+    st = fresh.stat()
+    fresh.write_text("def c(): pass\n")
+    os.utime(fresh, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert idx.refresh(tmp_path)["scanned"] == 1
+    assert idx.files["fresh.py"].symbols == ["def c"]
@@ -1,5 +1,9 @@
+import asyncio
 import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
+from maestro.llm.http_pool import HTTPConnectionPool
 from maestro.llm.ollama_client import OllamaClient
 
 
@@ -14,17 +18,232 @@ class _Resp:
         return json.dumps({"response": "ok"}).encode("utf-8")
 
 
-def test_ollama_client_uses_configured_timeout(monkeypatch):
-    captured = {}
+class _FakePool:
+    def __init__(self, resp):
+        self.resp = resp
+        self.calls = []
 
-    def fake_urlopen(req, timeout):
-        captured["timeout"] = timeout
-        return _Resp()
+    def urlopen(self, url, *, data=None, headers=None, timeout=120):
+        self.calls.append({"url": url, "payload": json.loads(data.decode("utf-8")), "timeout": timeout})
+        return self.resp
 
-    monkeypatch.setattr("urllib.request.urlopen", fake_urlopen)
 
-    client = OllamaClient("http://localhost:11434", timeout_s=321)
+def test_ollama_client_uses_configured_timeout():
+    pool = _FakePool(_Resp())
+
+    client = OllamaClient("http://localhost:11434", timeout_s=321, pool=pool)
     out = client.generate("model", "prompt")
 
     assert out == "ok"
-    assert captured["timeout"] == 321
+    assert pool.calls[0]["timeout"] == 321
+    assert pool.calls[0]["url"] == "http://localhost:11434/api/generate"
+
+
+class _StreamResp(_Resp):
+    def __init__(self, pieces):
+        self.lines = [json.dumps({"response": p, "done": False}).encode("utf-8") + b"\n" for p in pieces]
+        self.lines.append(json.dumps({"response": "", "done": True}).encode("utf-8") + b"\n")
+        self.consumed = 0
+
+    def __iter__(self):
+        for line in self.lines:
+            self.consumed += 1
+            yield line
+
+    def read(self):
+        return b""
+
+
+def test_ollama_client_stream_stops_after_c_line():
+    from maestro.tmps.prefix import tmps_stream_cutoff
+
+    record = "V 2.4|s|r|0\nA 1111|9999|P|good\nB 1:imp|a\nB 2:tst|b\nB 3:doc|c\nC A|1|0|*"
+    pieces = [line + "\n" for line in record.splitlines()] + ["rambling"] * 50
+    resp = _StreamResp(pieces)
+    pool = _FakePool(resp)
+
+    client = OllamaClient("http://localhost:11434", stop=tmps_stream_cutoff, pool=pool)
+    out = client.generate("model", "prompt")
+
+    assert out == record
+    assert pool.calls[0]["payload"]["stream"] is True
+    assert resp.consumed == 6
+
+
+def test_ollama_client_builds_a_stop_callback_per_request():
+    from maestro.tmps.prefix import tmps_stream_stopper
+
+    made = []
+
+    def factory():
+        made.append(tmps_stream_stopper())
+        return made[-1]
+
+    record = "V 2.4|s|r|0\nA 1111|9999|P|good\nB 1:imp|a\nB 2:tst|b\nB 3:doc|c\nC A|1|0|*"
+    pieces = [line + "\n" for line in record.splitlines()] + ["rambling"]
+    client = OllamaClient("http://h", pool=_FakePool(None), stop_factory=factory)
+    for _ in range(2):
+        client.pool.resp = _StreamResp(pieces)
+        assert client.generate("m", "p") == record
+    assert len(made) == 2 and made[0] is not made[1]
+
+
+def test_ollama_client_stream_stops_on_invalid_prefix():
+    from maestro.tmps.prefix import tmps_stream_cutoff
+
+    resp = _StreamResp(["Sure! ", "Here is", " the record"])
+
+    out = OllamaClient("http://localhost:11434", stop=tmps_stream_cutoff, pool=_FakePool(resp)).generate("m", "p")
+
+    assert out == "Sure! "
+    assert resp.consumed == 1
+
+
+def test_pooled_client_reuses_keep_alive_connection():
+    peers = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            return None
+
+        def do_POST(self):
+            peers.append(self.client_address)
+            self.rfile.read(int(self.headers["Content-Length"]))
+            body = json.dumps({"response": "ok", "done": True}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host = f"http://127.0.0.1:{server.server_address[1]}"
+    pool = HTTPConnectionPool(maxsize=2)
+    try:
+        client = OllamaClient(host, timeout_s=5, pool=pool)
+        assert [client.generate("m", "p") for _ in range(3)] == ["ok", "ok", "ok"]
+    finally:
+        pool.close()
+        server.shutdown()
+
+    assert len(peers) == 3
+    assert len(set(peers)) == 1
+
+
+def test_async_client_streams_with_keep_alive():
+    from maestro.llm.ollama_client import AsyncOllamaClient
+    from maestro.tmps.prefix import tmps_stream_cutoff
+
+    record = "V 2.4|s|r|0\nA 1111|9999|P|good\nB 1:imp|a\nB 2:tst|b\nB 3:doc|c\nC A|1|0|*"
+    peers = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            return None
+
+        def do_POST(self):
+            peers.append(self.client_address)
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            self.send_response(200)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            pieces = [record] if payload["stream"] else []
+            lines = [json.dumps({"response": p, "done": False}) for p in pieces]
+            lines.append(json.dumps({"response": "" if payload["stream"] else "ok", "done": True}))
+            for line in lines:
+                data = (line + "\n").encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.write(b"0\r\n\r\n")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host = f"http://127.0.0.1:{server.server_address[1]}"
+
+    async def main():
+        client = AsyncOllamaClient(host, timeout_s=5)
+        plain = await client.generate("m", "p")
+        streamed = await client.generate("m", "p", stop=tmps_stream_cutoff)
+        client.pool.close()
+        return plain, streamed
+
+    try:
+        plain, streamed = asyncio.run(main())
+    finally:
+        server.shutdown()
+
+    assert plain == "ok"
+    assert streamed == record
+    assert len(set(peers)) == 1
+
+
+def test_ollama_client_sends_format_and_unwraps_field():
+    from maestro.tmps.grammar import TMPS_JSON_FIELD, tmps_json_schema
+
+    class _JsonResp(_Resp):
+        def read(self):
+            return json.dumps({"response": json.dumps({"tmps": "V 2.4|s|r|0"})}).encode("utf-8")
+
+    pool = _FakePool(_JsonResp())
+    client = OllamaClient(
+        "http://localhost:11434", pool=pool, stop=lambda t: None, format=tmps_json_schema(), unwrap_field=TMPS_JSON_FIELD
+    )
+
+    assert client.generate("model", "prompt") == "V 2.4|s|r|0"
+    assert pool.calls[0]["payload"]["format"] == tmps_json_schema()
+    assert pool.calls[0]["payload"]["stream"] is False
+
+
+def test_ollama_client_reports_call_metrics():
+    counters = {
+        "prompt_eval_count": 200,
+        "eval_count": 50,
+        "load_duration": 3_000_000_000,
+        "prompt_eval_duration": 400_000_000,
+        "eval_duration": 1_000_000_000,
+        "total_duration": 4_500_000_000,
+    }
+
+    class _CountedResp(_Resp):
+        def read(self):
+            return json.dumps({"response": "ok", "done": True, **counters}).encode("utf-8")
+
+    out, metrics = OllamaClient("http://h", pool=_FakePool(_CountedResp())).generate_with_stats("m", "p")
+
+    assert out == "ok"
+    assert metrics["prompt_tokens"] == 200 and metrics["new_tokens"] == 50
+    assert metrics["load_ms"] == 3000 and metrics["prefill_ms"] == 400 and metrics["decode_ms"] == 1000
+    assert metrics["prefill_tok_s"] == 500 and metrics["decode_tok_s"] == 50
+    assert metrics["wall_ms"] >= 0
+
+
+def test_ollama_stream_cut_short_counts_streamed_tokens():
+    from maestro.tmps.prefix import tmps_stream_cutoff
+
+    resp = _StreamResp(["Sure! ", "Here is", " the record"])
+    out, metrics = OllamaClient("http://h", stop=tmps_stream_cutoff, pool=_FakePool(resp)).generate_with_stats("m", "p")
+
+    assert out == "Sure! "
+    assert metrics["new_tokens"] == 1 and metrics["decode_ms"] is None
+
+
+def test_rollup_sums_per_model_and_skips_cached_calls():
+    from maestro.llm.metrics import rollup
+
+    calls = [
+        {"role": "validator", "model": "v", "prompt_tokens": 100, "new_tokens": 20, "decode_ms": 200, "load_ms": 900},
+        {"role": "validator", "model": "v", "prompt_tokens": 100, "new_tokens": 20, "decode_ms": 200, "load_ms": 1},
+        {"role": "validator", "model": "v", "prompt_tokens": 100, "new_tokens": 20, "cached": True},
+        {"role": "specialist", "model": "s", "prompt_tokens": 50, "new_tokens": 80, "decode_ms": 1000},
+    ]
+    out = rollup(calls)
+
+    assert out["total"]["calls"] == 4 and out["total"]["cached"] == 1
+    assert out["total"]["new_tokens"] == 120
+    validator = out["by_model"]["validator:v"]
+    assert validator["decode_tok_s"] == 100 and validator["load_ms"] == 901 and validator["max_load_ms"] == 900
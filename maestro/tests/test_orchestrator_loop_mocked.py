@@ -1,3 +1,6 @@
+import asyncio
+import json
+import threading
 from pathlib import Path
 
 from maestro.config import RunnerConfig
@@ -99,6 +102,79 @@ def test_orchestrator_repair_loop_uses_invalid_tmps_reason(tmp_path: Path):
     assert "[INVALID_TMP-S] reason=" in validator.calls[1]["prompt"]
 
 
+def test_orchestrator_logs_validator_generation_stats(tmp_path: Path):
+    class StatsValidator(RecordingValidator):
+        def generate_with_stats(self, model, prompt, options=None, system=None):
+            text = self.generate(model, prompt, options, system)
+            return text, {"new_tokens": 10, "max_new_tokens": 64, "tokens_saved": 54, "stop_reason": "tmps_complete"}
+
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    validator = StatsValidator(["bad", VALID_TMPS])
+
+    result = Orchestrator(_build_cfg(), SpecialistMock(), validator_client=validator).run(repo, "implement x")
+
+    log = json.loads((Path(result["run_root"]) / "turns" / "0" / "validator_generation.json").read_text())
+    assert log["tokens_saved"] == 108
+    assert [c["attempt"] for c in log["calls"]] == [0, 1]
+    assert log["calls"][1]["retry_reason"] == "missing V"
+
+    calls = json.loads((Path(result["run_root"]) / "turns" / "0" / "llm_calls.json").read_text())
+    assert [(c["role"], c["attempt"]) for c in calls["calls"]] == [("specialist", 0), ("validator", 0), ("validator", 1)]
+    assert calls["by_model"]["validator:val"]["new_tokens"] == 20
+    metrics = json.loads((Path(result["run_root"]) / "final" / "llm_metrics.json").read_text())
+    assert metrics["turns"] == 1 and metrics["total"]["calls"] == 3
+
+
+def test_validator_cache_skips_validator_on_rerun(tmp_path: Path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    cfg = _build_cfg()
+    cfg.validator_cache = True
+    validator = RecordingValidator([VALID_TMPS])
+
+    first = Orchestrator(cfg, SpecialistMock(), validator_client=validator).run(repo, "implement x")
+    second = Orchestrator(cfg, SpecialistMock(), validator_client=validator).run(repo, "implement x")
+
+    assert first["decision"] == second["decision"] == "A"
+    assert len(validator.calls) == 1
+    stats = json.loads((Path(second["run_root"]) / "validator_cache.json").read_text())
+    assert stats["hits"] == 1 and stats["misses"] == 0
+
+
+def test_specialist_cache_only_for_seeded_greedy_agents(tmp_path: Path):
+    class CountingSpecialist(SpecialistMock):
+        calls = 0
+
+        def generate(self, model, prompt, options=None, system=None):
+            CountingSpecialist.calls += 1
+            return SpecialistMock.generate(self, model, prompt, options, system)
+
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "a.txt").write_text("a\n")
+    cfg = _build_cfg()
+    cfg.specialist_cache = True
+    cfg.agents["imp"].seed_optional = 7
+
+    for _ in range(2):
+        result = Orchestrator(cfg, CountingSpecialist(), validator_client=RecordingValidator([VALID_TMPS])).run(
+            repo, "implement x"
+        )
+    assert CountingSpecialist.calls == 1
+    stats = json.loads((Path(result["run_root"]) / "specialist_cache.json").read_text())
+    assert stats["hits"] == 1
+
+    (repo / "a.txt").write_text("changed\n")
+    Orchestrator(cfg, CountingSpecialist(), validator_client=RecordingValidator([VALID_TMPS])).run(repo, "implement x")
+    assert CountingSpecialist.calls == 2
+
+    cfg.agents["imp"].temperature = 0.7
+    Orchestrator(cfg, CountingSpecialist(), validator_client=RecordingValidator([VALID_TMPS])).run(repo, "implement x")
+    Orchestrator(cfg, CountingSpecialist(), validator_client=RecordingValidator([VALID_TMPS])).run(repo, "implement x")
+    assert CountingSpecialist.calls == 4
+
+
 def test_strict_mode_rejects_normalization_change(tmp_path: Path, monkeypatch):
     repo = tmp_path / "repo"
     repo.mkdir()
@@ -116,3 +192,268 @@ def test_strict_mode_rejects_normalization_change(tmp_path: Path, monkeypatch):
         Orchestrator(cfg, SpecialistMock(), validator_client=validator).run(repo, "implement x")
 
     assert "strict_mode: normalization changed TMP-S record" in validator.calls[1]["prompt"]
+
+
+class AsyncSpecialistMock(SpecialistMock):
+    async def generate(self, model, prompt, options=None, system=None):
+        await asyncio.sleep(0)
+        return SpecialistMock.generate(self, model, prompt, options, system)
+
+
+def test_run_async_interleaves_runs_on_one_loop(tmp_path: Path):
+    repos = []
+    for i in range(3):
+        repo = tmp_path / f"repo{i}"
+        repo.mkdir()
+        repos.append(repo)
+    cfg = _build_cfg()
+    validator = RecordingValidator([VALID_TMPS] * 4)
+
+    async def main():
+        orch = Orchestrator(cfg, AsyncSpecialistMock(), validator_client=validator)
+        return await asyncio.gather(*(orch.run_async(repo, "implement x") for repo in repos))
+
+    results = asyncio.run(main())
+
+    assert [r["decision"] for r in results] == ["A", "A", "A"]
+    for result in results:
+        assert "+hello" in (Path(result["run_root"]) / "final" / "final_patch.diff").read_text()
+
+
+DECOMPOSE_TMPS = "\n".join(
+    [
+        "V 2.4|s|r|0",
+        "A 1111|1111|F|needs code tests docs",
+        "B 1:imp|implement",
+        "B 2:tst|add tests",
+        "B 3:doc|document",
+        "C R|0|1|*",
+    ]
+)
+
+
+class PerAgentSpecialist:
+    def __init__(self, files):
+        self.files = files
+        self.threads = set()
+
+    def generate(self, model, prompt, options=None, system=None):
+        self.threads.add(threading.get_ident())
+        if "[TASK]" not in prompt:
+            return "FILE: start.txt\nstart\n"
+        name, body = self.files[model]
+        return f"FILE: {name}\n{body}\n"
+
+
+def _decompose_cfg():
+    return RunnerConfig.from_dict(
+        {
+            "validator_model": "val",
+            "max_retries": 2,
+            "abs_max_turns": 3,
+            "parallel_decompose": True,
+            "agents": {"imp": {"model": "impl"}, "tst": {"model": "test"}, "doc": {"model": "docs"}},
+        }
+    )
+
+
+def test_parallel_decompose_merges_branches(tmp_path: Path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    specialist = PerAgentSpecialist(
+        {"impl": ("app.py", "x = 1"), "test": ("test_app.py", "assert True"), "docs": ("README.md", "docs")}
+    )
+    validator = RecordingValidator([DECOMPOSE_TMPS, VALID_TMPS.replace("|r|0", "|r|1")])
+
+    result = Orchestrator(_decompose_cfg(), specialist, validator_client=validator).run(repo, "implement x")
+
+    assert result["decision"] == "A"
+    turn1 = Path(result["run_root"]) / "turns" / "1"
+    patch_apply = json.loads((turn1 / "patch_apply.json").read_text())
+    assert patch_apply["ok"] is True
+    assert patch_apply["merged"] == ["README.md", "app.py", "test_app.py"]
+    assert (turn1 / "branches" / "2_tst" / "specialist_output.txt").exists()
+    assert (turn1 / "specialist_agent.txt").read_text() == "imp,tst,doc"
+    assert len(validator.calls) == 2
+    assert len(specialist.threads) > 1
+    work = Path(result["run_root"].replace("/runs/", "/work/")) / "repo"
+    assert (work / "test_app.py").read_text() == "assert True\n"
+    assert not (work.parent / "branches" / "1" / "1_imp" / "repo").exists()
+    calls = json.loads((turn1 / "llm_calls.json").read_text())["calls"]
+    assert [c.get("agent") for c in calls] == ["imp", "tst", "doc", None]
+
+
+def test_parallel_decompose_merges_branch_cache_stats(tmp_path: Path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    raw = json.loads(json.dumps(_decompose_cfg(), default=lambda o: o.__dict__))
+    raw["specialist_cache"] = True
+    for agent in raw["agents"].values():
+        agent["seed_optional"] = 7
+    cfg = RunnerConfig.from_dict(raw)
+    specialist = PerAgentSpecialist(
+        {"impl": ("app.py", "x = 1"), "test": ("test_app.py", "assert True"), "docs": ("README.md", "docs")}
+    )
+    validator = RecordingValidator([DECOMPOSE_TMPS, VALID_TMPS.replace("|r|0", "|r|1")])
+
+    result = Orchestrator(cfg, specialist, validator_client=validator).run(repo, "implement x")
+
+    stats = json.loads((Path(result["run_root"]) / "specialist_cache.json").read_text())
+    assert stats == {"hits": 0, "misses": 4, "writes": 4, "evicted": 0}
+
+
+def test_merge_branches_keeps_mode_changes(tmp_path: Path):
+    import os
+
+    from maestro.orch.decompose import BranchResult, merge_branches
+
+    base = tmp_path / "base"
+    branch = tmp_path / "branch"
+    for root in (base, branch):
+        root.mkdir()
+        (root / "run.sh").write_text("echo hi\n")
+        os.chmod(root / "run.sh", 0o644)
+    os.chmod(branch / "run.sh", 0o755)
+    result = BranchResult(1, "imp", "p", "o", "diff", "", {"ok": True}, branch, ["run.sh"])
+
+    assert merge_branches(base, [result])["merged"] == ["run.sh"]
+    assert (base / "run.sh").stat().st_mode & 0o777 == 0o755
+
+
+def test_parallel_decompose_reports_conflicts(tmp_path: Path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    specialist = PerAgentSpecialist(
+        {"impl": ("app.py", "x = 1"), "test": ("app.py", "x = 2"), "docs": ("README.md", "docs")}
+    )
+    validator = RecordingValidator([DECOMPOSE_TMPS, VALID_TMPS.replace("|r|0", "|r|1")])
+
+    result = Orchestrator(_decompose_cfg(), specialist, validator_client=validator).run(repo, "implement x")
+
+    patch_apply = json.loads((Path(result["run_root"]) / "turns" / "1" / "patch_apply.json").read_text())
+    assert patch_apply["ok"] is False
+    assert patch_apply["conflicts"] == ["app.py"]
+    assert "[PATCH_APPLY]" in validator.calls[1]["prompt"] and "conflicting changes" in validator.calls[1]["prompt"]
+
+
+def test_accept_after_partial_checks_forces_full_run(tmp_path: Path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    raw = json.loads(json.dumps(_build_cfg(), default=lambda o: o.__dict__))
+    raw["checks"] = [{"name": "docs", "cmd": "exit 1", "paths": ["docs/**"]}]
+    cfg = RunnerConfig.from_dict(raw)
+    validator = RecordingValidator([VALID_TMPS] * 4)
+    result = Orchestrator(cfg, SpecialistMock(), validator_client=validator).run(repo, "implement x")
+
+    turn0 = Path(result["run_root"]) / "turns" / "0"
+    partial = json.loads((turn0 / "checks.json").read_text())
+    assert partial["summary"] == "ok" and partial["impact"]["skipped"] == ["docs"]
+    full = json.loads((turn0 / "checks_full.json").read_text())
+    assert full["summary"] == "failed"
+    assert result["decision"] != "A"
+
+
+def test_async_store_writes_run_artifacts_and_journal(tmp_path: Path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    raw = json.loads(json.dumps(_build_cfg(), default=lambda o: o.__dict__))
+    raw.update({"store_async_writes": True, "store_fsync": "turn", "store_journal": True})
+    cfg = RunnerConfig.from_dict(raw)
+    result = Orchestrator(cfg, SpecialistMock(), validator_client=RecordingValidator([VALID_TMPS])).run(repo, "x")
+
+    run_root = Path(result["run_root"])
+    assert (run_root / "final" / "final_patch.diff").exists()
+    journal = [json.loads(line) for line in (run_root / "journal.jsonl").read_text().splitlines()]
+    assert {"request.txt", "turns/0/checks.json", "final/decision.txt"} <= {e["path"] for e in journal}
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_trace_records_phase_spans(tmp_path: Path, use_async):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    raw = json.loads(json.dumps(_build_cfg(), default=lambda o: o.__dict__))
+    raw.update({"trace": True, "checks": [{"name": "lint", "cmd": "true"}]})
+    cfg = RunnerConfig.from_dict(raw)
+    orch = Orchestrator(cfg, SpecialistMock(), validator_client=RecordingValidator(["bad", VALID_TMPS]))
+    if use_async:
+        result = asyncio.run(orch.run_async(repo, "implement x"))
+    else:
+        result = orch.run(repo, "implement x")
+
+    trace = json.loads((Path(result["run_root"]) / "trace.json").read_text())
+    spans = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+    names = [e["name"] for e in spans]
+    for name in ["run", "clone", "specialist", "parse_artifact", "patch_apply", "checks", "lint", "normalize", "final_diff"]:
+        assert name in names
+    assert [e["args"]["attempt"] for e in spans if e["name"] == "validator"] == [0, 1]
+    lanes = {e["tid"]: e["args"]["name"] for e in trace["traceEvents"] if e["ph"] == "M"}
+    lint = next(e for e in spans if e["name"] == "lint")
+    assert lanes[lint["tid"]] == "check lint" and lint["args"]["exit_code"] == 0
+    run = next(e for e in spans if e["name"] == "run")
+    assert all(run["ts"] <= e["ts"] and e["ts"] + e["dur"] <= run["ts"] + run["dur"] + 1 for e in spans)
+
+
+def test_trace_disabled_writes_nothing(tmp_path: Path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    result = Orchestrator(_build_cfg(), SpecialistMock(), validator_client=RecordingValidator([VALID_TMPS])).run(repo, "x")
+    assert not (Path(result["run_root"]) / "trace.json").exists()
+
+
+def test_tracer_lanes_are_created_once_across_threads():
+    from concurrent.futures import ThreadPoolExecutor
+
+    from maestro.trace import Tracer
+
+    tracer = Tracer()
+    barrier = threading.Barrier(8)
+
+    def lanes(_):
+        barrier.wait()
+        return [tracer.track(f"lane{i}") for i in range(50)]
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lanes, range(8)))
+    assert all(r == results[0] for r in results)
+    tids = [e["tid"] for e in tracer.events if e["ph"] == "M"]
+    assert sorted(tids) == list(range(51))
+
+
+def test_async_store_creates_run_dirs_off_the_orchestrator_thread(tmp_path: Path, monkeypatch):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    raw = json.loads(json.dumps(_build_cfg(), default=lambda o: o.__dict__))
+    raw["store_async_writes"] = True
+    cfg = RunnerConfig.from_dict(raw)
+    made = []
+    mkdir = Path.mkdir
+
+    def recording_mkdir(self, *args, **kwargs):
+        made.append((threading.current_thread().name, self))
+        return mkdir(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "mkdir", recording_mkdir)
+    result = Orchestrator(cfg, SpecialistMock(), validator_client=RecordingValidator(["bad", "bad", "bad"])).run(repo, "x")
+
+    run_root = Path(result["run_root"])
+    assert (run_root / "turns" / "0" / "tmps_raw.txt").exists()
+    assert (run_root / "final" / "escalation_bundle" / "checks.json").exists()
+    on_caller = [path for name, path in made if name != "maestro-store-writer"]
+    assert not [p for p in on_caller if (run_root / "turns") in p.parents or p.is_relative_to(run_root / "final")]
+
+
+def test_store_close_error_does_not_replace_the_run_error(tmp_path: Path, monkeypatch):
+    class FailingSpecialist:
+        def generate(self, model, prompt, options=None, system=None):
+            raise RuntimeError("specialist down")
+
+    def failing_close(self):
+        raise OSError("disk full")
+
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    monkeypatch.setattr("maestro.orch.orchestrator.RunStore.close", failing_close)
+    with pytest.raises(RuntimeError, match="specialist down"):
+        Orchestrator(_build_cfg(), FailingSpecialist(), validator_client=RecordingValidator([])).run(repo, "x")
+    with pytest.raises(OSError, match="disk full"):
+        Orchestrator(_build_cfg(), SpecialistMock(), validator_client=RecordingValidator([VALID_TMPS])).run(repo, "x")
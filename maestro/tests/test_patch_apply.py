@@ -55,3 +55,236 @@ index ce01362..94954ab 100644
 """
     res = apply_diff(repo, diff)
     assert not res["ok"]
+
+
+def test_apply_diff_async_matches_sync(tmp_path: Path):
+    import asyncio
+
+    from maestro.orch.patch import apply_diff_async
+
+    repo = tmp_path / "r"
+    repo.mkdir()
+    _git(["git", "init"], repo)
+    (repo / "a.txt").write_text("hello\n")
+    diff = """diff --git a/a.txt b/a.txt
+--- a/a.txt
++++ b/a.txt
+@@ -1 +1 @@
+-hello
++world
+"""
+    res = asyncio.run(apply_diff_async(repo, diff))
+    assert res["ok"]
+    assert (repo / "a.txt").read_text() == "world\n"
+    assert not asyncio.run(apply_diff_async(repo, diff))["ok"]
+
+
+def test_diff_paths_applies_back_to_repo(tmp_path: Path):
+    from maestro.orch.patch import diff_paths
+
+    repo = tmp_path / "r"
+    repo.mkdir()
+    _git(["git", "init"], repo)
+    (repo / "a.txt").write_text("one\ntwo\n")
+    (repo / "gone.txt").write_text("bye\n")
+    (repo / "tail.txt").write_text("no newline")
+    (repo / "same.txt").write_text("same\n")
+    _git(["git", "add", "."], repo)
+    _git(["git", "commit", "-m", "init"], repo)
+
+    work = tmp_path / "work"
+    work.mkdir()
+    (work / "a.txt").write_text("one\n2\n")
+    (work / "tail.txt").write_text("no newline\nnow")
+    (work / "same.txt").write_text("same\n")
+    (work / "sub").mkdir()
+    (work / "sub" / "new.txt").write_text("fresh\n")
+
+    diff = diff_paths(repo, work, ["a.txt", "gone.txt", "tail.txt", "same.txt", "sub/new.txt", "../escape"])
+
+    assert "diff --git a/same.txt" not in diff
+    assert "new file mode 100644" in diff and "deleted file mode 100644" in diff
+    assert "\\ No newline at end of file" in diff
+    res = apply_diff(repo, diff)
+    assert res["ok"], res
+    assert (repo / "a.txt").read_text() == "one\n2\n"
+    assert (repo / "tail.txt").read_text() == "no newline\nnow"
+    assert (repo / "sub" / "new.txt").read_text() == "fresh\n"
+    assert not (repo / "gone.txt").exists()
+
+
+def test_python_engine_tolerates_offset_and_fuzz(tmp_path: Path):
+    repo = tmp_path / "r"
+    repo.mkdir()
+    body = [f"line{i}" for i in range(1, 21)]
+    (repo / "a.txt").write_text("header\nheader\n" + "\n".join(body) + "\n")
+    # Line numbers are off by two and one context line is stale.
+    diff = """--- a/a.txt
++++ b/a.txt
+@@ -8,5 +8,5 @@
+ line8
+ line9
+-line10
++LINE10
+ line11
+ stale
+"""
+    res = apply_diff(repo, diff, fuzz=0)
+    assert not res["ok"]
+    assert res["hunks"][0]["ok"] is False
+    assert "line10\n" in (repo / "a.txt").read_text()
+
+    res = apply_diff(repo, diff)
+    assert res["ok"], res
+    assert res["engine"] == "python"
+    assert res["hunks"] == [
+        {"path": "a.txt", "hunk": 0, "ok": True, "offset": 2, "fuzz": 1, "loose_whitespace": False}
+    ]
+    text = (repo / "a.txt").read_text()
+    assert "LINE10\nline11\nline12\n" in text and "stale" not in text
+
+
+def test_python_engine_rolls_back_every_file(tmp_path: Path):
+    repo = tmp_path / "r"
+    repo.mkdir()
+    (repo / "a.txt").write_text("one\n")
+    (repo / "b.txt").write_text("two\n")
+    diff = """--- a/a.txt
++++ b/a.txt
+@@ -1 +1 @@
+-one
++ONE
+--- /dev/null
++++ b/c.txt
+@@ -0,0 +1 @@
++new
+--- a/b.txt
++++ b/b.txt
+@@ -1 +1 @@
+-nope
++TWO
+"""
+    res = apply_diff(repo, diff)
+    assert not res["ok"]
+    assert "b.txt" in res["error"]
+    assert [h["ok"] for h in res["hunks"]] == [True, True, False]
+    assert (repo / "a.txt").read_text() == "one\n"
+    assert not (repo / "c.txt").exists()
+
+
+def test_python_engine_matches_git_apply(tmp_path: Path):
+    base = tmp_path / "base"
+    base.mkdir()
+    (base / "a.txt").write_text("".join(f"{i}\n" for i in range(40)))
+    (base / "tail.txt").write_text("x\ny")
+    (base / "gone.txt").write_text("bye\n")
+    diff = """diff --git a/a.txt b/a.txt
+--- a/a.txt
++++ b/a.txt
+@@ -2,3 +2,4 @@
+ 1
+ 2
++2.5
+ 3
+@@ -30,3 +31,2 @@
+ 29
+-30
+ 31
+diff --git a/tail.txt b/tail.txt
+--- a/tail.txt
++++ b/tail.txt
+@@ -1,2 +1,2 @@
+ x
+-y
+\\ No newline at end of file
++z
+diff --git a/gone.txt b/gone.txt
+deleted file mode 100644
+--- a/gone.txt
++++ /dev/null
+@@ -1 +0,0 @@
+-bye
+"""
+    import shutil
+
+    via_git = tmp_path / "git"
+    shutil.copytree(base, via_git)
+    assert apply_diff(via_git, diff, engine="git")["ok"]
+    assert apply_diff(base, diff)["ok"]
+    for name in ("a.txt", "tail.txt"):
+        assert (base / name).read_bytes() == (via_git / name).read_bytes()
+    assert not (base / "gone.txt").exists() and not (via_git / "gone.txt").exists()
+
+
+def _git_diff(tmp_path: Path, old: bytes, new: bytes) -> tuple[Path, Path, str]:
+    base, work = tmp_path / "base", tmp_path / "work"
+    base.mkdir(parents=True)
+    work.mkdir()
+    (base / "f.txt").write_bytes(old)
+    (work / "f.txt").write_bytes(new)
+    out = subprocess.run(
+        ["git", "diff", "--no-index", "--", "base/f.txt", "work/f.txt"], cwd=tmp_path, capture_output=True
+    ).stdout.decode("utf-8")
+    return base, work, out.replace("a/base/f.txt", "a/f.txt").replace("b/work/f.txt", "b/f.txt")
+
+
+def test_python_engine_keeps_form_feeds_and_crlf_like_git_apply(tmp_path: Path):
+    import shutil
+
+    cases = [
+        (b"x = 1\n\x0c\ny = 2\nz = 'a\x0cb'\nw=3\n", b"x = 1\n\x0c\ny = 3\nz = 'a\x0cb'\nw=4\n"),
+        (b"a\r\nb\r\nc\r\n", b"a\r\nB\r\nc\r\n"),
+        ("p\u2028q\nr\n".encode("utf-8"), "p\u2028q\nR\n".encode("utf-8")),
+    ]
+    for n, (old, new) in enumerate(cases):
+        base, _, diff = _git_diff(tmp_path / str(n), old, new)
+        via_git = tmp_path / str(n) / "git"
+        shutil.copytree(base, via_git)
+        assert apply_diff(via_git, diff, engine="git")["ok"]
+        res = apply_diff(base, diff)
+        assert res["ok"], res
+        assert (base / "f.txt").read_bytes() == (via_git / "f.txt").read_bytes() == new
+
+
+def test_python_engine_rejects_hunk_short_of_its_counts(tmp_path: Path):
+    repo = tmp_path / "r"
+    repo.mkdir()
+    (repo / "a.txt").write_text("one\ntwo\nthree\n")
+    diff = "--- a/a.txt\n+++ b/a.txt\n@@ -1,3 +1,3 @@\n one\n-two\n+TWO\ngarbage\n three\n"
+    res = apply_diff(repo, diff)
+    assert not res["ok"]
+    assert "short of its @@ counts" in res["hunks"][0]["error"]
+    assert (repo / "a.txt").read_text() == "one\ntwo\nthree\n"
+
+
+def test_diff_paths_keeps_form_feed_and_line_separator_lines(tmp_path: Path):
+    from maestro.orch.patch import diff_paths
+
+    repo = tmp_path / "r"
+    repo.mkdir()
+    _git(["git", "init"], repo)
+    (repo / "f.txt").write_text("x = 1\n\x0c\ny \u2028= 2\nw = 3\n")
+    work = tmp_path / "work"
+    work.mkdir()
+    (work / "f.txt").write_text("x = 1\n\x0c\ny \u2028= 3\nw = 4\n")
+
+    diff = diff_paths(repo, work, ["f.txt"])
+
+    assert "No newline at end of file" not in diff
+    check = subprocess.run(["git", "apply", "--check", "-"], input=diff, text=True, cwd=repo, capture_output=True)
+    assert check.returncode == 0, check.stderr
+    assert apply_diff(repo, diff)["ok"]
+    assert (repo / "f.txt").read_bytes() == (work / "f.txt").read_bytes()
+
+
+def test_python_engine_gives_new_files_the_umask_mode(tmp_path: Path):
+    import os
+    import stat
+
+    repo = tmp_path / "r"
+    repo.mkdir()
+    res = apply_diff(repo, "--- /dev/null\n+++ b/new.py\n@@ -0,0 +1 @@\n+x = 1\n")
+    assert res["ok"], res
+    umask = os.umask(0o022)
+    os.umask(umask)
+    assert stat.S_IMODE((repo / "new.py").stat().st_mode) == 0o666 & ~umask
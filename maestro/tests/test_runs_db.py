@@ -0,0 +1,118 @@
+import json
+import sys
+from pathlib import Path
+
+from maestro.config import RunnerConfig
+from maestro.orch.orchestrator import Orchestrator
+from maestro.runs_db import connect, query, rebuild, record_turn, stats, turn_record
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from test_orchestrator_loop_mocked import VALID_TMPS, RecordingValidator, SpecialistMock, _build_cfg  # noqa: E402
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "finetune" / "scripts"))
+from extract_real_pairs import extract_pairs  # noqa: E402
+
+
+def _run(repo: Path, validator_responses, **cfg_overrides):
+    raw = json.loads(json.dumps(_build_cfg(), default=lambda o: o.__dict__))
+    raw.update(cfg_overrides)
+    cfg = RunnerConfig.from_dict(raw)
+    return Orchestrator(cfg, SpecialistMock(), validator_client=RecordingValidator(validator_responses)).run(repo, "x")
+
+
+def test_turns_are_indexed_and_rebuild_matches(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _run(repo, ["bad", VALID_TMPS], checks=[{"name": "lint", "cmd": "true"}])
+    _run(repo, ["bad"] * 3)
+    db = repo / ".maestro" / "runs.sqlite"
+
+    _, runs = query(db, "SELECT outcome, turns, first_agent, accepted_turn FROM runs ORDER BY outcome")
+    assert runs == [("A", 1, "imp", 0), ("E", 1, "imp", None)]
+    _, turns = query(db, "SELECT validator_calls, validator_retries, parse_failed, decision FROM turns ORDER BY 3")
+    assert turns == [(2, 1, 0, "A"), (3, 2, 1, "E")]
+    assert query(db, "SELECT name, status, full FROM checks")[1] == [("lint", "ok", 0)]
+
+    rebuilt = tmp_path / "rebuilt.sqlite"
+    result = rebuild(repo / ".maestro", rebuilt, workers=2)
+    assert result["runs"] == 2 and result["turns"] == 2
+    for sql in ["SELECT * FROM runs ORDER BY 1, 2", "SELECT * FROM turns ORDER BY 1, 2, 3", "SELECT * FROM checks"]:
+        assert query(rebuilt, sql) == query(db, sql)
+
+    pairs = extract_pairs(repo / ".maestro" / "runs")
+    assert [p["messages"][2]["content"] for p in pairs] == [VALID_TMPS]
+
+
+def test_runs_index_can_be_disabled(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _run(repo, [VALID_TMPS], runs_index=False)
+    assert not (repo / ".maestro" / "runs.sqlite").exists()
+
+
+def _record(runid: str, turn: int, *, agent="imp", outcome=None, retries=0, started_at=1000.0):
+    generations = [{"attempt": i} for i in range(retries + 1)]
+    return turn_record(
+        "s",
+        runid,
+        turn,
+        started_at=started_at + turn,
+        duration_ms=100,
+        agent=agent,
+        artifact_kind="diff",
+        patch_apply={"ok": True},
+        checks={"summary": "ok", "commands": [{"name": "t", "status": "failed" if turn == 0 else "ok"}]},
+        checks_full=None,
+        generations=generations,
+        calls=[],
+        parse_failed=False,
+        decision=outcome or "R",
+        outcome=outcome,
+    )
+
+
+def test_stats_reports_turns_to_accept_and_rates(tmp_path):
+    db = tmp_path / "runs.sqlite"
+    for i, turns in enumerate([1, 2, 2, 5]):
+        for turn in range(turns):
+            last = turn == turns - 1
+            record_turn(db, _record(f"r{i}", turn, outcome="A" if last else None, retries=1 if turn == 0 else 0))
+    record_turn(db, _record("old", 0, agent="tst", started_at=10.0))
+
+    out = stats(db)
+    assert out["runs"] == 5 and out["accepted"] == 4 and out["unfinished"] == 1
+    assert out["turns_to_accept"] == {"imp": {"runs": 4, "p50": 2, "p95": 5}}
+    assert out["validator_retry_rate"] == round(4 / 15, 4)
+    assert out["check_failure_rate"] == {"t": round(5 / 11, 4)}
+    assert stats(db, since=500.0)["runs"] == 4
+
+
+def test_extract_pairs_includes_runs_missing_from_the_index(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _run(repo, [VALID_TMPS], runs_index=False)
+    _run(repo, [VALID_TMPS])
+    runs_root = repo / ".maestro" / "runs"
+    assert query(repo / ".maestro" / "runs.sqlite", "SELECT COUNT(*) FROM turns")[1] == [(1,)]
+
+    assert len(extract_pairs(runs_root)) == len(extract_pairs(runs_root, use_index=False)) == 2
+
+
+def test_rebuild_swaps_in_place_and_paths_need_no_escaping(tmp_path):
+    repo = tmp_path / "re?po#1%20"
+    repo.mkdir()
+    _run(repo, [VALID_TMPS])
+    db = repo / ".maestro" / "runs.sqlite"
+    record_turn(db, _record("gone", 0))
+    held = connect(db)
+    try:
+        result = rebuild(repo / ".maestro", db)
+        record_turn(db, _record("late", 0))
+        assert held.execute("SELECT COUNT(*) FROM runs WHERE runid = 'gone'").fetchone() == (0,)
+    finally:
+        held.close()
+    assert result["runs"] == 1
+    assert query(db, "SELECT runid FROM runs ORDER BY runid = 'late'")[1][-1] == ("late",)
+    assert query(db, "SELECT COUNT(*) FROM runs")[1] == [(2,)]
+    assert stats(db)["runs"] == 2
+    assert not [p.name for p in db.parent.iterdir() if p.name.endswith(".rebuild")]
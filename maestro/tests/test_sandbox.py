@@ -0,0 +1,75 @@
+import os
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from maestro.orch.patch import apply_file_blocks
+from maestro.orch.sandbox import CloneUnsupported, clone_tree, remove_tree
+
+
+def _git(cmd, cwd: Path):
+    subprocess.run(cmd, cwd=cwd, check=True, capture_output=True)
+
+
+def _src(tmp_path: Path) -> Path:
+    src = tmp_path / "src"
+    (src / "pkg").mkdir(parents=True)
+    (src / "pkg" / "a.py").write_text("a = 1\n")
+    (src / "b.txt").write_text("b\n")
+    (src / ".maestro" / "runs").mkdir(parents=True)
+    (src / ".maestro" / "runs" / "x.json").write_text("{}")
+    return src
+
+
+def test_hardlink_clone_copies_up_before_writes(tmp_path: Path):
+    src = _src(tmp_path)
+    dst = tmp_path / "work" / "repo"
+
+    assert clone_tree(src, dst, "hardlink") == "hardlink"
+    assert os.stat(dst / "b.txt").st_ino == os.stat(src / "b.txt").st_ino
+    assert not (dst / ".maestro").exists()
+
+    assert apply_file_blocks(dst, "FILE: b.txt\nchanged")["ok"]
+    assert (dst / "b.txt").read_text() == "changed\n"
+    assert (src / "b.txt").read_text() == "b\n"
+
+
+def test_auto_without_hardlinks_falls_back_to_copy(tmp_path: Path):
+    src = _src(tmp_path)
+    dst = tmp_path / "work" / "repo"
+
+    used = clone_tree(src, dst, "auto", allow_hardlink=False)
+
+    assert used in {"reflink", "copy"}
+    assert (dst / "pkg" / "a.py").read_text() == "a = 1\n"
+    assert os.stat(dst / "b.txt").st_ino != os.stat(src / "b.txt").st_ino
+
+
+def test_worktree_clone_overlays_uncommitted_state(tmp_path: Path):
+    src = _src(tmp_path)
+    (src / ".gitignore").write_text(".maestro/\nbuild/\n")
+    _git(["git", "init"], src)
+    _git(["git", "add", "."], src)
+    _git(["git", "commit", "-m", "init"], src)
+    (src / "pkg" / "a.py").write_text("a = 2\n")
+    (src / "b.txt").unlink()
+    (src / "new.txt").write_text("new\n")
+    (src / "build").mkdir()
+    (src / "build" / "out.bin").write_text("artifact\n")
+    dst = src / ".maestro" / "work" / "repo"
+
+    assert clone_tree(src, dst, "worktree") == "worktree"
+    assert (dst / "pkg" / "a.py").read_text() == "a = 2\n"
+    assert not (dst / "b.txt").exists()
+    assert (dst / "new.txt").read_text() == "new\n"
+    assert (dst / "build" / "out.bin").read_text() == "artifact\n"
+
+    remove_tree(dst)
+    listed = subprocess.run(["git", "worktree", "list"], cwd=src, capture_output=True, text=True).stdout
+    assert str(dst) not in listed
+
+
+def test_worktree_requires_git_checkout(tmp_path: Path):
+    with pytest.raises(CloneUnsupported):
+        clone_tree(_src(tmp_path), tmp_path / "dst", "worktree")
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from maestro.store import RunStore, artifact_exists, read_artifact
+
+
+@pytest.mark.parametrize("async_writes", [False, True])
+@pytest.mark.parametrize("fsync", ["never", "turn", "always"])
+def test_store_writes_files_and_journal(tmp_path, async_writes, fsync):
+    store = RunStore(tmp_path, async_writes=async_writes, fsync=fsync, journal=True)
+    run = store.init_run("s", "r")
+    root = run["run_root"]
+    store.write_text(root / "turns" / "0" / "prompt.txt", "hello")
+    store.write_json(root / "turns" / "0" / "checks.json", {"summary": "ok"})
+    store.flush()
+    store.write_text(root / "final" / "decision.txt", "A")
+    store.close()
+
+    assert (root / "turns" / "0" / "prompt.txt").read_text() == "hello"
+    assert json.loads((root / "turns" / "0" / "checks.json").read_text()) == {"summary": "ok"}
+    assert (root / "final" / "decision.txt").read_text() == "A"
+    events = [json.loads(line) for line in (root / "journal.jsonl").read_text().splitlines()]
+    assert [e["path"] for e in events] == ["turns/0/prompt.txt", "turns/0/checks.json", "final/decision.txt"]
+    assert events[1]["json"] == {"summary": "ok"} and events[0]["bytes"] == 5
+
+
+def test_async_store_surfaces_write_errors(tmp_path):
+    store = RunStore(tmp_path, async_writes=True)
+    (tmp_path / "blocker").write_text("a file, not a directory")
+    store.write_text(tmp_path / "blocker" / "x.txt", "data")
+    with pytest.raises(OSError):
+        store.close()
+
+
+def test_unknown_fsync_policy_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        RunStore(tmp_path, fsync="sometimes")
+
+
+@pytest.mark.parametrize("async_writes", [False, True])
+def test_compressed_store_dedupes_blobs_and_reads_back(tmp_path, async_writes):
+    store = RunStore(tmp_path, async_writes=async_writes, compress=True)
+    prompt = "long prompt line\n" * 100
+    for runid in ("r1", "r2"):
+        root = store.init_run("s", runid)["run_root"]
+        store.write_text(root / "turns" / "0" / "prompt.txt", prompt)
+        store.write_text(root / "final" / "decision.txt", "A")
+    store.close()
+
+    turn = tmp_path / ".maestro" / "runs" / "s" / "r1" / "turns" / "0"
+    assert not (turn / "prompt.txt").exists()
+    assert (turn / "prompt.txt.blob").read_text().startswith("sha256:")
+    assert read_artifact(turn / "prompt.txt") == prompt
+    assert read_artifact(tmp_path / ".maestro" / "runs" / "s" / "r2" / "final" / "decision.txt") == "A"
+    blobs = list((tmp_path / ".maestro" / "blobs").glob("*/*.gz"))
+    assert len(blobs) == 1 and blobs[0].stat().st_size < len(prompt)
+
+
+def test_compressed_rewrite_switches_form(tmp_path):
+    store = RunStore(tmp_path, compress=True)
+    path = store.init_run("s", "r")["run_root"] / "final" / "decision.txt"
+    store.write_text(path, "x" * 1000)
+    store.write_text(path, "A")
+    assert path.read_text() == "A" and not artifact_exists(path.with_name("decision.txt.blob"))
+    assert read_artifact(path) == "A"
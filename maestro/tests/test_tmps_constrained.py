@@ -0,0 +1,97 @@
+import re
+
+from maestro.llm.constrained import TMPSLogitsProcessor
+from maestro.tmps.grammar import TMPS_REGEX, tmps_json_schema, unwrap_json_field
+from maestro.tmps.prefix import PREFIX_COMPLETE, PREFIX_INVALID, LegacyTMPSPrefixChecker
+
+RECORD = "\n".join(
+    [
+        "V 2.4|sid|run|1",
+        "A 1111|9999|P|good enough",
+        "E f.src.app._py|H|fix it",
+        "B 1:imp|do one",
+        "B 2:tst|do two",
+        "B 3:doc|do three",
+        "C A|1|2|f.src.app._py",
+    ]
+)
+
+LEGACY_RECORD = "\n".join(
+    [
+        "V v2.4",
+        "A 1010|9876|ok|rationale",
+        "E evidence",
+        "B one",
+        "B two",
+        "B three",
+        "C A|strategy=2|max_retries=1|focus=tests",
+    ]
+)
+
+
+def test_tmps_regex_matches_parser_grammar():
+    assert re.fullmatch(TMPS_REGEX, RECORD)
+    assert not re.fullmatch(TMPS_REGEX, RECORD.replace("B 3:doc|do three\n", ""))
+    assert not re.fullmatch(TMPS_REGEX, RECORD.replace("|P|", "|Q|"))
+    assert tmps_json_schema()["properties"]["tmps"]["pattern"] == TMPS_REGEX
+
+
+def test_unwrap_json_field_falls_back_to_raw_text():
+    assert unwrap_json_field('{"tmps": "V 1"}') == "V 1"
+    assert unwrap_json_field('{"tmps": "V') == '{"tmps": "V'
+
+
+def test_legacy_prefix_checker_follows_validate_tmps():
+    checker = LegacyTMPSPrefixChecker()
+    for i in range(len(LEGACY_RECORD) + 1):
+        assert checker.check(LEGACY_RECORD[:i]).state != PREFIX_INVALID, LEGACY_RECORD[:i]
+    assert checker.check(LEGACY_RECORD).can_end
+    assert checker.check(LEGACY_RECORD + "\n").state == PREFIX_COMPLETE
+    assert checker.check(LEGACY_RECORD + "\nmore").state == PREFIX_INVALID
+    assert checker.check("V v2.4\nA 10a").state == PREFIX_INVALID
+    assert checker.check(LEGACY_RECORD.replace("strategy=2", "strategy=7")).state == PREFIX_INVALID
+
+
+class _CharTokenizer:
+    """One token per character; id 0 is EOS."""
+
+    def __init__(self, alphabet):
+        self.vocab = ["</s>"] + list(alphabet)
+
+    def decode(self, ids, skip_special_tokens=True):
+        return "".join(self.vocab[i] for i in ids if i != 0)
+
+    def encode(self, text):
+        return [self.vocab.index(ch) for ch in text]
+
+
+def test_logits_processor_keeps_only_viable_tokens():
+    tok = _CharTokenizer(sorted(set(RECORD) | set("QxWF")))
+    proc = TMPSLogitsProcessor(tok, prompt_len=0, eos_ids={0}, top_k=3)
+    prefix = tok.encode("V 2.4|sid|run|1\nA 1111|9999|")
+    head = tok.encode("QxP")
+
+    assert proc._allowed(0, prefix, head, lambda: []) == tok.encode("P")
+    assert proc._allowed(0, prefix, tok.encode("Qx"), lambda: tok.encode("WF")) == tok.encode("WF")
+
+    done = tok.encode(RECORD)
+    assert 0 in proc._allowed(1, done, [0] + tok.encode("x"), lambda: [])
+    assert proc._allowed(1, tok.encode(RECORD + "\n"), tok.encode("x"), lambda: []) == [0]
+    assert proc._allowed(2, tok.encode(RECORD[:20]), [0], lambda: []) is None
+
+
+def test_stopping_criteria_stops_after_c_line_and_on_invalid_prefix():
+    from maestro.llm.constrained import TMPSStoppingCriteria, generation_stats
+
+    tok = _CharTokenizer(sorted(set(RECORD) | set("QxWF")))
+    stopping = TMPSStoppingCriteria(tok, prompt_len=0)
+
+    assert not stopping.row_done(0, tok.encode(RECORD))
+    assert stopping.row_done(0, tok.encode(RECORD + "\n"))
+    assert stopping.ends[0] == len(RECORD)
+    assert stopping.row_done(1, tok.encode("V 2.4|s|r|x"))
+
+    stats = generation_stats(tok.encode(RECORD + "\n"), {0}, 512, stopping.stopped(0))
+    assert stats == {"new_tokens": len(RECORD) + 1, "max_new_tokens": 512, "tokens_saved": 511 - len(RECORD), "stop_reason": "tmps_complete"}
+    assert generation_stats([5, 0, 0], {0}, 8)["stop_reason"] == "eos"
+    assert generation_stats([5, 0, 0], {0}, 8)["new_tokens"] == 2
@@ -0,0 +1,74 @@
+import pytest
+
+from maestro.tmps.prefix import (
+    PREFIX_COMPLETE,
+    PREFIX_INCOMPLETE,
+    PREFIX_INVALID,
+    TMPSPrefixChecker,
+    scan_tmps_prefix,
+    tmps_stream_cutoff,
+    tmps_stream_stopper,
+)
+
+RECORD = "\n".join(
+    [
+        "V 2.4|sid|run|1",
+        "A 1111|9999|P|good",
+        "E f.src.app._py|H|fix it",
+        "B 1:imp|do one",
+        "B 2:tst|do two",
+        "B 3:doc|do three",
+        "C A|1|2|f.src.app._py",
+    ]
+)
+
+
+def test_every_prefix_of_valid_record_is_incomplete():
+    checker = TMPSPrefixChecker()
+    for i in range(len(RECORD) + 1):
+        assert checker.check(RECORD[:i]).state == PREFIX_INCOMPLETE, RECORD[:i]
+
+
+def test_stream_stopper_checks_each_complete_line_once(monkeypatch):
+    consumed = []
+    consume = TMPSPrefixChecker._consume_line
+    monkeypatch.setattr(TMPSPrefixChecker, "_consume_line", lambda self, line, stage: consumed.append(line) or consume(self, line, stage))
+    stop = tmps_stream_stopper()
+    text = RECORD + "\nrambling"
+    cuts = [stop(text[:i]) for i in range(1, len(text) + 1)]
+    assert consumed == RECORD.splitlines()
+    assert cuts == [tmps_stream_cutoff(text[:i]) for i in range(1, len(text) + 1)]
+
+
+def test_can_end_only_once_c_line_parses():
+    assert scan_tmps_prefix(RECORD).can_end
+    assert not scan_tmps_prefix(RECORD[:-1].rsplit("|", 1)[0]).can_end
+
+
+def test_newline_after_c_line_completes_and_trims():
+    status = scan_tmps_prefix(RECORD + "\nSome explanation")
+    assert status.state == PREFIX_COMPLETE
+    assert status.end == len(RECORD)
+    assert tmps_stream_cutoff(RECORD + "\r\nmore") == len(RECORD)
+
+
+@pytest.mark.parametrize(
+    "prefix,reason",
+    [
+        ("Here", "unexpected line tag"),
+        ("V 2.4|s|r|x", "invalid V turn"),
+        ("V 2.4|s|r|1\nA 12", "hard4"),
+        ("V 2.4|s|r|1\nA 1111|9999|Q", "verdict"),
+        ("V 2.4|s|r|1\nA 1111|9999|P|ok\nE x|Z", "E severity"),
+        ("V 2.4|s|r|1\nA 1111|9999|P|ok\nB 2:imp|a\nB 1", "B pri"),
+        ("V 2.4|s|r|1\nA 1111|9999|P|ok\nB 1:IMP", "B agent"),
+        ("V 2.4|s|r|1\nA 1111|9999|P|ok\nB 1:imp|a\nC", "unexpected line tag"),
+        ("V 2.4|s|r|1\n\n", "blank line"),
+        (RECORD.replace("C A|1|2|", "C A|7|2|"), "strategy"),
+    ],
+)
+def test_invalid_prefixes_are_detected(prefix, reason):
+    status = scan_tmps_prefix(prefix)
+    assert status.state == PREFIX_INVALID
+    assert reason in status.reason
+    assert tmps_stream_cutoff(prefix) == len(prefix)
@@ -0,0 +1,88 @@
+import json
+
+from maestro.orch.context import _split_diff, build_validator_input, estimate_tokens
+
+LAST = "V 2.4|s|r|0\nA 1111|9999|P|good\nB 1:imp|done\nB 2:tst|done\nB 3:doc|done\nC R|1|1|*"
+
+
+def _build(artifact, checks, *, kind="diff", tokens=0, cap=24000, count=None, summary=""):
+    return build_validator_input(
+        "NORMAL", "add a feature", summary, kind, artifact, {"ok": True}, checks, LAST, cap,
+        sid="s", runid="r", turn=1, budget_after_turn=1, token_budget=tokens, count_tokens=count,
+    )
+
+
+def _big_diff(files=6, hunks=8):
+    out = []
+    for f in range(files):
+        out.append(f"diff --git a/f{f}.py b/f{f}.py\n--- a/f{f}.py\n+++ b/f{f}.py\n")
+        for h in range(hunks):
+            out.append(f"@@ -{h * 10 + 1},3 +{h * 10 + 1},3 @@\n ctx\n-old_{f}_{h} = compute(value)\n+new_{f}_{h} = compute(value)\n")
+    return "".join(out)
+
+
+def _checks(tail_len=3000):
+    return {
+        "summary": "failed",
+        "commands": [{"name": "tests", "exit_code": 1, "stdout_tail": "E" * tail_len, "stderr_tail": "boom " * 50}],
+    }
+
+
+def test_small_input_is_unchanged():
+    text = _build("--- a/x\n+++ b/x\n@@ -1 +1 @@\n-a\n+b\n", {"summary": "ok"}, tokens=6000)
+    assert text.startswith("[SID] s\n[RUNID] r\n[TURN] 1\n")
+    assert "[ARTIFACT] --- a/x\n+++ b/x\n@@ -1 +1 @@\n-a\n+b\n\n" in text
+    assert f"[LAST_TMPS] {LAST}\n" in text
+
+
+def test_budget_keeps_every_section_and_cuts_at_hunks():
+    artifact = _big_diff()
+    text = _build(artifact, _checks(), tokens=700, summary="\n".join(f"pkg/m{i}.py: def f{i}" for i in range(200)))
+    assert estimate_tokens(text) <= 700
+    assert "[CHECKS] " in text and f"[LAST_TMPS] {LAST}\n" in text
+    assert "[REQUEST] add a feature\n" in text
+
+    body = text.split("[ARTIFACT] ", 1)[1].split("\n[PATCH_APPLY] ", 1)[0]
+    assert "hunks omitted]" in body
+    kept = [line for line in body.splitlines() if line.startswith(("+new_", "-old_"))]
+    assert kept and all(line in artifact.splitlines() for line in kept)
+    # Hunks are kept whole: every kept removal has its addition.
+    assert len([k for k in kept if k.startswith("-")]) == len([k for k in kept if k.startswith("+")])
+
+    checks = json.loads(text.split("[CHECKS] ", 1)[1].split("\n", 1)[0])
+    assert checks["summary"] == "failed"
+    assert len(checks["commands"][0]["stdout_tail"]) < 3000
+
+
+def test_diff_lines_end_at_newline_only():
+    diff = "--- a/x\n+++ b/x\n@@ -1 +1 @@\n-a\r\n+b\x0c@@ -9 +9 @@\n@@ -5 +5 @@\n-c\n+d\n"
+    files = _split_diff(diff)
+    assert files == [["--- a/x\n+++ b/x\n", "@@ -1 +1 @@\n-a\r\n+b\x0c@@ -9 +9 @@\n", "@@ -5 +5 @@\n-c\n+d\n"]]
+
+
+def test_uses_given_tokenizer_and_character_cap():
+    calls = []
+
+    def count(text):
+        calls.append(text)
+        return len(text)  # one token per character
+
+    text = _build(_big_diff(), _checks(), tokens=1500, count=count)
+    assert calls and len(text) <= 1500
+    assert f"[LAST_TMPS] {LAST}\n" in text
+
+    text = _build(_big_diff(), _checks(), tokens=0, cap=2000)
+    assert len(text) <= 2000 and "[CHECKS] " in text and "[LAST_TMPS] V 2.4" in text
+
+
+def test_character_cap_keeps_every_section_under_token_budget():
+    summary = "\n".join(f"pkg/m{i}.py: def f{i}" for i in range(100))
+    for cap in (2000, 4000, 8000):
+        text = build_validator_input(
+            "NORMAL", "f(x);\n" * 333, summary, "diff", _big_diff(), {"ok": True}, _checks(), LAST, cap,
+            sid="s", runid="r", turn=1, budget_after_turn=1, token_budget=6000,
+        )
+        assert len(text) <= cap and estimate_tokens(text) <= 6000
+        for tag in ("REQUEST", "REPO_SUMMARY", "ARTIFACT_KIND", "ARTIFACT", "PATCH_APPLY", "CHECKS"):
+            assert f"\n[{tag}] " in text
+        assert f"[LAST_TMPS] {LAST}\n" in text